@@ -1,4 +1,6 @@
-from typing import Any, Dict, List, Generator, Type, Union
+import time
+from itertools import count
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, Iterable, List, Generator, Type, Union
 from tqdm import tqdm
 from .context import ApplicationContext
 from .io.stream import ImageStream
@@ -7,9 +9,10 @@ from .pipeline.arguments import PipelineArgument
 from .pipeline.step import PipelineStep
 from .tracking.movement.predictor import MovementPredictor
 from .tracking.movement.kalmann_filter import KalmannFilter
-from .tracking.trackable import TrackableObject
+from .tracking.trackable import TrackableObject, predicted_location
 from .tracking.trackable.default_object import DefaultTrackableObject
-from .util import Detection, Image
+from .util import Detection, DetectionBatch, Image
+from .util.concurrency import Stage, StagedExecution, iterate_async
 from .util.formatter import ResultFormatter, DefaultResultFormatter
 
 
@@ -116,7 +119,33 @@ class DTrackApplication:
         else:
             raise ValueError('One of tracked_class or tracked_classes must be specified')
     
-    def process_image_stream(self, image_stream: ImageStream, progress_bar: bool=True) -> Generator[Dict[str, Any]]:
+    def _create_context(self, frame_image: Image, frame_number: int) -> ApplicationContext:
+        """Creates the application context for a single frame.
+
+        Args:
+            frame_image (Image): The frame image.
+            frame_number (int): The frame number.
+
+        Returns:
+            ApplicationContext: The context to run the pipeline with.
+        """
+        return ApplicationContext(
+            frame_image=frame_image,
+            frame_number=frame_number,
+            object_detections=None,
+            trackable_objects=self.tracked_objects,
+            matched_keys=None,
+            unmatched_keys=None,
+            new_keys=None,
+            deleted_objects=None,
+            tracking_attributes=self.tracking_attributes,
+            pipeline_step_results={},
+            tracked_object_classes=self.tracked_object_classes,
+            movement_predictors_by_class=self.movement_predictor_classes,
+            delete_after_by_class=self.delete_after_by_class,
+        )
+
+    def process_image_stream(self, image_stream: ImageStream, progress_bar: bool=True) -> Generator[Dict[str, Any], None, None]:
         """Processes the given image stream.
 
         Args:
@@ -133,26 +162,200 @@ class DTrackApplication:
             image_stream = tqdm(image_stream)
 
         for frame_image in image_stream:
-            context = ApplicationContext(
-                frame_image=frame_image,
-                frame_number=self.frame_number,
-                object_detections=None,
-                trackable_objects=self.tracked_objects,
-                matched_keys=None,
-                unmatched_keys=None,
-                new_keys=None,
-                deleted_keys=None,
-                tracking_attributes=self.tracking_attributes,
-                pipeline_step_results={},
-                tracked_object_classes=self.tracked_object_classes,
-                movement_predictors_by_class=self.movement_predictor_classes,
-                delete_after_by_class=self.delete_after_by_class,
-            )
+            context = self._create_context(frame_image, self.frame_number)
             context = self.pipeline.run(context)
             self.frame_number += 1
             self.tracking_attributes = context.tracking_attributes
             yield self.result_formatter.format(context)
 
+    def process_image_stream_pipelined(
+            self,
+            image_stream: ImageStream,
+            progress_bar: bool=True,
+            queue_size: int=4,
+            detection_workers: int=1,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Processes the given image stream with overlapping stages. Decoding, the frame independent
+            steps at the start of the pipeline (such as detection), the remaining steps (such as tracking)
+            and result formatting each run in their own thread, connected by bounded queues. The
+            remaining steps still see the frames one at a time and in order, so results match
+            process_image_stream.
+
+        Args:
+            image_stream (ImageStream): The image stream to process.
+            progress_bar (bool, optional): Whether to show a progress bar. Defaults to True.
+            queue_size (int, optional): The maximum number of frames waiting between two stages. Defaults to 4.
+            detection_workers (int, optional): The number of frames the frame independent steps run on
+                concurrently. Defaults to 1.
+
+        Yields:
+            Generator[Dict[str, Any]]: The results of the pipeline steps at each frame.
+        """
+        if not self.pipeline:
+            raise ValueError('No pipeline specified')
+
+        if progress_bar:
+            image_stream = tqdm(image_stream)
+
+        frame_independent_steps, sequential_steps = self.pipeline.split_frame_independent()
+        frame_numbers = count(self.frame_number)
+
+        def decode(frame_image: Image) -> ApplicationContext:
+            frame_image.image
+            return self._create_context(frame_image, next(frame_numbers))
+
+        def detect(context: ApplicationContext) -> ApplicationContext:
+            return self.pipeline.run_steps(context, frame_independent_steps)
+
+        def track(context: ApplicationContext) -> ApplicationContext:
+            context.tracking_attributes = self.tracking_attributes
+            context = self.pipeline.run_steps(context, sequential_steps)
+            self.frame_number = context.frame_number + 1
+            self.tracking_attributes = context.tracking_attributes
+            return context
+
+        stages = [
+            Stage('decode', decode),
+            Stage('detect', detect, workers=detection_workers),
+            Stage('track', track),
+            Stage('format', self.result_formatter.format),
+        ]
+        yield from StagedExecution(image_stream, stages, queue_size=queue_size)
+
+    def process_image_stream_realtime(
+            self,
+            image_stream: ImageStream,
+            target_frame_period: float,
+            progress_bar: bool=True,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Processes the given image stream in real-time mode. Each frame is due one target frame
+            period after the previous one, or, for frames with timestamps, as long after the first
+            frame as its timestamp says. The lag of a frame is how long after it was due it arrives,
+            measured on the wall clock, so time spent waiting for the stream counts. Once processing
+            falls behind, non critical pipeline steps are skipped, and once it is a whole frame period
+            behind, frames are skipped entirely until it catches up. For skipped frames the image is not
+            loaded, and the result holds the predicted location of every tracked object instead of
+            pipeline step results.
+
+        Args:
+            image_stream (ImageStream): The image stream to process.
+            target_frame_period (float): The time available to process each frame, in seconds.
+            progress_bar (bool, optional): Whether to show a progress bar. Defaults to True.
+
+        Yields:
+            Generator[Dict[str, Any]]: The results at each frame. The frame_skipped entry records
+                whether the frame was skipped.
+        """
+        if not self.pipeline:
+            raise ValueError('No pipeline specified')
+        if target_frame_period <= 0:
+            raise ValueError('target_frame_period must be positive')
+
+        if progress_bar:
+            image_stream = tqdm(image_stream)
+
+        critical_steps = self.pipeline.critical_steps()
+        origin = first_timestamp = None
+        for index, frame_image in enumerate(image_stream):
+            now = time.perf_counter()
+            if origin is None:
+                origin, first_timestamp = now, frame_image.timestamp
+            if frame_image.timestamp is not None and first_timestamp is not None:
+                lag = now - origin - (frame_image.timestamp - first_timestamp)
+            else:
+                lag = now - origin - index * target_frame_period
+
+            context = self._create_context(frame_image, self.frame_number)
+            if lag >= target_frame_period:
+                context.frame_skipped = True
+                context.predicted_locations = {
+                    key: predicted_location(obj, context.frame_number)
+                    for key, obj in self.tracked_objects.items()
+                }
+            elif lag > 0:
+                context = self.pipeline.run_steps(context, critical_steps)
+            else:
+                context = self.pipeline.run(context)
+            self.frame_number += 1
+            self.tracking_attributes = context.tracking_attributes
+            yield self.result_formatter.format(context)
+
+    async def process_image_stream_async(
+            self,
+            image_stream: Union[ImageStream, AsyncIterable[Image]],
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Processes the given image stream from within an event loop. Async pipeline steps and
+            detectors are awaited, so a single event loop can serve many streams.
+
+        Args:
+            image_stream (Union[ImageStream, AsyncIterable[Image]]): The image stream to process. Synchronous
+                streams are advanced in the loop's default executor.
+
+        Yields:
+            AsyncGenerator[Dict[str, Any], None]: The results of the pipeline steps at each frame.
+        """
+        if not self.pipeline:
+            raise ValueError('No pipeline specified')
+
+        async for frame_image in iterate_async(image_stream):
+            context = self._create_context(frame_image, self.frame_number)
+            context = await self.pipeline.run_async(context)
+            self.frame_number += 1
+            self.tracking_attributes = context.tracking_attributes
+            yield self.result_formatter.format(context)
+
+    def process_detections(
+            self,
+            frame_number: int,
+            detections: Union[List[Detection], DetectionBatch],
+    ) -> Dict[str, Any]:
+        """Processes the detections of a single frame, made outside of the application. No image is
+            involved: the object detection steps of the pipeline are skipped and the remaining steps,
+            such as tracking, run on the given detections. Columnar detector output can be passed
+            without creating Detection objects using DetectionBatch.from_arrays.
+
+        Args:
+            frame_number (int): The number of the frame. Frame numbers must not decrease, gaps count as
+                frames without detections when deciding which objects to delete.
+            detections (Union[List[Detection], DetectionBatch]): The detections of the frame.
+
+        Returns:
+            Dict[str, Any]: The results of the pipeline steps at the frame.
+        """
+        if not self.pipeline:
+            raise ValueError('No pipeline specified')
+        if frame_number < self.frame_number:
+            raise ValueError(f'Frame {frame_number} is before the next expected frame {self.frame_number}')
+
+        context = self._create_context(None, frame_number)
+        context.object_detections = detections
+        context = self.pipeline.run_steps(context, self.pipeline.steps_without(['object_detection']))
+        self.frame_number = frame_number + 1
+        self.tracking_attributes = context.tracking_attributes
+        return self.result_formatter.format(context)
+
+    def process_detection_batches(
+            self,
+            detection_batches: Iterable[Union[List[Detection], DetectionBatch]],
+            progress_bar: bool=False,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Processes the detections of consecutive frames, made outside of the application. See
+            process_detections.
+
+        Args:
+            detection_batches (Iterable[Union[List[Detection], DetectionBatch]]): The detections of each frame,
+                numbered consecutively from the application's current frame number.
+            progress_bar (bool, optional): Whether to show a progress bar. Defaults to False.
+
+        Yields:
+            Generator[Dict[str, Any]]: The results of the pipeline steps at each frame.
+        """
+        if progress_bar:
+            detection_batches = tqdm(detection_batches)
+
+        for detections in detection_batches:
+            yield self.process_detections(self.frame_number, detections)
+
     def register_tracking_attribute(self, name: str, value: Any):
         """Registers a tracking attribute.
 
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, Dict, List, Type
+from typing import Any, Dict, List, Tuple, Type
 from .util import Detection, Image
 from .tracking.movement.predictor import MovementPredictor
 from .tracking.trackable import TrackableObject
@@ -23,3 +23,5 @@ class ApplicationContext:
     tracked_object_classes: Dict[str, Type[TrackableObject]]
     movement_predictors_by_class: Dict[str, Type[MovementPredictor]]
     delete_after_by_class: Dict[str, int]
+    frame_skipped: bool = False
+    predicted_locations: Dict[str, Tuple[float, float]] = None
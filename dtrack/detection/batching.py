@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import List
+from ..util import Detection, Image
+from .detector import ObjectDetector
+
+
+class _Request:
+
+    def __init__(self, image: Image, args: tuple, kwargs: dict):
+        self.image = image
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+def _same_value(first, second) -> bool:
+    if first is second:
+        return True
+    try:
+        return bool(first == second)
+    except Exception:
+        # Values without a truth value for ==, such as numpy arrays, only match themselves
+        return False
+
+
+def _same_arguments(first: _Request, second: _Request) -> bool:
+    return (
+        len(first.args) == len(second.args)
+        and first.kwargs.keys() == second.kwargs.keys()
+        and all(_same_value(a, b) for a, b in zip(first.args, second.args))
+        and all(_same_value(value, second.kwargs[key]) for key, value in first.kwargs.items())
+    )
+
+
+class BatchingObjectDetector(ObjectDetector):
+    """
+    Wraps an object detector and groups concurrent detect calls into calls to its
+    detect_batch method. A batch is sent once it holds max_batch_size images, or
+    max_batch_wait seconds after its first image arrived, whichever comes first.
+
+    Concurrent calls come from pipelined processing with several detection workers, or
+    from several applications sharing the same instance, one per stream. Only calls with
+    the same extra arguments share a batch. When the wrapped detector does not override
+    detect_batch, batches are sent without waiting, as waiting would only add latency.
+    """
+
+    def __init__(self, detector: ObjectDetector, max_batch_size: int=8, max_batch_wait: float=0.005):
+        """
+        :param detector: detector to send batches to
+        :param max_batch_size: maximum number of images in a batch
+        :param max_batch_wait: maximum time to wait for a batch to fill, in seconds
+        """
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1')
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        if type(detector).detect_batch is ObjectDetector.detect_batch:
+            self.max_batch_wait = 0
+        self.batches = 0
+        self.images = 0
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None
+
+    @property
+    def mean_batch_size(self) -> float:
+        """
+        :return: mean number of images per batch sent so far
+        """
+        return self.images / self.batches if self.batches else 0.0
+
+    def submit(self, image: Image, *args, **kwargs) -> Future:
+        """
+        Queues an image for the next batch.
+
+        :param image: image to detect objects in
+        :return: future resolving to the list of detections
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('BatchingObjectDetector is closed')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='detection-batcher', daemon=True)
+                self._thread.start()
+            request = _Request(image, args, kwargs)
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def detect(self, image: Image, *args, **kwargs) -> List[Detection]:
+        """
+        Detect objects in the given image as part of a batch, blocking until the batch
+        has been processed.
+
+        :param image: image to detect objects in
+        :return: list of detected objects
+        """
+        return self.submit(image, *args, **kwargs).result()
+
+    def detect_batch(self, images: List[Image], *args, **kwargs) -> List[List[Detection]]:
+        """
+        Detect objects in several images, bypassing the batching queue.
+
+        :param images: images to detect objects in
+        :return: list of detected objects for each image
+        """
+        return self.detector.detect_batch(images, *args, **kwargs)
+
+    async def detect_async(self, image: Image, *args, **kwargs) -> List[Detection]:
+        """
+        Detect objects in the given image as part of a batch without blocking the event loop.
+
+        :param image: image to detect objects in
+        :return: list of detected objects
+        """
+        return await asyncio.wrap_future(self.submit(image, *args, **kwargs))
+
+    def _next_batch(self) -> List[_Request]:
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return []
+            deadline = time.perf_counter() + self.max_batch_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            first = self._pending.popleft()
+            batch = [first]
+            deferred = []
+            while self._pending and len(batch) < self.max_batch_size:
+                request = self._pending.popleft()
+                if _same_arguments(first, request):
+                    batch.append(request)
+                else:
+                    deferred.append(request)
+            self._pending.extendleft(reversed(deferred))
+            return batch
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._next_batch()
+            except Exception as e:
+                with self._condition:
+                    failed, self._pending = list(self._pending), deque()
+                for request in failed:
+                    request.future.set_exception(e)
+                continue
+            if not batch:
+                return
+            try:
+                results = self.detector.detect_batch(
+                    [request.image for request in batch], *batch[0].args, **batch[0].kwargs
+                )
+                if len(results) != len(batch):
+                    raise ValueError(f'detect_batch returned {len(results)} results for {len(batch)} images')
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            self.batches += 1
+            self.images += len(batch)
+            for request, detections in zip(batch, results):
+                request.future.set_result(detections)
+
+    def close(self):
+        """
+        Processes the images already queued and stops the batching thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
@@ -1,13 +1,23 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from functools import partial
+from typing import List, Tuple
+import numpy as np
 from ..util import Detection, Image
+from ..util.concurrency import run_until_complete
 
 
 class ObjectDetector(ABC):
     """
     Abstract class for object detectors.
+
+    Detectors whose models take fixed size inputs can set preprocessor to a
+    LetterboxPreprocessor and call preprocess in detect, then map the boxes the model
+    returns back to the frame with the returned transform.
     """
 
+    preprocessor = None
+
     @abstractmethod
     def detect(self, image: Image) -> List[Detection]:
         """
@@ -17,6 +27,49 @@ class ObjectDetector(ABC):
         :return: list of detected objects
         """
         raise NotImplementedError("ObjectDetector is an abstract class.")
+
+    def detect_batch(self, images: List[Image], *args, **kwargs) -> List[List[Detection]]:
+        """
+        Detect objects in several images at once. Detectors backed by batched inference
+        runtimes should override this, by default detect is called for each image.
+
+        :param images: images to detect objects in
+        :return: list of detected objects for each image, in the same order
+        """
+        return [self.detect(image, *args, **kwargs) for image in images]
+
+    def preprocess(self, image: Image) -> Tuple[np.ndarray, "LetterboxTransform"]:
+        """
+        Turns a frame into the input of the model with the detector's preprocessor.
+
+        :param image: image to detect objects in
+        :return: model input, a view of a reused buffer, and the transform from the frame to it
+        """
+        if self.preprocessor is None:
+            raise ValueError(f'{type(self).__name__} has no preprocessor')
+        return self.preprocessor(image)
+
+    def preprocess_batch(self, images: List[Image]) -> Tuple[np.ndarray, List["LetterboxTransform"]]:
+        """
+        Turns several frames into one batch of model inputs with the detector's preprocessor.
+
+        :param images: images to detect objects in
+        :return: batch of model inputs, a view of a reused buffer, and the transform of each frame
+        """
+        if self.preprocessor is None:
+            raise ValueError(f'{type(self).__name__} has no preprocessor')
+        return self.preprocessor.batch(images)
+
+    async def detect_async(self, image: Image, *args, **kwargs) -> List[Detection]:
+        """
+        Detect objects in the given image from within an event loop. By default the
+        detect method is run in the loop's default executor.
+
+        :param image: image to detect objects in
+        :return: list of detected objects
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(self.detect, image, *args, **kwargs))
     
     def __call__(self, image: Image) -> List[Detection]:
         """
@@ -26,4 +79,31 @@ class ObjectDetector(ABC):
         :return: list of detected objects
         """
         return self.detect(image)
-    
\ No newline at end of file
+
+
+class AsyncObjectDetector(ObjectDetector):
+    """
+    Abstract class for object detectors that are natively asynchronous, such as clients
+    of out-of-process model servers.
+    """
+
+    @abstractmethod
+    async def detect_async(self, image: Image, *args, **kwargs) -> List[Detection]:
+        """
+        Detect objects in the given image.
+
+        :param image: image to detect objects in
+        :return: list of detected objects
+        """
+        raise NotImplementedError("AsyncObjectDetector is an abstract class.")
+
+    def detect(self, image: Image, *args, **kwargs) -> List[Detection]:
+        """
+        Detect objects in the given image, blocking until the result is available. The
+        detection runs on the calling thread's event loop, which is kept between calls.
+        Raises RuntimeError if called from within a running event loop.
+
+        :param image: image to detect objects in
+        :return: list of detected objects
+        """
+        return run_until_complete(self.detect_async(image, *args, **kwargs))
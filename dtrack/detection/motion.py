@@ -0,0 +1,108 @@
+from typing import List, Tuple
+import cv2
+import numpy as np
+from ..util import Image
+from .regions import Region, clip_region, merge_regions
+
+
+class MotionDetector:
+    """
+    Keeps a background model of a static camera on a downscaled grayscale copy of each
+    frame and reports the regions that changed. Cheap enough to run on every frame in
+    front of an object detector.
+    """
+
+    def __init__(
+            self,
+            width: int=160,
+            method: str='average',
+            learning_rate: float=0.05,
+            threshold: int=25,
+            min_changed_area: float=0.001,
+            padding: int=16
+    ):
+        """
+        :param width: width the frames are downscaled to, keeping the aspect ratio
+        :param method: 'average' for a running average background, or 'mog2' for
+            OpenCV's Gaussian mixture background subtractor
+        :param learning_rate: how quickly the background adapts to changes
+        :param threshold: minimum grayscale difference of a changed pixel, for the
+            running average
+        :param min_changed_area: fraction of the frame that must change for a frame
+            to count as changed
+        :param padding: pixels added around each changed region, in frame pixels
+        """
+        if method not in ('average', 'mog2'):
+            raise ValueError(f'Unknown background method {method!r}')
+        self.width = width
+        self.method = method
+        self.learning_rate = learning_rate
+        self.threshold = threshold
+        self.min_changed_area = min_changed_area
+        self.padding = padding
+        self._background = None
+        self._subtractor = None
+        self._kernel = np.ones((3, 3), dtype=np.uint8)
+
+    def reset(self):
+        """
+        Forgets the background, the next frame counts as changed everywhere.
+        """
+        self._background = None
+        self._subtractor = None
+
+    def _downscale(self, content: np.ndarray) -> np.ndarray:
+        if content.ndim == 3 and content.shape[2] > 1:
+            content = cv2.cvtColor(content, cv2.COLOR_BGR2GRAY)
+        elif content.ndim == 3:
+            content = content[:, :, 0]
+        height, width = content.shape[:2]
+        size = (min(self.width, width), max(1, round(height * min(self.width, width) / width)))
+        small = cv2.resize(content, size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def _foreground(self, gray: np.ndarray) -> np.ndarray:
+        if self.method == 'mog2':
+            if self._subtractor is None:
+                self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+                self._subtractor.apply(gray, learningRate=1.0)
+                return None
+            return self._subtractor.apply(gray, learningRate=self.learning_rate) > 0
+
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+            return None
+        mask = cv2.absdiff(gray, cv2.convertScaleAbs(self._background)) > self.threshold
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+        return mask
+
+    def update(self, image: Image) -> Tuple[float, List[Region]]:
+        """
+        Compares a frame with the background and adds it to the background.
+
+        :param image: next frame
+        :return: fraction of the frame that changed, and the changed regions in frame
+            pixels. The first frame counts as changed everywhere, frames with less
+            change than min_changed_area have no regions.
+        """
+        height, width = image.image.shape[:2]
+        gray = self._downscale(image.image)
+        mask = self._foreground(gray)
+        if mask is None:
+            return 1.0, [(0, 0, width, height)]
+
+        changed = float(np.count_nonzero(mask)) / mask.size
+        if changed < self.min_changed_area:
+            return changed, []
+
+        mask = cv2.dilate(mask.astype(np.uint8), self._kernel, iterations=2)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        scale_x, scale_y = width / gray.shape[1], height / gray.shape[0]
+        regions = [
+            clip_region((
+                x * scale_x - self.padding, y * scale_y - self.padding,
+                (x + w) * scale_x + self.padding, (y + h) * scale_y + self.padding
+            ), width, height)
+            for x, y, w, h, _ in stats[1:]
+        ]
+        return changed, merge_regions(regions)
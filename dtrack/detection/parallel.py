@@ -0,0 +1,300 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from itertools import count
+from multiprocessing import shared_memory
+from typing import Dict, Generator, Iterable, List
+import numpy as np
+from ..util import Detection, Image
+from ..util.shared_memory import attach_shared_memory, unlink_shared_memory
+from .detector import ObjectDetector
+
+
+class WorkerCrashedError(RuntimeError):
+    """
+    Raised when a detection worker process dies while processing a frame.
+    """
+    pass
+
+
+def _detection_worker(detector: ObjectDetector, task_queue, connection):
+    """
+    Entry point of a detection worker process. Frames are read from shared memory
+    slots, only the resulting detections are sent back, over a pipe of its own so a
+    crashing worker cannot leave a lock shared with the other workers held.
+    """
+    slots = {}
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            task_id, slot, slot_name, shape, dtype, filename, args, kwargs = task
+            try:
+                if slot not in slots or slots[slot].name != slot_name:
+                    if slot in slots:
+                        slots[slot].close()
+                    slots[slot] = attach_shared_memory(slot_name)
+                content = np.ndarray(shape, dtype=dtype, buffer=slots[slot].buf)
+                detections = detector.detect(Image(filename, content), *args, **kwargs)
+                del content
+                connection.send((task_id, detections, None))
+            except Exception as e:
+                connection.send((task_id, None, e))
+    finally:
+        for shm in slots.values():
+            shm.close()
+
+
+def _release_slots(slots: List[shared_memory.SharedMemory]):
+    """
+    Closes and removes the shared memory slots of a pool, when it is closed, garbage
+    collected or still open when the interpreter exits.
+    """
+    for index, shm in enumerate(slots):
+        if shm is not None:
+            shm.close()
+            unlink_shared_memory(shm)
+            slots[index] = None
+
+
+class _Task:
+
+    def __init__(self, task_id: int, slot: int, message: tuple):
+        self.task_id = task_id
+        self.slot = slot
+        self.message = message
+        self.future = Future()
+        self.attempts = 0
+        self.worker = None
+
+
+class DetectionProcessPool:
+    """
+    Runs an object detector in a pool of worker processes. Frames are copied into
+    shared memory slots instead of being pickled, and at most max_in_flight frames are
+    being processed at once. Submitting blocks until a slot is free. The slots are
+    removed when the pool is closed, or at the latest when the interpreter exits.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            workers: int=None,
+            max_in_flight: int=None,
+            max_retries: int=1,
+            mp_context: str=None
+    ):
+        """
+        :param detector: detector to run, sent to every worker process
+        :param workers: number of worker processes, defaults to the number of cores
+        :param max_in_flight: maximum number of frames being processed at once,
+            defaults to twice the number of workers
+        :param max_retries: number of times a frame is resubmitted after its worker
+            crashed before WorkerCrashedError is raised for it
+        :param mp_context: multiprocessing start method, defaults to the platform default
+        """
+        self.detector = detector
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.max_retries = max_retries
+        self._mp = multiprocessing.get_context(mp_context)
+        self._lock = threading.RLock()
+        self._task_ids = count()
+        self._tasks: Dict[int, _Task] = {}
+        self._free_slots = queue.Queue()
+        self._slots: List[shared_memory.SharedMemory] = [None] * self.max_in_flight
+        self._processes = []
+        self._task_queues = []
+        self._connections = []
+        self._collector = None
+        self._closed = threading.Event()
+        self.crashes = 0
+        self._finalizer = weakref.finalize(self, _release_slots, self._slots)
+        for slot in range(self.max_in_flight):
+            self._free_slots.put(slot)
+
+    @property
+    def started(self) -> bool:
+        return self._collector is not None
+
+    @property
+    def in_flight(self) -> int:
+        """
+        :return: number of frames currently being processed
+        """
+        return len(self._tasks)
+
+    def start(self):
+        """
+        Starts the worker processes. Called on the first submission if needed.
+        """
+        with self._lock:
+            if self.started:
+                return
+            self._connections = [None] * self.workers
+            for worker in range(self.workers):
+                self._task_queues.append(self._mp.Queue())
+                self._processes.append(self._spawn(worker))
+            self._collector = threading.Thread(target=self._collect, name='detection-collector', daemon=True)
+            self._collector.start()
+
+    def _spawn(self, worker: int):
+        reader, writer = self._mp.Pipe(duplex=False)
+        process = self._mp.Process(
+            target=_detection_worker,
+            args=(self.detector, self._task_queues[worker], writer),
+            daemon=True
+        )
+        process.start()
+        writer.close()
+        self._connections[worker] = reader
+        return process
+
+    def _slot_for(self, slot: int, nbytes: int) -> shared_memory.SharedMemory:
+        shm = self._slots[slot]
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                shm.close()
+                unlink_shared_memory(shm)
+            shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+            self._slots[slot] = shm
+        return shm
+
+    def _dispatch(self, task: _Task):
+        outstanding = [0] * self.workers
+        for other in self._tasks.values():
+            if other.worker is not None:
+                outstanding[other.worker] += 1
+        task.worker = outstanding.index(min(outstanding))
+        task.attempts += 1
+        self._task_queues[task.worker].put(task.message)
+
+    def submit(self, image: Image, *args, **kwargs) -> Future:
+        """
+        Submits a frame for detection.
+
+        :param image: image to detect objects in
+        :return: future resolving to the list of detections
+        """
+        if self._closed.is_set():
+            raise RuntimeError('DetectionProcessPool is closed')
+        self.start()
+        content = np.ascontiguousarray(image.image)
+        slot = self._free_slots.get()
+        shm = self._slot_for(slot, content.nbytes)
+        np.copyto(np.ndarray(content.shape, dtype=content.dtype, buffer=shm.buf), content)
+        task_id = next(self._task_ids)
+        message = (task_id, slot, shm.name, content.shape, content.dtype.str, image.filename, args, kwargs)
+        task = _Task(task_id, slot, message)
+        with self._lock:
+            self._tasks[task_id] = task
+            self._dispatch(task)
+        return task.future
+
+    def detect(self, image: Image, *args, **kwargs) -> List[Detection]:
+        """
+        Detects objects in a single frame, blocking until the result is available.
+
+        :param image: image to detect objects in
+        :return: list of detected objects
+        """
+        return self.submit(image, *args, **kwargs).result()
+
+    def map(self, images: Iterable[Image], *args, **kwargs) -> Generator[List[Detection], None, None]:
+        """
+        Detects objects in a sequence of frames, keeping up to max_in_flight frames in
+        the pool at once.
+
+        :param images: images to detect objects in
+        :return: generator of detections, in the order of the images
+        """
+        pending = deque()
+        for image in images:
+            pending.append(self.submit(image, *args, **kwargs))
+            while pending and pending[0].done():
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def _finish(self, task: _Task, detections: List[Detection]=None, error: BaseException=None):
+        del self._tasks[task.task_id]
+        self._free_slots.put(task.slot)
+        if error is not None:
+            task.future.set_exception(error)
+        else:
+            task.future.set_result(detections)
+
+    def _recover(self):
+        for worker, process in enumerate(self._processes):
+            if process.is_alive() or self._closed.is_set():
+                continue
+            self.crashes += 1
+            self._connections[worker].close()
+            self._task_queues[worker] = self._mp.Queue()
+            self._processes[worker] = self._spawn(worker)
+            lost = sorted(
+                (task for task in self._tasks.values() if task.worker == worker),
+                key=lambda task: task.task_id
+            )
+            for task in lost:
+                task.worker = None
+            for task in lost:
+                if task.attempts > self.max_retries:
+                    self._finish(task, error=WorkerCrashedError(
+                        f'Detection worker {worker} crashed while processing frame {task.message[5]!r}'
+                    ))
+                else:
+                    self._dispatch(task)
+
+    def _collect(self):
+        while not self._closed.is_set():
+            with self._lock:
+                connections = list(self._connections)
+            for connection in multiprocessing.connection.wait(connections, timeout=0.1):
+                try:
+                    task_id, detections, error = connection.recv()
+                except (EOFError, OSError):
+                    with self._lock:
+                        if connection in self._connections:
+                            self._processes[self._connections.index(connection)].join(timeout=1)
+                    continue
+                with self._lock:
+                    task = self._tasks.get(task_id)
+                    if task is not None:
+                        self._finish(task, detections, error)
+            with self._lock:
+                self._recover()
+
+    def close(self):
+        """
+        Stops the worker processes and releases the shared memory slots.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self.started:
+            self._collector.join()
+            for task_queue in self._task_queues:
+                task_queue.put(None)
+            for process in self._processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            for connection in self._connections:
+                connection.close()
+            for task in list(self._tasks.values()):
+                task.future.cancel()
+            self._tasks.clear()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
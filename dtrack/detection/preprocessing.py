@@ -0,0 +1,200 @@
+from typing import List, Sequence, Tuple
+import cv2
+import numpy as np
+from ..util import Box, Image, ScaleFactor
+
+
+class LetterboxTransform:
+    """
+    Maps a frame to a detector input: input = frame * scale + offset, in pixels.
+    """
+
+    def __init__(self, scale: ScaleFactor, offset: Tuple[float, float], source_scale_factor: ScaleFactor):
+        """
+        :param scale: factors from frame pixels to input pixels
+        :param offset: (x, y) position of the frame's top left corner in the input
+        :param source_scale_factor: size of the frame
+        """
+        self.scale = scale
+        self.offset = offset
+        self.source_scale_factor = source_scale_factor
+
+    def to_source(self, boxes: np.ndarray) -> np.ndarray:
+        """
+        Maps boxes from input pixels to frame pixels, all at once.
+
+        :param boxes: (N, 4) or (N, 5) boxes as cx, cy, width, height[, angle] in input pixels
+        :return: boxes in frame pixels, angles unchanged
+        """
+        boxes = np.array(boxes, dtype=np.float64)
+        if not len(boxes):
+            return boxes
+        scale = np.array([self.scale.x, self.scale.y])
+        boxes[:, 0:2] -= self.offset
+        boxes[:, 0:2] /= scale
+        boxes[:, 2:4] /= scale
+        return boxes
+
+    def to_source_boxes(self, boxes: np.ndarray) -> List[Box]:
+        """
+        :param boxes: (N, 4) or (N, 5) boxes as cx, cy, width, height[, angle] in input pixels
+        :return: boxes in frame pixels
+        """
+        return [
+            Box(float(box[0]), float(box[1]), float(box[2]), float(box[3]),
+                float(box[4]) if len(box) > 4 else 0.0, self.source_scale_factor)
+            for box in self.to_source(boxes)
+        ]
+
+
+class _Buffers:
+
+    def __init__(self, height: int, width: int, channels: int, output_shape: Tuple[int, ...], dtype: np.dtype):
+        self.canvas = np.empty((height, width, channels), dtype=np.uint8)
+        self.output = np.empty(output_shape, dtype=dtype)
+        self.placement = None
+
+
+class LetterboxPreprocessor:
+    """
+    Turns frames into detector inputs: resizes them keeping their aspect ratio and pads
+    them to the input size (or stretches them), converts BGR to RGB, normalizes and
+    transposes to channels first. Every step writes into buffers allocated once, so
+    preprocessing a frame allocates no full size arrays.
+
+    The output is a view of a buffer that is overwritten by later calls. With a pool of
+    buffer_count buffers, the outputs of that many calls can be in use at once, for
+    example while a previous frame is still being inferred. A preprocessor must not be
+    used from several threads at once. Batches are written into buffers sized for the
+    largest batch so far, so the memory used does not grow with the number of batch sizes.
+    """
+
+    def __init__(
+            self,
+            size: Tuple[int, int],
+            letterbox: bool=True,
+            pad_value: int=114,
+            rgb: bool=True,
+            scale: float=1 / 255,
+            mean: Sequence[float]=None,
+            std: Sequence[float]=None,
+            channels_first: bool=True,
+            dtype: np.dtype=np.float32,
+            interpolation: int=cv2.INTER_LINEAR,
+            buffer_count: int=1
+    ):
+        """
+        :param size: (width, height) of the detector input
+        :param letterbox: whether to keep the aspect ratio and pad, or stretch frames to the size
+        :param pad_value: value of the padding pixels
+        :param rgb: whether to convert BGR frames to RGB
+        :param scale: factor pixel values are multiplied by, before the mean is subtracted
+        :param mean: per channel mean subtracted after scaling
+        :param std: per channel standard deviation divided by after subtracting the mean
+        :param channels_first: whether the output is (C, H, W) rather than (H, W, C)
+        :param dtype: data type of the output
+        :param interpolation: OpenCV interpolation flag used to resize
+        :param buffer_count: number of output buffers used in turn
+        """
+        if buffer_count < 1:
+            raise ValueError('buffer_count must be at least 1')
+        self.size = tuple(size)
+        self.letterbox = letterbox
+        self.pad_value = pad_value
+        self.rgb = rgb
+        self.channels_first = channels_first
+        self.dtype = np.dtype(dtype)
+        self.interpolation = interpolation
+        self.buffer_count = buffer_count
+        mean = np.zeros(1) if mean is None else np.asarray(mean, dtype=np.float64)
+        std = np.ones(1) if std is None else np.asarray(std, dtype=np.float64)
+        # (x * scale - mean) / std == x * multiplier - offset
+        compute_dtype = self.dtype if self.dtype.kind == 'f' else np.dtype(np.float32)
+        self._multiplier = (scale / std).astype(compute_dtype)
+        self._offset = (mean / std).astype(compute_dtype)
+        self._identity = scale == 1 and not np.any(mean) and np.all(std == 1)
+        self._buffers = {}
+        self._next = {}
+        self._resized = {}
+
+    def _placement(self, width: int, height: int) -> Tuple[ScaleFactor, int, int, int, int]:
+        input_width, input_height = self.size
+        if not self.letterbox:
+            return ScaleFactor(input_width / width, input_height / height), 0, 0, input_width, input_height
+        ratio = min(input_width / width, input_height / height)
+        resized_width = max(1, int(round(width * ratio)))
+        resized_height = max(1, int(round(height * ratio)))
+        left = (input_width - resized_width) // 2
+        top = (input_height - resized_height) // 2
+        return ScaleFactor(resized_width / width, resized_height / height), left, top, resized_width, resized_height
+
+    def _buffers_for(self, channels: int, batch_size: int=None) -> _Buffers:
+        # Each pool of buffers takes its turns on its own. Batch buffers hold the largest batch
+        # so far, smaller batches use the start of them.
+        pool = (channels, batch_size is not None)
+        index = self._next.get(pool, 0)
+        self._next[pool] = (index + 1) % self.buffer_count
+        buffers = self._buffers.get(pool + (index,))
+        if buffers is None or batch_size is not None and len(buffers.output) < batch_size:
+            width, height = self.size
+            shape = (channels, height, width) if self.channels_first else (height, width, channels)
+            if batch_size is not None:
+                shape = (batch_size,) + shape
+            buffers = _Buffers(height, width, channels, shape, self.dtype)
+            self._buffers[pool + (index,)] = buffers
+        return buffers
+
+    def _resize(self, content: np.ndarray, width: int, height: int) -> np.ndarray:
+        if (content.shape[1], content.shape[0]) == (width, height):
+            return content
+        key = (width, height, content.shape[2:], content.dtype.str)
+        resized = cv2.resize(content, (width, height), dst=self._resized.get(key), interpolation=self.interpolation)
+        self._resized[key] = resized
+        return resized
+
+    def _fill(self, image: Image, buffers: _Buffers, output: np.ndarray) -> LetterboxTransform:
+        content = image.image
+        height, width = content.shape[:2]
+        scale, left, top, resized_width, resized_height = self._placement(width, height)
+        canvas = buffers.canvas
+        if buffers.placement != (left, top, resized_width, resized_height):
+            canvas[...] = self.pad_value
+            buffers.placement = (left, top, resized_width, resized_height)
+        region = canvas[top:top + resized_height, left:left + resized_width]
+        region[...] = self._resize(content, resized_width, resized_height).reshape(region.shape)
+
+        pixels = canvas[:, :, ::-1] if self.rgb and canvas.shape[2] == 3 else canvas
+        target = output.transpose(1, 2, 0) if self.channels_first else output
+        if self._identity:
+            np.copyto(target, pixels, casting='unsafe')
+        else:
+            np.multiply(pixels, self._multiplier, out=target, casting='unsafe')
+            np.subtract(target, self._offset, out=target, casting='unsafe')
+        return LetterboxTransform(scale, (left, top), image.scale_factor)
+
+    @staticmethod
+    def _channels(image: Image) -> int:
+        content = image.image
+        return 1 if content.ndim == 2 else content.shape[2]
+
+    def __call__(self, image: Image) -> Tuple[np.ndarray, LetterboxTransform]:
+        """
+        Preprocesses a frame.
+
+        :param image: frame to preprocess
+        :return: detector input, a view of a reused buffer, and the transform from the frame to it
+        """
+        buffers = self._buffers_for(self._channels(image))
+        return buffers.output, self._fill(image, buffers, buffers.output)
+
+    def batch(self, images: List[Image]) -> Tuple[np.ndarray, List[LetterboxTransform]]:
+        """
+        Preprocesses several frames into one batch buffer.
+
+        :param images: frames to preprocess, with the same number of channels
+        :return: (N, ...) detector input, a view of a reused buffer, and the transform of each frame
+        """
+        buffers = self._buffers_for(self._channels(images[0]), len(images))
+        output = buffers.output[:len(images)]
+        transforms = [self._fill(image, buffers, output[index]) for index, image in enumerate(images)]
+        return output, transforms
@@ -0,0 +1,174 @@
+from typing import Iterable, List, Sequence, Tuple, Union
+import numpy as np
+from ..util import Detection, DetectionBatch, Image, ScaleFactor
+from .detector import ObjectDetector
+
+
+Region = Tuple[int, int, int, int]
+"""A rectangular image region in pixels, as (x1, y1, x2, y2) with exclusive ends."""
+
+
+def crop(image: Image, region: Region) -> Image:
+    """
+    Crops a region of an image without copying the pixels.
+
+    :param image: image to crop
+    :param region: region to crop
+    :return: image backed by a view of the region
+    """
+    x1, y1, x2, y2 = region
+    return Image(image.filename, image.image[y1:y2, x1:x2])
+
+
+def clip_region(region: Sequence[float], width: int, height: int) -> Region:
+    """
+    :param region: region, possibly with fractional or out of bounds coordinates
+    :param width: image width
+    :param height: image height
+    :return: integer region inside the image
+    """
+    x1, y1, x2, y2 = region
+    x1, y1 = max(0, int(np.floor(x1))), max(0, int(np.floor(y1)))
+    x2, y2 = min(width, int(np.ceil(x2))), min(height, int(np.ceil(y2)))
+    return x1, y1, max(x1, x2), max(y1, y2)
+
+
+def _axis_starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)
+    return starts
+
+
+def tile_regions(width: int, height: int, tile_size: Tuple[int, int], overlap: float=0.2) -> List[Region]:
+    """
+    Splits an image into overlapping tiles covering all of it. The last tile in each
+    direction is aligned with the image edge, so every tile has the full tile size
+    unless the image is smaller than a tile.
+
+    :param width: image width
+    :param height: image height
+    :param tile_size: tile (width, height)
+    :param overlap: fraction of a tile shared with its neighbour
+    :return: tile regions, row by row
+    """
+    if not 0 <= overlap < 1:
+        raise ValueError('overlap must be in [0, 1)')
+    tile_width, tile_height = tile_size
+    stride_x = max(1, int(tile_width * (1 - overlap)))
+    stride_y = max(1, int(tile_height * (1 - overlap)))
+    return [
+        (x, y, min(x + tile_width, width), min(y + tile_height, height))
+        for y in _axis_starts(height, tile_height, stride_y)
+        for x in _axis_starts(width, tile_width, stride_x)
+    ]
+
+
+def map_to_frame(
+        detections: Union[List[Detection], DetectionBatch],
+        region: Region,
+        frame_scale_factor: ScaleFactor
+) -> DetectionBatch:
+    """
+    Maps detections made on a crop back to the coordinates of the full frame, whose
+    scale factor is its size in pixels.
+
+    :param detections: detections on the crop, with boxes relative to the crop's scale factor
+    :param region: region the crop was taken from
+    :param frame_scale_factor: scale factor of the full frame
+    :return: detections with boxes relative to the frame's scale factor
+    """
+    batch = DetectionBatch.from_detections(detections)
+    if not len(batch):
+        return batch
+    x1, y1, x2, y2 = region
+    to_crop_pixels = np.array([x2 - x1, y2 - y1]) / batch.scale_factors
+    boxes = batch.boxes.copy()
+    boxes[:, 0:2] = boxes[:, 0:2] * to_crop_pixels + (x1, y1)
+    boxes[:, 2:4] *= to_crop_pixels
+    return DetectionBatch(
+        batch.categories,
+        batch.label_codes,
+        batch.confidences,
+        boxes,
+        np.tile([frame_scale_factor.x, frame_scale_factor.y], (len(batch), 1)),
+        batch.subclass_categories,
+        batch.subclass_codes,
+        batch.masks
+    )
+
+
+def to_frame_pixels(boxes: np.ndarray, scale_factors: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    :param boxes: (N, 5) boxes relative to their scale factors
+    :param scale_factors: (N, 2) scale factors of the boxes
+    :param width: frame width in pixels
+    :param height: frame height in pixels
+    :return: (N, 5) boxes in frame pixels
+    """
+    boxes = np.array(boxes, dtype=np.float64)
+    if not len(boxes):
+        return boxes
+    factor = np.array([width, height]) / scale_factors
+    boxes[:, 0:2] *= factor
+    boxes[:, 2:4] *= factor
+    return boxes
+
+
+def detect_regions(
+        detector: ObjectDetector,
+        image: Image,
+        regions: Iterable[Region],
+        *args,
+        **kwargs
+) -> DetectionBatch:
+    """
+    Runs a detector on several regions of an image as one batch, cropping without copies,
+    and maps the detections back to the frame.
+
+    :param detector: detector to run
+    :param image: full frame
+    :param regions: regions to run the detector on
+    :return: detections of all regions, relative to the frame's scale factor
+    """
+    regions = list(regions)
+    if not regions:
+        return DetectionBatch.empty()
+    results = detector.detect_batch([crop(image, region) for region in regions], *args, **kwargs)
+    frame_scale_factor = image.scale_factor
+    return DetectionBatch.concatenate(
+        map_to_frame(detections, region, frame_scale_factor) for detections, region in zip(results, regions)
+    )
+
+
+def _overlaps(a: Region, b: Region) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def merge_regions(regions: Iterable[Region]) -> List[Region]:
+    """
+    Merges overlapping regions into their bounding regions, repeating until no two
+    regions overlap.
+
+    :param regions: regions to merge
+    :return: non-overlapping regions
+    """
+    merged = [tuple(region) for region in regions if region[2] > region[0] and region[3] > region[1]]
+    changed = True
+    while changed:
+        changed = False
+        result = []
+        for region in merged:
+            for index, other in enumerate(result):
+                if _overlaps(region, other):
+                    result[index] = (
+                        min(region[0], other[0]), min(region[1], other[1]),
+                        max(region[2], other[2]), max(region[3], other[3])
+                    )
+                    changed = True
+                    break
+            else:
+                result.append(region)
+        merged = result
+    return merged
@@ -0,0 +1,184 @@
+import mmap
+import os
+import threading
+from typing import List, Union
+import numpy as np
+from ..util import Detection, DetectionBatch, Image
+from ..util.detection_codec import decode_detections, encode_detections
+from .detector import ObjectDetector
+
+
+_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4')])
+
+
+def _index_path(path: str) -> str:
+    return path + '.idx'
+
+
+class DetectionLogWriter:
+    """
+    Appends the detections of each frame to a compact binary log. Every frame is one
+    record of category tables followed by the detection columns, the offset and length
+    of each record are appended to an index file next to the log.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the log, appended to if it exists. The index is written
+            to the same path with an .idx suffix.
+        """
+        self.path = path
+        self._data = open(path, 'ab')
+        self._index = open(_index_path(path), 'ab')
+        self._offset = self._data.tell()
+        self._lock = threading.Lock()
+
+    def append(self, detections: Union[List[Detection], DetectionBatch]):
+        """
+        Appends the detections of the next frame. Safe to call from several threads, each
+        record and its index entry are written together.
+
+        :param detections: detections of the frame
+        """
+        record = encode_detections(detections)
+        entry = np.array([(0, len(record))], dtype=_INDEX_DTYPE)
+        with self._lock:
+            entry['offset'] = self._offset
+            self._data.write(record)
+            self._index.write(entry.tobytes())
+            self._offset += len(record)
+
+    def flush(self):
+        """
+        Writes buffered records to disk, so readers can see them.
+        """
+        with self._lock:
+            self._data.flush()
+            self._index.flush()
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DetectionLogReader:
+    """
+    Reads a detection log written by DetectionLogWriter. The log is memory mapped and
+    the detection columns are read with np.frombuffer, so reading a frame only parses
+    its category tables.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: path of the log
+        """
+        self.path = path
+        self._index = np.fromfile(_index_path(path), dtype=_INDEX_DTYPE)
+        self._file = open(path, 'rb')
+        self._map = None
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def read(self, frame: int) -> DetectionBatch:
+        """
+        :param frame: index of the frame in the log
+        :return: detections of the frame
+        """
+        if not 0 <= frame < len(self):
+            raise IndexError(f'Frame {frame} is not in the detection log')
+        return decode_detections(self._map, int(self._index[frame]['offset']))
+
+    def close(self):
+        """
+        Closes the log. Batches read before still view the mapping, it is then unmapped
+        once the last of them is garbage collected.
+        """
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingObjectDetector(ObjectDetector):
+    """
+    Wraps an object detector and appends the detections of every frame to a detection
+    log, in the order the frames were detected.
+    """
+
+    def __init__(self, detector: ObjectDetector, path: str):
+        """
+        :param detector: detector to record
+        :param path: path of the log
+        """
+        self.detector = detector
+        self.writer = DetectionLogWriter(path)
+
+    def detect(self, image: Image, *args, **kwargs) -> List[Detection]:
+        detections = self.detector.detect(image, *args, **kwargs)
+        self.writer.append(detections)
+        return detections
+
+    def detect_batch(self, images: List[Image], *args, **kwargs) -> List[List[Detection]]:
+        results = self.detector.detect_batch(images, *args, **kwargs)
+        for detections in results:
+            self.writer.append(detections)
+        return results
+
+    def close(self):
+        """
+        Closes the log.
+        """
+        self.writer.close()
+
+
+class ReplayObjectDetector(ObjectDetector):
+    """
+    Object detector that returns the detections recorded in a detection log instead of
+    running a model. Each call returns the next frame of the log, the image is ignored.
+    """
+
+    def __init__(self, path: str, loop: bool=False):
+        """
+        :param path: path of the log
+        :param loop: whether to start from the first frame again after the last one
+        """
+        self.reader = DetectionLogReader(path)
+        self.loop = loop
+        self.position = 0
+
+    def seek(self, frame: int):
+        """
+        :param frame: index of the frame the next call returns
+        """
+        self.position = frame
+
+    def detect(self, image: Image, *args, **kwargs) -> DetectionBatch:
+        if self.position >= len(self.reader) and self.loop:
+            self.position = 0
+        detections = self.reader.read(self.position)
+        self.position += 1
+        return detections
+
+    def close(self):
+        """
+        Closes the log.
+        """
+        self.reader.close()
@@ -0,0 +1,134 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+import numpy as np
+from ..util import DetectionBatch, Image
+from ..util.nms import batched_nms, box_corners, nms
+from .detector import ObjectDetector
+from .regions import Region, crop, map_to_frame, tile_regions
+
+
+def _touches_seam(batch: DetectionBatch, region: Region, width: int, height: int, tolerance: float=1.0) -> np.ndarray:
+    """
+    :return: whether each box touches an edge of its tile that lies inside the frame,
+        meaning the object may be cut off
+    """
+    if not len(batch):
+        return np.zeros(0, dtype=bool)
+    corners = box_corners(batch.boxes)
+    x1, y1 = corners[:, :, 0].min(axis=1), corners[:, :, 1].min(axis=1)
+    x2, y2 = corners[:, :, 0].max(axis=1), corners[:, :, 1].max(axis=1)
+    left, top, right, bottom = region
+    touches = np.zeros(len(batch), dtype=bool)
+    if left > 0:
+        touches |= x1 <= left + tolerance
+    if top > 0:
+        touches |= y1 <= top + tolerance
+    if right < width:
+        touches |= x2 >= right - tolerance
+    if bottom < height:
+        touches |= y2 >= bottom - tolerance
+    return touches
+
+
+class TiledObjectDetector(ObjectDetector):
+    """
+    Runs a detector on overlapping tiles of a high resolution frame, so small objects
+    are seen at full resolution, and merges the duplicates found on tile seams with
+    non-maximum suppression.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            tile_size: Tuple[int, int]=(640, 640),
+            overlap: float=0.2,
+            iou_threshold: float=0.5,
+            metric: str='ios',
+            class_agnostic: bool=False,
+            include_full_frame: bool=False,
+            workers: int=None
+    ):
+        """
+        :param detector: detector to run on every tile
+        :param tile_size: tile (width, height) in pixels
+        :param overlap: fraction of a tile shared with its neighbour. Objects smaller
+            than the overlap always appear whole in at least one tile.
+        :param iou_threshold: overlap above which duplicate detections are merged
+        :param metric: overlap metric used for merging, see dtrack.util.nms.box_iou. The
+            default intersection over the smaller box also merges objects cut off by a
+            tile edge into the whole detection from a neighbouring tile.
+        :param class_agnostic: whether detections of different classes are merged
+        :param include_full_frame: whether to also run the detector on the whole frame,
+            to find objects larger than a tile
+        :param workers: run tiles concurrently on this many threads with detect, for
+            detectors that release the GIL. By default tiles are sent as one detect_batch.
+        """
+        self.detector = detector
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self.metric = metric
+        self.class_agnostic = class_agnostic
+        self.include_full_frame = include_full_frame
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tile') if workers else None
+
+    def regions(self, image: Image):
+        """
+        :param image: frame to tile
+        :return: tile regions of the frame
+        """
+        height, width = image.image.shape[:2]
+        regions = tile_regions(width, height, self.tile_size, self.overlap)
+        if self.include_full_frame and regions != [(0, 0, width, height)]:
+            regions.append((0, 0, width, height))
+        return regions
+
+    def detect(self, image: Image, *args, **kwargs) -> DetectionBatch:
+        """
+        Detect objects in the given image, tile by tile.
+
+        :param image: image to detect objects in
+        :return: merged detections relative to the image's scale factor
+        """
+        regions = self.regions(image)
+        crops = [crop(image, region) for region in regions]
+        if self._executor is None:
+            results = self.detector.detect_batch(crops, *args, **kwargs)
+        else:
+            results = list(self._executor.map(lambda tile: self.detector.detect(tile, *args, **kwargs), crops))
+        return self.merge(image, regions, results)
+
+    def merge(self, image: Image, regions: List[Region], results: List[DetectionBatch]) -> DetectionBatch:
+        """
+        Maps the detections of each tile to the frame and merges duplicates. Detections
+        cut off by a tile edge inside the frame rank below whole ones, so the whole
+        detection of an object on a seam is the one kept.
+
+        :param image: full frame
+        :param regions: tile regions
+        :param results: detections for each tile
+        :return: merged detections relative to the image's scale factor
+        """
+        height, width = image.image.shape[:2]
+        frame_scale_factor = image.scale_factor
+        batches = [map_to_frame(result, region, frame_scale_factor) for result, region in zip(results, regions)]
+        touches = np.concatenate(
+            [_touches_seam(batch, region, width, height) for batch, region in zip(batches, regions)]
+        )
+        detections = DetectionBatch.concatenate(batches)
+        if not len(detections):
+            return detections
+        ranking = detections.confidences - touches
+        if self.class_agnostic:
+            keep = nms(detections.boxes, ranking, self.iou_threshold, metric=self.metric)
+        else:
+            keep = batched_nms(detections.boxes, ranking, detections.label_codes, self.iou_threshold, metric=self.metric)
+        return detections.select(keep)
+
+    def close(self):
+        """
+        Stops the tile threads.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
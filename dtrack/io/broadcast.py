@@ -0,0 +1,237 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, List
+from ..application import DTrackApplication
+from ..util import Image
+from .stream import ImageStream
+
+
+_POLL_INTERVAL = 0.05
+_END = object()
+DROP_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+
+class BroadcastSubscription(ImageStream):
+    """The image stream of one consumer of a broadcast stream hub. Frames wait in a bounded queue
+        of their own, and the drop policy decides what happens when the consumer falls behind.
+    """
+
+    def __init__(self, hub: 'BroadcastStreamHub', queue_size: int, drop_policy: str):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f'Unknown drop policy {drop_policy!r}, expected one of {DROP_POLICIES}')
+        super().__init__()
+        self.hub = hub
+        self.drop_policy = drop_policy
+        self.dropped_frames = 0
+        self.closed = False
+        # Frames take one of queue_size slots, the end of the stream does not, so it is never
+        # dropped and never costs a frame.
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(queue_size)
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of frames waiting.
+        """
+        return self._queue.qsize()
+
+    def _offer(self, item, stop: threading.Event):
+        if self.closed:
+            return
+        if item is _END:
+            self._queue.put(item)
+            return
+        if self.drop_policy == 'block':
+            while not self._slots.acquire(timeout=_POLL_INTERVAL):
+                if stop.is_set() or self.closed:
+                    return
+        elif not self._slots.acquire(blocking=False):
+            self.dropped_frames += 1
+            if self.drop_policy == 'drop_newest':
+                return
+            try:
+                # The slot of the dropped frame is reused for the new one
+                self._queue.get_nowait()
+            except queue.Empty:
+                # The consumer took it meanwhile, and released its slot
+                self._slots.acquire()
+        self._queue.put(item)
+
+    def _advance(self) -> None:
+        if self.closed:
+            self.current_image = None
+            return
+        item = self._queue.get()
+        if item is _END:
+            self.current_image = None
+            return
+        self._slots.release()
+        self.current_image = item
+
+    def close(self):
+        """Stops receiving frames. The hub no longer waits for this consumer.
+        """
+        self.closed = True
+        self.current_image = None
+        self.hub.unsubscribe(self)
+
+
+class BroadcastStreamHub:
+    """Decodes a stream once and hands its frames to several consumers, each reading its own
+        BroadcastSubscription, so different pipelines can process the same source without each
+        decoding it.
+
+        All consumers share the content of a frame, as a read-only array. Each consumer gets its
+        own Image of it, so detections added by one pipeline are not seen by the others, and the
+        content is freed once the last consumer has dropped its Image. Pipelines that modify the
+        frame content in place must work on a copy.
+    """
+
+    def __init__(self, stream: ImageStream):
+        """Creates a new broadcast hub.
+
+        Args:
+            stream (ImageStream): The stream to decode.
+        """
+        self.stream = stream
+        self.frames = 0
+        self.error = None
+        self._subscriptions: List[BroadcastSubscription] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, queue_size: int=4, drop_policy: str='block') -> BroadcastSubscription:
+        """Adds a consumer. A consumer added after the hub started gets the frames decoded from then on.
+
+        Args:
+            queue_size (int, optional): The maximum number of frames waiting for the consumer. Defaults to 4.
+            drop_policy (str, optional): What to do with a new frame when the queue is full: 'block' waits for
+                the consumer, which slows down the source and every other consumer, 'drop_oldest' drops the
+                oldest waiting frame and 'drop_newest' drops the new frame. Defaults to 'block'.
+
+        Returns:
+            BroadcastSubscription: The image stream of the consumer.
+        """
+        subscription = BroadcastSubscription(self, queue_size, drop_policy)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: BroadcastSubscription):
+        """Removes a consumer.
+
+        Args:
+            subscription (BroadcastSubscription): The subscription of the consumer.
+        """
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def _broadcast(self):
+        try:
+            for image in self.stream:
+                if self._stop.is_set():
+                    break
+                content = image.image.view()
+                content.flags.writeable = False
+                with self._lock:
+                    subscriptions = list(self._subscriptions)
+                for subscription in subscriptions:
+                    subscription._offer(Image(
+                        image.filename,
+                        content,
+                        timestamp=image.timestamp,
+                        frame_index=image.frame_index,
+                        source_scale_factor=image._source_scale_factor
+                    ), self._stop)
+                self.frames += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._lock:
+                subscriptions = list(self._subscriptions)
+            for subscription in subscriptions:
+                subscription._offer(_END, self._stop)
+
+    def start(self):
+        """Starts decoding on a dedicated thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._broadcast, name='broadcast', daemon=True)
+        self._thread.start()
+
+    def run(
+            self,
+            applications: Dict[str, DTrackApplication],
+            on_result: Callable[[str, Dict[str, Any]], None]=None,
+            queue_size: int=4,
+            drop_policy: str='block',
+    ):
+        """Processes the stream with several applications, each on a thread of its own, until the
+            stream ends.
+
+        Args:
+            applications (Dict[str, DTrackApplication]): The applications, by name.
+            on_result (Callable[[str, Dict[str, Any]], None], optional): Called with the name of the application
+                and the result of each frame it processed, from the application's thread. Defaults to None.
+            queue_size (int, optional): The maximum number of frames waiting for each application. Defaults to 4.
+            drop_policy (str, optional): The drop policy of each application, see subscribe. Defaults to 'block'.
+
+        Raises:
+            Exception: The first error raised by the stream or an application.
+        """
+        errors = []
+
+        def consume(name: str, application: DTrackApplication, subscription: BroadcastSubscription):
+            try:
+                for result in application.process_image_stream(subscription, progress_bar=False):
+                    if on_result is not None:
+                        on_result(name, result)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                subscription.close()
+
+        threads = [
+            threading.Thread(
+                target=consume,
+                args=(name, application, self.subscribe(queue_size, drop_policy)),
+                name=f'consume-{name}',
+                daemon=True
+            )
+            for name, application in applications.items()
+        ]
+        for thread in threads:
+            thread.start()
+        self.start()
+        for thread in threads:
+            thread.join()
+        self.close()
+        if self.error is not None:
+            raise self.error
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """Stops decoding and ends the streams of all consumers.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            subscriptions, self._subscriptions = self._subscriptions, []
+        for subscription in subscriptions:
+            subscription.closed = True
+            subscription._queue.put(_END)
+        if hasattr(self.stream, 'close'):
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
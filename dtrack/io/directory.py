@@ -0,0 +1,138 @@
+import glob
+import os
+import time
+from typing import Iterable, List
+import cv2
+from ..util import Image, ScaleFactor
+from ..util.image_cache import ImageContentCache
+from ..util.concurrency import Stage, StagedExecution
+from .stream import ImageStream
+
+
+IMAGE_EXTENSIONS = ('.bmp', '.jpeg', '.jpg', '.png', '.tif', '.tiff', '.webp')
+
+_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def list_images(path: str, pattern: str='*', extensions: Iterable[str]=IMAGE_EXTENSIONS) -> List[str]:
+    """Lists the image files in a directory, or matching a glob pattern, sorted by name.
+
+    Args:
+        path (str): A directory, or a glob pattern.
+        pattern (str, optional): The glob pattern of files in the directory. Defaults to '*'.
+        extensions (Iterable[str], optional): The file extensions to keep, case insensitive. Defaults to IMAGE_EXTENSIONS.
+
+    Returns:
+        List[str]: The paths of the images.
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, pattern)
+    extensions = tuple(extension.lower() for extension in extensions)
+    return sorted(
+        filename for filename in glob.glob(path)
+        if os.path.isfile(filename) and filename.lower().endswith(extensions)
+    )
+
+
+class DirectoryImageStream(ImageStream):
+    """An image stream over the image files in a directory, or matching a glob pattern. Files are
+        decoded ahead of the consumer on a pool of threads and handed on in order of their names.
+
+        JPEG files can be decoded at 1/2, 1/4 or 1/8 of their resolution at a fraction of the cost,
+        with reduction. The scale factor of such images is their reduced size, so detections on them
+        are relative to the reduced image, and source_scale_factor gives the size of the file.
+
+        With a content cache, images keep their pixels in the cache, within its byte budget, and
+        decode their file again when evicted content is used, so frames kept by tracked objects or
+        results do not grow memory without bound over long runs.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            pattern: str='*',
+            extensions: Iterable[str]=IMAGE_EXTENSIONS,
+            workers: int=4,
+            queue_size: int=8,
+            reduction: int=1,
+            grayscale: bool=False,
+            content_cache: ImageContentCache=None,
+    ):
+        """Creates a new directory image stream.
+
+        Args:
+            path (str): A directory, or a glob pattern.
+            pattern (str, optional): The glob pattern of files in the directory. Defaults to '*'.
+            extensions (Iterable[str], optional): The file extensions to keep. Defaults to IMAGE_EXTENSIONS.
+            workers (int, optional): The number of files decoded concurrently. Defaults to 4.
+            queue_size (int, optional): The maximum number of files decoded ahead. Defaults to 8.
+            reduction (int, optional): 1, 2, 4 or 8, the factor the resolution is reduced by while decoding. Defaults to 1.
+            grayscale (bool, optional): Whether to decode to single channel grayscale. Defaults to False.
+            content_cache (ImageContentCache, optional): The cache to keep decoded images in. Defaults to None,
+                for images holding their own pixels.
+        """
+        if reduction not in _COLOR_FLAGS:
+            raise ValueError('reduction must be 1, 2, 4 or 8')
+        super().__init__()
+        self.filenames = list_images(path, pattern, extensions)
+        self.reduction = reduction
+        self.grayscale = grayscale
+        self.content_cache = content_cache
+        self.flags = (_GRAYSCALE_FLAGS if grayscale else _COLOR_FLAGS)[reduction]
+        self.decode_stage = Stage('decode', self._decode, workers=workers)
+        self.execution = StagedExecution(enumerate(self.filenames), [self.decode_stage], queue_size=queue_size)
+        self.stall_time = 0.0
+        self._iterator = None
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def _decode(self, item) -> Image:
+        frame_index, filename = item
+        content = cv2.imread(filename, self.flags)
+        if content is None:
+            raise IOError(f'Could not read image {filename!r}')
+        height, width = content.shape[:2]
+        source_scale_factor = None
+        if self.reduction > 1:
+            source_scale_factor = ScaleFactor(width * self.reduction, height * self.reduction)
+        return Image(
+            filename,
+            content,
+            frame_index=frame_index,
+            source_scale_factor=source_scale_factor,
+            content_cache=self.content_cache,
+            imread_flags=self.flags
+        )
+
+    def _advance(self) -> None:
+        if self._iterator is None:
+            self._iterator = iter(self.execution)
+        start = time.perf_counter()
+        self.current_image = next(self._iterator, None)
+        self.stall_time += time.perf_counter() - start
+
+    def close(self):
+        """Stops decoding ahead.
+        """
+        if self._iterator is not None:
+            self._iterator.close()
+        else:
+            self.execution.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,72 @@
+import time
+from ..util import Image
+from ..util.concurrency import Stage, StagedExecution
+from .stream import ImageStream
+
+
+class PrefetchingImageStream(ImageStream):
+    """An image stream that reads ahead of its consumer. The wrapped stream is advanced on a
+        background thread and lazily loaded images are loaded by one or more loader threads, into
+        a bounded queue, so decoding and disk I/O overlap with processing. Frames are handed on in
+        the order of the wrapped stream.
+
+        stall_time is the time the consumer waited for frames: a consumer that stalls is I/O bound,
+        while a queue that stays full means the consumer is the bottleneck. loader_stall_time is the
+        time the loaders waited for the wrapped stream to deliver frames.
+    """
+
+    def __init__(self, stream: ImageStream, queue_size: int=4, workers: int=1):
+        """Creates a new prefetching image stream.
+
+        Args:
+            stream (ImageStream): The stream to read ahead of.
+            queue_size (int, optional): The maximum number of frames read ahead. Defaults to 4.
+            workers (int, optional): The number of frames loaded concurrently. Defaults to 1.
+        """
+        super().__init__()
+        self.stream = stream
+        self.load_stage = Stage('load', self._load, workers=workers)
+        self.execution = StagedExecution(stream, [self.load_stage], queue_size=queue_size)
+        self.stall_time = 0.0
+        self.frames = 0
+        self._iterator = None
+
+    @staticmethod
+    def _load(image: Image) -> Image:
+        image.image
+        return image
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of frames read ahead and waiting, loaded or not.
+        """
+        return sum(self.execution.queue_depths.values())
+
+    @property
+    def loader_stall_time(self) -> float:
+        """The time the loaders waited for the wrapped stream to deliver frames.
+        """
+        return self.load_stage.stall_time
+
+    def _advance(self) -> None:
+        if self._iterator is None:
+            self._iterator = iter(self.execution)
+        start = time.perf_counter()
+        self.current_image = next(self._iterator, None)
+        self.stall_time += time.perf_counter() - start
+        if self.current_image is not None:
+            self.frames += 1
+
+    def close(self):
+        """Stops reading ahead. Frames already read ahead are discarded.
+        """
+        if self._iterator is not None:
+            self._iterator.close()
+        else:
+            self.execution.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,161 @@
+import os
+from typing import Iterable, Tuple
+import cv2
+import numpy as np
+from ..util import Image
+from .directory import DirectoryImageStream
+from .stream import ImageStream
+from .video import VideoFileStream
+
+
+def _set_frame_count(path: str, frame_count: int):
+    """Rewrites the header of a .npy file to hold fewer frames, and cuts off the rest of the
+        data. The new header is padded to the length of the old one, so the data stays in place.
+    """
+    with open(path, 'r+b') as file:
+        version = np.lib.format.read_magic(file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(file)
+        data_offset = file.tell()
+        shape = (frame_count,) + shape[1:]
+        header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order, 'shape': shape})
+        length_size = 2 if version == (1, 0) else 4
+        prefix = np.lib.format.magic(*version)
+        header_length = data_offset - len(prefix) - length_size
+        header = header.ljust(header_length - 1) + '\n'
+        file.seek(len(prefix))
+        file.write(header_length.to_bytes(length_size, 'little'))
+        file.write(header.encode('latin1'))
+        file.truncate(data_offset + int(np.prod(shape)) * dtype.itemsize)
+
+
+def write_raw_frames(images: Iterable[Image], path: str, frame_count: int) -> int:
+    """Writes frames of equal shape to a raw frame file: a .npy file holding an array of
+        (frame_count, height, width[, channels]) frames, which can be memory mapped.
+
+    Args:
+        images (Iterable[Image]): The frames to write.
+        path (str): The path of the file.
+        frame_count (int): The number of frames. Extra frames are ignored.
+
+    Returns:
+        int: The number of frames written. If the images run out early the file is cut
+            down to the frames written. If writing fails the file is removed.
+    """
+    frames = None
+    created = False
+    written = 0
+    try:
+        for image in images:
+            if written == frame_count:
+                break
+            content = image.image
+            if frames is None:
+                frames = np.lib.format.open_memmap(path, mode='w+', dtype=content.dtype, shape=(frame_count,) + content.shape)
+                created = True
+            elif content.shape != frames.shape[1:]:
+                raise ValueError(f'Frame {written} has shape {content.shape}, expected {frames.shape[1:]}')
+            frames[written] = content
+            written += 1
+        if frames is None:
+            raise ValueError('No frames to write')
+        frames.flush()
+        frames = None
+        if written < frame_count:
+            _set_frame_count(path, written)
+    except BaseException:
+        frames = None
+        if created:
+            os.remove(path)
+        raise
+    return written
+
+
+def _count_video_frames(path: str, frame_step: int) -> int:
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f'Could not open video source {path!r}')
+    count = 0
+    while capture.grab():
+        count += 1
+    capture.release()
+    return count // frame_step
+
+
+def convert_video(path: str, output: str, frame_step: int=1, size: Tuple[int, int]=None) -> int:
+    """Converts a video to a raw frame file. The frames are counted with grab first, which
+        does not decode them, as the frame count reported by containers is not reliable.
+
+    Args:
+        path (str): The path of the video.
+        output (str): The path of the raw frame file.
+        frame_step (int, optional): Only every frame_step-th frame is kept. Defaults to 1.
+        size (Tuple[int, int], optional): The (width, height) to resize frames to. Defaults to None.
+
+    Returns:
+        int: The number of frames written.
+    """
+    frame_count = _count_video_frames(path, frame_step)
+    with VideoFileStream(path, frame_step=frame_step, size=size) as stream:
+        return write_raw_frames(stream, output, frame_count)
+
+
+def convert_images(path: str, output: str, pattern: str='*', reduction: int=1, grayscale: bool=False) -> int:
+    """Converts the images in a directory, or matching a glob pattern, to a raw frame file. All
+        images must have the same size.
+
+    Args:
+        path (str): A directory, or a glob pattern.
+        output (str): The path of the raw frame file.
+        pattern (str, optional): The glob pattern of files in the directory. Defaults to '*'.
+        reduction (int, optional): 1, 2, 4 or 8, the factor the resolution is reduced by while decoding. Defaults to 1.
+        grayscale (bool, optional): Whether to decode to single channel grayscale. Defaults to False.
+
+    Returns:
+        int: The number of frames written.
+    """
+    with DirectoryImageStream(path, pattern, reduction=reduction, grayscale=grayscale) as stream:
+        return write_raw_frames(stream, output, len(stream))
+
+
+class RawFrameStream(ImageStream):
+    """An image stream over a raw frame file. The file is memory mapped and every image is a view
+        of its frame in the mapping, so replaying is limited by the page cache rather than by
+        decoding. Images are read only unless the file is mapped copy on write.
+    """
+
+    def __init__(self, path: str, start: int=0, stop: int=None, step: int=1, mmap_mode: str='r'):
+        """Opens a raw frame file.
+
+        Args:
+            path (str): The path of the file.
+            start (int, optional): The index of the first frame. Defaults to 0.
+            stop (int, optional): The index after the last frame. Defaults to None, for all frames.
+            step (int, optional): The step between frames. Defaults to 1.
+            mmap_mode (str, optional): 'r' for read only images, 'c' for images that can be written
+                to without changing the file. Defaults to 'r'.
+        """
+        super().__init__()
+        self.path = path
+        self.frames = np.load(path, mmap_mode=mmap_mode)
+        self.indices = range(*slice(start, stop, step).indices(len(self.frames)))
+        self._position = 0
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def seek(self, position: int):
+        """Continues the stream at the given position.
+
+        Args:
+            position (int): The position in the stream, counted in steps from the first frame.
+        """
+        self._position = position
+
+    def _advance(self) -> None:
+        if self._position >= len(self.indices):
+            self.current_image = None
+            return
+        frame_index = self.indices[self._position]
+        self._position += 1
+        self.current_image = Image(self.path, self.frames[frame_index], frame_index=frame_index)
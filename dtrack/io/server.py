@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import importlib
+import json
+import struct
+import time
+from collections import deque
+from itertools import count
+from typing import Any, Callable, Dict, List, Union
+import numpy as np
+from ..application import DTrackApplication
+from ..util import Detection, DetectionBatch
+from ..util.detection_codec import decode_detections, encode_detections
+from ..util.json_encoder import DTrackJsonEncoder
+
+
+# Every message is a header of (message type, request id, frame number, payload length)
+# followed by the payload. Requests carry detections encoded with encode_detections,
+# responses carry the formatted results as JSON.
+MESSAGE_HEADER = struct.Struct('<BIQI')
+DETECTIONS = 1
+CLOSE = 2
+RESULT = 1
+ERROR = 2
+
+
+class TrackingServerError(RuntimeError):
+    """Raised by the client when the server failed to process a request.
+    """
+    pass
+
+
+class ServerStatistics:
+    """Throughput and latency of a tracking server. Latencies are measured from reading a
+        request to writing its response, over the most recent requests.
+    """
+
+    def __init__(self, window: int=10000):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.handoffs = 0
+        self.latencies = deque(maxlen=window)
+
+    def report(self) -> Dict[str, float]:
+        """Reports the statistics so far.
+
+        Returns:
+            Dict[str, float]: The number of requests, errors and executor hand-offs, the mean number of
+                requests per hand-off, the throughput in requests per second, and the median and 99th percentile latency in seconds.
+        """
+        latencies = np.array(self.latencies) if self.latencies else np.zeros(1)
+        elapsed = time.perf_counter() - self.started
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'handoffs': self.handoffs,
+            'mean_handoff_size': self.requests / self.handoffs if self.handoffs else 0.0,
+            'throughput': self.requests / elapsed if elapsed > 0 else 0.0,
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p99': float(np.percentile(latencies, 99)),
+        }
+
+
+class _Session:
+
+    def __init__(self, application: DTrackApplication, writer: asyncio.StreamWriter):
+        self.application = application
+        self.writer = writer
+        self.closed = False
+
+
+class _Request:
+
+    def __init__(self, session: _Session, request_id: int, frame_number: int, payload: bytes):
+        self.session = session
+        self.request_id = request_id
+        self.frame_number = frame_number
+        self.payload = payload
+        self.received = time.perf_counter()
+
+
+class TrackingServer:
+    """A long running tracking server that producers on the same host send detections to,
+        over a Unix socket or a local TCP port. Every connection is a session with its own
+        DTrackApplication, created by the application factory, which tracks the detections with
+        process_detections.
+
+        Requests of all sessions go through one bounded queue. A worker takes all waiting requests,
+        up to max_handoff_size, and hands them to the default executor in one call, which processes
+        them in order, so the requests of a session are processed in the order they were sent. When
+        the queue is full, connections stop being read, which pushes back on the producers through
+        the socket.
+
+        This coalesces the hand-offs to the executor and the socket writes only: each request is
+        still tracked on its own by its session's application, one after the other. Association is
+        not batched across sessions, as every session has its own trackers.
+    """
+
+    def __init__(
+            self,
+            application_factory: Callable[[], DTrackApplication],
+            max_queue_size: int=64,
+            max_handoff_size: int=32,
+    ):
+        """Creates a new tracking server.
+
+        Args:
+            application_factory (Callable[[], DTrackApplication]): Creates the application of a new session.
+            max_queue_size (int, optional): The maximum number of requests waiting to be processed. Defaults to 64.
+            max_handoff_size (int, optional): The maximum number of requests handed to the executor in one
+                call. Defaults to 32.
+        """
+        self.application_factory = application_factory
+        self.max_queue_size = max_queue_size
+        self.max_handoff_size = max_handoff_size
+        self.statistics = ServerStatistics()
+        self.sessions = 0
+        self._queue = None
+        self._server = None
+        self._worker = None
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of requests waiting to be processed.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _start_worker(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._worker = asyncio.ensure_future(self._work())
+
+    async def start_unix(self, path: str):
+        """Starts listening on a Unix socket.
+
+        Args:
+            path (str): The path of the socket.
+        """
+        self._start_worker()
+        self._server = await asyncio.start_unix_server(self._handle, path=path)
+
+    async def start_tcp(self, host: str='127.0.0.1', port: int=0) -> int:
+        """Starts listening on a TCP port.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): The port to listen on, 0 for any free port. Defaults to 0.
+
+        Returns:
+            int: The port the server listens on.
+        """
+        self._start_worker()
+        self._server = await asyncio.start_server(self._handle, host=host, port=port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Serves until the server is closed.
+        """
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stops listening and stops the worker. Requests still waiting are discarded.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = _Session(self.application_factory(), writer)
+        self.sessions += 1
+        try:
+            while True:
+                header = await reader.readexactly(MESSAGE_HEADER.size)
+                message_type, request_id, frame_number, length = MESSAGE_HEADER.unpack(header)
+                payload = await reader.readexactly(length)
+                if message_type == CLOSE:
+                    break
+                await self._queue.put(_Request(session, request_id, frame_number, payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            session.closed = True
+            writer.close()
+
+    def _process(self, requests: List[_Request]) -> List[bytes]:
+        # One executor call per hand-off; the requests are tracked one at a time within it
+        responses = []
+        for request in requests:
+            try:
+                detections = decode_detections(request.payload)
+                result = request.session.application.process_detections(request.frame_number, detections)
+                message_type, payload = RESULT, json.dumps(result, cls=DTrackJsonEncoder).encode('utf-8')
+            except Exception as e:
+                self.statistics.errors += 1
+                message_type, payload = ERROR, f'{type(e).__name__}: {e}'.encode('utf-8')
+            header = MESSAGE_HEADER.pack(message_type, request.request_id, request.frame_number, len(payload))
+            responses.append(header + payload)
+        return responses
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = [await self._queue.get()]
+            while len(requests) < self.max_handoff_size and not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+            requests = [request for request in requests if not request.session.closed]
+            if not requests:
+                continue
+            responses = await loop.run_in_executor(None, self._process, requests)
+
+            sessions = []
+            for request, response in zip(requests, responses):
+                if not request.session.closed:
+                    request.session.writer.write(response)
+                    if request.session not in sessions:
+                        sessions.append(request.session)
+            await asyncio.gather(*[session.writer.drain() for session in sessions], return_exceptions=True)
+
+            now = time.perf_counter()
+            self.statistics.handoffs += 1
+            self.statistics.requests += len(requests)
+            self.statistics.latencies.extend(now - request.received for request in requests)
+
+
+class TrackingClient:
+    """A client of a tracking server, used by producers and as a local test harness. Requests can
+        be pipelined: submit returns a future and several requests may be in flight at once.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._request_ids = count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> 'TrackingClient':
+        """Connects to a server listening on a Unix socket.
+        """
+        return cls(*await asyncio.open_unix_connection(path))
+
+    @classmethod
+    async def connect_tcp(cls, host: str, port: int) -> 'TrackingClient':
+        """Connects to a server listening on a TCP port.
+        """
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def _receive(self):
+        try:
+            while True:
+                header = await self._reader.readexactly(MESSAGE_HEADER.size)
+                message_type, request_id, _, length = MESSAGE_HEADER.unpack(header)
+                payload = await self._reader.readexactly(length)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if message_type == ERROR:
+                    future.set_exception(TrackingServerError(payload.decode('utf-8')))
+                else:
+                    future.set_result(json.loads(payload.decode('utf-8')))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Connection to the tracking server was closed'))
+            self._pending.clear()
+
+    async def submit(self, frame_number: int, detections: Union[List[Detection], DetectionBatch]) -> asyncio.Future:
+        """Sends the detections of a frame without waiting for the result.
+
+        Args:
+            frame_number (int): The number of the frame.
+            detections (Union[List[Detection], DetectionBatch]): The detections of the frame.
+
+        Returns:
+            asyncio.Future: Resolves to the formatted results of the frame.
+        """
+        request_id = next(self._request_ids) % 2 ** 32
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        payload = encode_detections(detections)
+        self._writer.write(MESSAGE_HEADER.pack(DETECTIONS, request_id, frame_number, len(payload)) + payload)
+        await self._writer.drain()
+        return future
+
+    async def track(self, frame_number: int, detections: Union[List[Detection], DetectionBatch]) -> Dict[str, Any]:
+        """Sends the detections of a frame and waits for the result.
+
+        Args:
+            frame_number (int): The number of the frame.
+            detections (Union[List[Detection], DetectionBatch]): The detections of the frame.
+
+        Returns:
+            Dict[str, Any]: The formatted results of the frame.
+        """
+        return await (await self.submit(frame_number, detections))
+
+    async def close(self):
+        """Ends the session and closes the connection.
+        """
+        self._writer.write(MESSAGE_HEADER.pack(CLOSE, 0, 0, 0))
+        await self._writer.drain()
+        self._writer.close()
+        await self._receiver
+
+
+def _load_factory(path: str) -> Callable[[], DTrackApplication]:
+    module_name, _, attribute = path.partition(':')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def main(argv: List[str]=None):
+    """Runs a tracking server from the command line.
+    """
+    parser = argparse.ArgumentParser(description='Runs a DTrack tracking server.')
+    parser.add_argument('factory', help='application factory, as module:function')
+    parser.add_argument('--unix', help='path of the Unix socket to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on when using TCP')
+    parser.add_argument('--port', type=int, default=7878, help='port to listen on when using TCP')
+    parser.add_argument('--max-queue-size', type=int, default=64)
+    parser.add_argument('--max-handoff-size', type=int, default=32)
+    parser.add_argument('--report-interval', type=float, default=10.0, help='seconds between statistics reports')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = TrackingServer(_load_factory(args.factory), args.max_queue_size, args.max_handoff_size)
+        if args.unix:
+            await server.start_unix(args.unix)
+        else:
+            await server.start_tcp(args.host, args.port)
+        try:
+            while True:
+                await asyncio.sleep(args.report_interval)
+                print(json.dumps(server.statistics.report()), flush=True)
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
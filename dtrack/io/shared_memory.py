@@ -0,0 +1,286 @@
+import time
+from multiprocessing import shared_memory
+from typing import Tuple, Union
+import numpy as np
+from ..util import Image
+from ..util.shared_memory import attach_shared_memory, unlink_shared_memory
+from .stream import ImageStream
+
+
+_MAGIC = 0x6474726b
+_HEADER_FIELDS = 16
+_DTYPE_BYTES = 16
+_MAX_DIMS = 4
+_LATEST, _LOSSLESS = 0, 1
+_MODES = {'latest': _LATEST, 'lossless': _LOSSLESS}
+
+# Header fields
+_SLOTS, _NDIM, _SHAPE, _MODE, _WRITE_SEQ, _READ_SEQ, _CLAIMED, _CLOSED, _LATEST_SLOT = 1, 2, 3, 7, 8, 9, 10, 11, 12
+
+
+class _RingBuffer:
+    """Views of the header, slot metadata and frame slots of a ring buffer in shared memory.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.header = np.ndarray(_HEADER_FIELDS, dtype=np.int64, buffer=shm.buf)
+        if self.header[0] != _MAGIC:
+            raise ValueError(f'{shm.name!r} is not a frame ring buffer')
+        offset = self.header.nbytes
+        self.dtype = np.dtype(bytes(shm.buf[offset:offset + _DTYPE_BYTES]).rstrip(b'\0').decode('ascii'))
+        offset += _DTYPE_BYTES
+        self.slots = int(self.header[_SLOTS])
+        self.shape = tuple(int(size) for size in self.header[_SHAPE:_SHAPE + self.header[_NDIM]])
+        self.sequences = np.ndarray(self.slots, dtype=np.int64, buffer=shm.buf, offset=offset)
+        self.frame_indices = np.ndarray(self.slots, dtype=np.int64, buffer=shm.buf, offset=offset + 8 * self.slots)
+        self.timestamps = np.ndarray(self.slots, dtype=np.float64, buffer=shm.buf, offset=offset + 16 * self.slots)
+        offset = _frames_offset(self.slots)
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=shm.buf, offset=offset)
+
+    def release(self):
+        del self.header, self.sequences, self.frame_indices, self.timestamps, self.frames
+
+
+def _frames_offset(slots: int) -> int:
+    offset = 8 * _HEADER_FIELDS + _DTYPE_BYTES + 24 * slots
+    return (offset + 63) // 64 * 64
+
+
+class SharedMemoryFrameProducer:
+    """Writes frames of a fixed shape into a ring buffer of slots in shared memory, for a
+        SharedMemoryImageStream in another process to read without copying.
+
+        In 'latest' mode the producer never waits: every frame is written to a slot the reader
+        has not claimed, and the reader only gets the most recent frame, skipping the ones it was
+        too slow for. Each slot works as a seqlock: its sequence number is cleared while the slot
+        is written, and the reader checks it again after copying the frame out, dropping copies
+        the producer wrote over. In 'lossless' mode the producer waits for a free slot, so the
+        reader gets every frame without copying. A ring buffer has a single producer and a single
+        reader.
+    """
+
+    def __init__(
+            self,
+            shape: Tuple[int, ...],
+            dtype: Union[str, np.dtype]=np.uint8,
+            slots: int=4,
+            mode: str='latest',
+            name: str=None
+    ):
+        """Creates the shared memory ring buffer.
+
+        Args:
+            shape (Tuple[int, ...]): The shape of every frame, such as (height, width, 3).
+            dtype (Union[str, np.dtype], optional): The data type of the frames. Defaults to np.uint8.
+            slots (int, optional): The number of frame slots, at least 2. Defaults to 4.
+            mode (str, optional): 'latest' or 'lossless'. Defaults to 'latest'.
+            name (str, optional): The name of the shared memory block. Defaults to None, for a generated name.
+        """
+        if mode not in _MODES:
+            raise ValueError(f'Unknown mode {mode!r}')
+        if slots < 2:
+            raise ValueError('A ring buffer needs at least 2 slots')
+        if len(shape) > _MAX_DIMS:
+            raise ValueError(f'Frames can have at most {_MAX_DIMS} dimensions')
+        dtype = np.dtype(dtype)
+        frame_bytes = int(np.prod(shape)) * dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=_frames_offset(slots) + slots * frame_bytes)
+        header = np.ndarray(_HEADER_FIELDS, dtype=np.int64, buffer=self.shm.buf)
+        header[:] = 0
+        header[_SLOTS] = slots
+        header[_NDIM] = len(shape)
+        header[_SHAPE:_SHAPE + len(shape)] = shape
+        header[_MODE] = _MODES[mode]
+        header[_WRITE_SEQ] = header[_READ_SEQ] = header[_CLAIMED] = header[_LATEST_SLOT] = -1
+        encoded = dtype.str.encode('ascii')
+        self.shm.buf[header.nbytes:header.nbytes + _DTYPE_BYTES] = encoded.ljust(_DTYPE_BYTES, b'\0')
+        header[0] = _MAGIC
+        del header
+        self.ring = _RingBuffer(self.shm)
+        self.ring.sequences[:] = -1
+        self.mode = mode
+        self.frames_written = 0
+
+    @property
+    def name(self) -> str:
+        """The name of the shared memory block, to open the stream with.
+        """
+        return self.shm.name
+
+    def _claim_slot(self) -> int:
+        # Avoiding the claimed slot keeps the reader's copies from being overwritten in the common
+        # case. The claim is only a hint: the reader validates the sequence after copying.
+        ring, header = self.ring, self.ring.header
+        slot = (int(header[_LATEST_SLOT]) + 1) % ring.slots
+        if slot == header[_CLAIMED]:
+            slot = (slot + 1) % ring.slots
+        ring.sequences[slot] = -1
+        return slot
+
+    def write(
+            self,
+            frame: Union[np.ndarray, Image],
+            timestamp: float=None,
+            frame_index: int=None,
+            timeout: float=None
+    ) -> bool:
+        """Writes the next frame.
+
+        Args:
+            frame (Union[np.ndarray, Image]): The frame content or image, of the producer's shape and data type.
+            timestamp (float, optional): The capture time of the frame. Defaults to None, for the current time.
+            frame_index (int, optional): The index of the frame in its source. Defaults to None, for its
+                sequence number.
+            timeout (float, optional): The maximum time to wait for a free slot in 'lossless' mode. Defaults
+                to None, to wait indefinitely.
+
+        Returns:
+            bool: Whether the frame was written, False if the wait timed out.
+        """
+        ring, header = self.ring, self.ring.header
+        content = frame.image if isinstance(frame, Image) else frame
+        if content.shape != ring.shape:
+            raise ValueError(f'Frame has shape {content.shape}, expected {ring.shape}')
+        sequence = int(header[_WRITE_SEQ]) + 1
+
+        if self.mode == 'lossless':
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            while sequence - ring.slots > header[_READ_SEQ]:
+                if deadline is not None and time.perf_counter() > deadline:
+                    return False
+                time.sleep(0.0005)
+            slot = sequence % ring.slots
+        else:
+            slot = self._claim_slot()
+
+        ring.frames[slot] = content
+        ring.timestamps[slot] = time.time() if timestamp is None else timestamp
+        ring.frame_indices[slot] = sequence if frame_index is None else frame_index
+        ring.sequences[slot] = sequence
+        header[_LATEST_SLOT] = slot
+        header[_WRITE_SEQ] = sequence
+        self.frames_written += 1
+        return True
+
+    def close(self, unlink: bool=True):
+        """Tells the reader the stream has ended and releases the shared memory.
+
+        Args:
+            unlink (bool, optional): Whether to remove the shared memory block. A reader still attached
+                keeps it until it closes. Defaults to True.
+        """
+        self.ring.header[_CLOSED] = 1
+        self.ring.release()
+        self.shm.close()
+        if unlink:
+            unlink_shared_memory(self.shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SharedMemoryImageStream(ImageStream):
+    """An image stream over the frames a SharedMemoryFrameProducer writes, in this or another
+        process. Images are valid until the next frame is requested, copy a frame to keep it for
+        longer. In 'lossless' mode they are views of their slot, which the producer does not write
+        to until then. In 'latest' mode the producer never waits, so frames are copied into a
+        buffer of the stream, reused for every frame, and checked against their slot's sequence.
+    """
+
+    def __init__(self, name: str, poll_interval: float=0.0005, timeout: float=None):
+        """Attaches to the ring buffer of a producer.
+
+        Args:
+            name (str): The name of the producer's shared memory block.
+            poll_interval (float, optional): The time to sleep between checks for a new frame. Defaults to 0.0005.
+            timeout (float, optional): The maximum time to wait for a new frame before raising TimeoutError.
+                Defaults to None, to wait indefinitely.
+        """
+        super().__init__()
+        self.shm = attach_shared_memory(name)
+        self.ring = _RingBuffer(self.shm)
+        self.lossless = self.ring.header[_MODE] == _LOSSLESS
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.last_sequence = int(self.ring.header[_READ_SEQ]) if self.lossless else -1
+        self.dropped_frames = 0
+        self.torn_reads = 0
+        self._buffer = None
+
+    def _release(self):
+        self.current_image = None
+        if self.lossless:
+            self.ring.header[_READ_SEQ] = self.last_sequence
+        else:
+            self.ring.header[_CLAIMED] = -1
+
+    def _next_lossless(self) -> bool:
+        sequence = self.last_sequence + 1
+        if self.ring.header[_WRITE_SEQ] < sequence:
+            return False
+        self._use(sequence % self.ring.slots, sequence)
+        return True
+
+    def _next_latest(self) -> bool:
+        ring, header = self.ring, self.ring.header
+        slot = int(header[_LATEST_SLOT])
+        sequence = int(ring.sequences[slot]) if slot >= 0 else -1
+        if sequence <= self.last_sequence:
+            return False
+        header[_CLAIMED] = slot
+        if self._buffer is None:
+            self._buffer = np.empty(ring.shape, dtype=ring.dtype)
+        np.copyto(self._buffer, ring.frames[slot])
+        timestamp, frame_index = float(ring.timestamps[slot]), int(ring.frame_indices[slot])
+        if ring.sequences[slot] != sequence:
+            # The producer started writing to the slot during the copy
+            self.torn_reads += 1
+            return False
+        self.dropped_frames += sequence - self.last_sequence - 1
+        self.last_sequence = sequence
+        self.current_image = Image(None, self._buffer, timestamp=timestamp, frame_index=frame_index)
+        return True
+
+    def _use(self, slot: int, sequence: int):
+        ring = self.ring
+        self.last_sequence = sequence
+        self.current_image = Image(
+            None,
+            ring.frames[slot],
+            timestamp=float(ring.timestamps[slot]),
+            frame_index=int(ring.frame_indices[slot])
+        )
+
+    def _advance(self) -> None:
+        self._release()
+        next_frame = self._next_lossless if self.lossless else self._next_latest
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        while not next_frame():
+            if self.ring.header[_CLOSED]:
+                if not next_frame():
+                    self.current_image = None
+                return
+            if deadline is not None and time.perf_counter() > deadline:
+                raise TimeoutError('No new frame in the shared memory ring buffer')
+            time.sleep(self.poll_interval)
+
+    def close(self):
+        """Releases the current frame and detaches from the shared memory. Images of the stream
+            must not be used afterwards.
+        """
+        self._release()
+        self.ring.release()
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,275 @@
+import queue
+import threading
+import time
+from typing import Tuple, Union
+import cv2
+from ..util import Image
+from .stream import ImageStream
+
+
+_POLL_INTERVAL = 0.05
+_END = object()
+
+
+class _DecodeFailure:
+    """Queued by the decode thread in place of the end of the stream when decoding failed,
+        so the consumer raises the error instead of waiting for frames.
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _CaptureStream(ImageStream):
+    """Base class of streams reading from an OpenCV VideoCapture. Frames are decoded on a
+        dedicated thread into a bounded queue, skipped frames are only grabbed and never
+        decoded, and every image carries its frame index and timestamp.
+    """
+
+    def __init__(
+            self,
+            source: Union[str, int],
+            frame_step: int=1,
+            size: Tuple[int, int]=None,
+            threaded: bool=True,
+            queue_size: int=4,
+            drop_frames: bool=False,
+            api_preference: int=cv2.CAP_ANY,
+            hardware_acceleration: bool=False,
+    ):
+        if frame_step < 1:
+            raise ValueError('frame_step must be at least 1')
+        super().__init__()
+        self.source = source
+        self.frame_step = frame_step
+        self.size = size
+        self.threaded = threaded
+        self.queue_size = queue_size
+        self.drop_frames = drop_frames
+        self.dropped_frames = 0
+        params = []
+        if hardware_acceleration and hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+            params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        self.capture = cv2.VideoCapture(source, api_preference, params)
+        if not self.capture.isOpened():
+            raise IOError(f'Could not open video source {source!r}')
+        self._position = 0
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of decoded frames waiting.
+        """
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _timestamp(self) -> float:
+        raise NotImplementedError
+
+    def _read(self) -> Image:
+        for _ in range(self.frame_step - 1):
+            if not self.capture.grab():
+                return None
+            self._position += 1
+        if not self.capture.grab():
+            return None
+        frame_index, timestamp = self._position, self._timestamp()
+        self._position += 1
+        ok, content = self.capture.retrieve()
+        if not ok:
+            return None
+        if self.size is not None and (content.shape[1], content.shape[0]) != tuple(self.size):
+            content = cv2.resize(content, tuple(self.size), interpolation=cv2.INTER_AREA)
+        return Image(None, content, timestamp=timestamp, frame_index=frame_index)
+
+    def _put(self, item):
+        if self.drop_frames:
+            # Never wait for the consumer: make room by dropping the oldest frame at once,
+            # unless the consumer took one between the two attempts to put
+            while True:
+                for _ in range(2):
+                    try:
+                        self._queue.put_nowait(item)
+                        return
+                    except queue.Full:
+                        pass
+                try:
+                    self._queue.get_nowait()
+                    self.dropped_frames += 1
+                except queue.Empty:
+                    pass
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _decode(self):
+        end = _END
+        try:
+            while not self._stop.is_set():
+                image = self._read()
+                if image is None:
+                    return
+                self._put(image)
+        except Exception as error:
+            end = _DecodeFailure(error)
+        finally:
+            self._put(end)
+
+    def _start(self):
+        self._stop.clear()
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._thread = threading.Thread(target=self._decode, name=f'decode-{self.source}', daemon=True)
+        self._thread.start()
+
+    def _stop_decoding(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._queue = None
+
+    def _advance(self) -> None:
+        if not self.threaded:
+            self.current_image = self._read()
+            return
+        if self._thread is None:
+            if self._queue is not None:
+                self.current_image = None
+                return
+            self._start()
+        item = self._queue.get()
+        if item is _END or isinstance(item, _DecodeFailure):
+            self._thread.join()
+            self._thread = None
+            self.current_image = None
+            if item is not _END:
+                raise item.error
+            return
+        self.current_image = item
+
+    def close(self):
+        """Stops decoding and releases the capture.
+        """
+        self._stop_decoding()
+        self.capture.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class VideoFileStream(_CaptureStream):
+    """An image stream over the frames of a video file. Frame timestamps are the presentation
+        times of the frames in the video.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            frame_step: int=1,
+            size: Tuple[int, int]=None,
+            start_frame: int=0,
+            threaded: bool=True,
+            queue_size: int=4,
+            api_preference: int=cv2.CAP_ANY,
+            hardware_acceleration: bool=False,
+    ):
+        """Opens a video file.
+
+        Args:
+            path (str): The path of the video.
+            frame_step (int, optional): Only every frame_step-th frame is decoded, the others are skipped
+                without decoding. Defaults to 1.
+            size (Tuple[int, int], optional): The (width, height) to resize frames to on the decode thread.
+                Defaults to None, for the size of the video.
+            start_frame (int, optional): The index of the first frame. Defaults to 0.
+            threaded (bool, optional): Whether to decode on a dedicated thread. Defaults to True.
+            queue_size (int, optional): The maximum number of frames decoded ahead. Defaults to 4.
+            api_preference (int, optional): The OpenCV backend to use. Defaults to cv2.CAP_ANY.
+            hardware_acceleration (bool, optional): Whether to ask the backend for hardware decoding, where
+                OpenCV supports it. Defaults to False.
+        """
+        super().__init__(
+            path, frame_step, size, threaded, queue_size, False, api_preference, hardware_acceleration
+        )
+        if start_frame:
+            self.seek(start_frame)
+
+    @property
+    def frame_count(self) -> int:
+        """The number of frames in the video, as reported by its container.
+        """
+        return int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    @property
+    def fps(self) -> float:
+        """The frame rate of the video.
+        """
+        return self.capture.get(cv2.CAP_PROP_FPS)
+
+    def _timestamp(self) -> float:
+        return self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+
+    def seek(self, frame_index: int):
+        """Continues the stream at the given frame. Frames decoded ahead are discarded.
+
+        Args:
+            frame_index (int): The index of the next frame.
+        """
+        self._stop_decoding()
+        self.capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self._position = frame_index
+
+
+class CameraStream(_CaptureStream):
+    """An image stream over the frames of a camera or other live source. When the consumer falls
+        behind, the oldest decoded frames are dropped, so it always gets recent frames. Frame
+        timestamps are the wall clock times the frames were grabbed at.
+    """
+
+    def __init__(
+            self,
+            device: Union[int, str]=0,
+            frame_step: int=1,
+            size: Tuple[int, int]=None,
+            fps: float=None,
+            threaded: bool=True,
+            queue_size: int=2,
+            drop_frames: bool=True,
+            api_preference: int=cv2.CAP_ANY,
+            hardware_acceleration: bool=False,
+    ):
+        """Opens a camera.
+
+        Args:
+            device (Union[int, str], optional): The camera index, or the URL of a live stream. Defaults to 0.
+            frame_step (int, optional): Only every frame_step-th frame is decoded, the others are skipped
+                without decoding. Defaults to 1.
+            size (Tuple[int, int], optional): The (width, height) to capture at. It is requested from the
+                camera, and frames of another size are resized on the decode thread. Defaults to None.
+            fps (float, optional): The frame rate to request from the camera. Defaults to None.
+            threaded (bool, optional): Whether to decode on a dedicated thread. Defaults to True.
+            queue_size (int, optional): The maximum number of frames decoded ahead. Defaults to 2.
+            drop_frames (bool, optional): Whether to drop the oldest frames when the consumer falls behind.
+                Defaults to True.
+            api_preference (int, optional): The OpenCV backend to use. Defaults to cv2.CAP_ANY.
+            hardware_acceleration (bool, optional): Whether to ask the backend for hardware decoding, where
+                OpenCV supports it. Defaults to False.
+        """
+        super().__init__(
+            device, frame_step, size, threaded, queue_size, drop_frames, api_preference, hardware_acceleration
+        )
+        if size is not None:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, size[0])
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, size[1])
+        if fps is not None:
+            self.capture.set(cv2.CAP_PROP_FPS, fps)
+
+    def _timestamp(self) -> float:
+        return time.time()
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Tuple, Type
 from ..context import ApplicationContext
-from ..util import Detection, Image
+from ..util import Detection, DetectionBatch, Image
 from ..tracking.trackable import TrackableObject
 
 
@@ -30,6 +30,15 @@ class PipelineArgumentWithSpecification(PipelineArgument):
         return f'{self.__class__.__name__}({self.specification!r})'
 
 
+class Context(PipelineArgument):
+    """A pipeline argument that represents the application context itself. Used by steps
+        that read and update the context directly, such as detection and tracking.
+    """
+
+    def evaluate(self, context) -> ApplicationContext:
+        return context
+
+
 class Image(PipelineArgument):
     """A pipeline argument that represents the current frame image.
     """
@@ -149,9 +158,9 @@ class PipelineStepResult(PipelineArgumentWithSpecification):
     """
 
     def evaluate(self, context) -> Any:
-        if self.specification not in context.pipeline_results:
+        if self.specification not in context.pipeline_step_results:
             raise ValueError(f'Pipeline result {self.specification!r} does not exist')
-        return context.pipeline_results[self.specification]
+        return context.pipeline_step_results[self.specification]
 
 
 class DetectionsOfClass(PipelineArgumentWithSpecification):
@@ -159,7 +168,9 @@ class DetectionsOfClass(PipelineArgumentWithSpecification):
     """
 
     def evaluate(self, context) -> List[Detection]:
-        return [detection for detection in context.object_detections if detection.class_name == self.specification]
+        if isinstance(context.object_detections, DetectionBatch):
+            return context.object_detections.of_class(self.specification)
+        return [detection for detection in context.object_detections if detection.label == self.specification]
 
 
 class TrackedObjectsOfClass(PipelineArgumentWithSpecification):
@@ -1,3 +1,5 @@
+import asyncio
+from typing import Iterable, List, Tuple
 from ..context import ApplicationContext
 from .step import PipelineStep
 
@@ -19,12 +21,81 @@ class Pipeline:
     def run(self, context: ApplicationContext) -> ApplicationContext:
         """Runs the pipeline.
         """
-        for step in self.steps:
+        return self.run_steps(context, self.steps)
+
+    def run_steps(self, context: ApplicationContext, steps: List[PipelineStep]) -> ApplicationContext:
+        """Runs the given steps of the pipeline, in order.
+        """
+        for step in steps:
             step_result = step(context)
             if step_result is not None:
-                context.pipeline_step_results[step.name] = step(context)
+                context.pipeline_step_results[step.name] = step_result
         return context
+
+    async def run_async(self, context: ApplicationContext) -> ApplicationContext:
+        """Runs the pipeline from within an event loop. Consecutive async steps that do not
+            update the context or use each other's results are awaited concurrently.
+        """
+        return await self.run_steps_async(context, self.steps)
+
+    async def run_steps_async(self, context: ApplicationContext, steps: List[PipelineStep]) -> ApplicationContext:
+        """Runs the given steps of the pipeline from within an event loop.
+        """
+        group = []
+        for step in steps:
+            concurrent = step.is_async and not step.updates_context
+            if concurrent and not step.depends_on(member.name for member in group):
+                group.append(step)
+                continue
+            await self._run_group_async(context, group)
+            group = []
+            if concurrent:
+                group.append(step)
+            else:
+                await self._run_group_async(context, [step])
+        await self._run_group_async(context, group)
+        return context
+
+    async def _run_group_async(self, context: ApplicationContext, steps: List[PipelineStep]):
+        results = await asyncio.gather(*[step.run_async(context) for step in steps])
+        for step, step_result in zip(steps, results):
+            if step_result is not None:
+                context.pipeline_step_results[step.name] = step_result
+
+    def critical_steps(self) -> List[PipelineStep]:
+        """Returns the steps that must run on every processed frame.
+        """
+        return [step for step in self.steps if step.critical]
+
+    def steps_without(self, names: Iterable[str]) -> List[PipelineStep]:
+        """Returns the steps of the pipeline, except those with the given names.
+        """
+        names = set(names)
+        return [step for step in self.steps if step.name not in names]
+
+    def split_frame_independent(self) -> Tuple[List[PipelineStep], List[PipelineStep]]:
+        """Splits the pipeline into the leading frame independent steps, which can run ahead
+            of tracking, and the remaining steps, which must run sequentially.
+        """
+        index = 0
+        while index < len(self.steps) and self.steps[index].frame_independent:
+            index += 1
+        return self.steps[:index], self.steps[index:]
     
+    def close(self):
+        """Closes the steps that hold resources, such as worker processes or threads.
+        """
+        for step in self.steps:
+            close = getattr(step, 'close', None)
+            if callable(close):
+                close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def __str__(self) -> str:
         header = f'Pipeline {self.name!r}:'
         steps = '\n'.join([f'{step}' for step in self.steps])
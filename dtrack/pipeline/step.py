@@ -1,6 +1,8 @@
+import inspect
 from typing import Callable, Iterable
 from ..context import ApplicationContext
-from .arguments import PipelineArgument
+from ..util.concurrency import run_until_complete
+from .arguments import Context, PipelineArgument, PipelineStepResult
 
 
 class PipelineStep:
@@ -9,19 +11,76 @@ class PipelineStep:
 
     """
 
-    def __init__(self, name: str, function: Callable, *args: Iterable[PipelineArgument]):
+    def __init__(
+            self,
+            name: str,
+            function: Callable,
+            *args: Iterable[PipelineArgument],
+            frame_independent: bool=False,
+            critical: bool=True
+    ):
+        """Creates a new pipeline step.
+
+        Args:
+            name (str): The name of the step. Results are stored under this name.
+            function (Callable): The function to call with the evaluated arguments.
+            args (Iterable[PipelineArgument]): The arguments to evaluate and pass to the function.
+            frame_independent (bool, optional): Whether the step only depends on the current frame, and not on
+                tracking state or the results of earlier frames. Frame independent steps at the start of a
+                pipeline can run ahead of tracking in pipelined mode. Defaults to False.
+            critical (bool, optional): Whether the step must run on every processed frame. Non critical steps
+                are skipped in real-time mode when processing falls behind. Defaults to True.
+        """
         self.name = name
         self.function = function
         self.args = args
+        self.frame_independent = frame_independent
+        self.critical = critical
     
+    @property
+    def is_async(self) -> bool:
+        """Whether the step function is a coroutine function.
+        """
+        return inspect.iscoroutinefunction(self.function)
+
+    @property
+    def updates_context(self) -> bool:
+        """Whether the step receives the context itself, and so may change it.
+        """
+        return any(isinstance(arg, Context) for arg in self.args)
+
+    def depends_on(self, step_names: Iterable[str]) -> bool:
+        """Whether the step uses the result of any of the given steps.
+        """
+        step_names = set(step_names)
+        return any(
+            isinstance(arg, PipelineStepResult) and arg.specification in step_names
+            for arg in self.args
+        )
+
     def __call__(self, context: ApplicationContext):
+        """Runs the step. Asynchronous steps are waited for on the thread's event loop, so this must
+            not be called from within a running event loop, use run_async there.
+        """
+        args = [arg.evaluate(context) for arg in self.args]
+        result = self.function(*args)
+        if inspect.isawaitable(result):
+            result = run_until_complete(result)
+        return result
+
+    async def run_async(self, context: ApplicationContext):
+        """Runs the step from within an event loop. Synchronous steps are called directly.
+        """
         args = [arg.evaluate(context) for arg in self.args]
-        return self.function(*args)
+        result = self.function(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
 
 
-def pipeline_step(name: str, *args: Iterable[PipelineArgument]):
+def pipeline_step(name: str, *args: Iterable[PipelineArgument], frame_independent: bool=False, critical: bool=True):
     """A decorator that can be used to create a pipeline step.
     """
     def wrapper(function):
-        return PipelineStep(name, function, *args)
+        return PipelineStep(name, function, *args, frame_independent=frame_independent, critical=critical)
     return wrapper
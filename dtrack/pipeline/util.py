@@ -1,10 +1,20 @@
-from typing import List
+import asyncio
+from typing import Generator, Iterable, List, Tuple
 from uuid import uuid4
 import numpy as np
 from ..context import ApplicationContext
+from ..detection.batching import BatchingObjectDetector
 from ..detection.detector import ObjectDetector
+from ..detection.motion import MotionDetector
+from ..detection.parallel import DetectionProcessPool
+from ..detection.regions import clip_region, detect_regions, merge_regions, to_frame_pixels
+from ..detection.tiled import TiledObjectDetector
 from ..tracking.distance.distance_algorithm import DistanceAlgorithm
-from ..util import Detection
+from ..tracking.trackable import predicted_location
+from ..util import Detection, DetectionBatch, Image
+from ..util.fingerprint import dhash, hamming_distance, thumbnail, thumbnail_difference
+from ..util.nms import box_corners
+from .arguments import Context
 from .step import PipelineStep
 
 
@@ -13,26 +23,359 @@ class ObjectDetectionStep(PipelineStep):
     """
 
     def __init__(self, detector: ObjectDetector, *prediction_args, **prediction_kwargs):
+        super().__init__('object_detection', self.detect, Context(), frame_independent=True)
         self.detector = detector
         self.prediction_args = prediction_args
         self.prediction_kwargs = prediction_kwargs
-        self.function = self.detect
         
-    def detect(self, detector: ObjectDetector, context: ApplicationContext) -> None:
+    def detect(self, context: ApplicationContext) -> None:
         """Detects objects in the image.
         """
-        detections = detector.predict(context.frame_image, *self.prediction_args, **self.prediction_kwargs)
+        detections = self.detector.detect(context.frame_image, *self.prediction_args, **self.prediction_kwargs)
         context.object_detections = detections
 
+    async def run_async(self, context: ApplicationContext) -> None:
+        """Detects objects in the image without blocking the event loop. Subclasses that decide
+            how to run the detector in detect are run in the default executor.
+        """
+        if type(self).detect is not ObjectDetectionStep.detect:
+            return await asyncio.get_running_loop().run_in_executor(None, self.detect, context)
+        detections = await self.detector.detect_async(context.frame_image, *self.prediction_args, **self.prediction_kwargs)
+        context.object_detections = detections
+
+
+class BatchedObjectDetectionStep(ObjectDetectionStep):
+    """A pipeline step that detects objects in an image as part of a batch. Frames that reach
+        the step at the same time, from pipelined mode with several detection workers or from
+        other applications sharing the same BatchingObjectDetector, are sent to the detector's
+        detect_batch method together.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            *prediction_args,
+            max_batch_size: int=8,
+            max_batch_wait: float=0.005,
+            **prediction_kwargs
+    ):
+        if not isinstance(detector, BatchingObjectDetector):
+            detector = BatchingObjectDetector(detector, max_batch_size=max_batch_size, max_batch_wait=max_batch_wait)
+        super().__init__(detector, *prediction_args, **prediction_kwargs)
+
+    def close(self):
+        """Stops the batching thread.
+        """
+        self.detector.close()
+
+
+class TiledObjectDetectionStep(ObjectDetectionStep):
+    """A pipeline step that detects objects in overlapping tiles of the image, for high resolution
+        frames with small objects. See TiledObjectDetector for the options.
+    """
+
+    def __init__(self, detector: ObjectDetector, *prediction_args, tile_options: dict=None, **prediction_kwargs):
+        if not isinstance(detector, TiledObjectDetector):
+            detector = TiledObjectDetector(detector, **(tile_options or {}))
+        super().__init__(detector, *prediction_args, **prediction_kwargs)
+
+
+class RegionOfInterestDetectionStep(ObjectDetectionStep):
+    """A pipeline step that runs the detector on the whole frame only every few frames. In between,
+        it only runs on regions around the predicted location of each tracked object, expanded by a
+        margin and merged where they overlap, as one batch of zero-copy crops. New objects are found
+        at the next full frame detection.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            *prediction_args,
+            keyframe_interval: int=10,
+            margin: float=0.5,
+            min_region_size: int=32,
+            **prediction_kwargs
+    ):
+        """Creates a new region of interest detection step.
+
+        Args:
+            detector (ObjectDetector): The detector to run.
+            keyframe_interval (int, optional): The number of frames between full frame detections. Defaults to 10.
+            margin (float, optional): The fraction of an object's size added around it on each side. Defaults to 0.5.
+            min_region_size (int, optional): The minimum width and height of a region in pixels. Defaults to 32.
+        """
+        super().__init__(detector, *prediction_args, **prediction_kwargs)
+        self.frame_independent = False
+        self.keyframe_interval = keyframe_interval
+        self.margin = margin
+        self.min_region_size = min_region_size
+        self.last_keyframe = None
+        self.full_frames = 0
+        self.region_frames = 0
+        self.detected_area = 0.0
+
+    @property
+    def mean_detected_area(self) -> float:
+        """The mean fraction of the frame area the detector ran on, over all frames so far.
+        """
+        frames = self.full_frames + self.region_frames
+        return self.detected_area / frames if frames else 0.0
+
+    def regions(self, context: ApplicationContext) -> List[Tuple[int, int, int, int]]:
+        """Computes the regions around the predicted locations of the tracked objects.
+        """
+        height, width = context.frame_image.image.shape[:2]
+        regions = []
+        for obj in context.trackable_objects.values():
+            box = obj.bounding_box
+            scale_x, scale_y = width / box.scale_factor.x, height / box.scale_factor.y
+            cx, cy = predicted_location(obj, context.frame_number)
+            half_width = max(box.width * scale_x * (0.5 + self.margin), self.min_region_size / 2)
+            half_height = max(box.height * scale_y * (0.5 + self.margin), self.min_region_size / 2)
+            cx, cy = cx * scale_x, cy * scale_y
+            regions.append(clip_region((cx - half_width, cy - half_height, cx + half_width, cy + half_height), width, height))
+        return merge_regions(regions)
+
+    def detect(self, context: ApplicationContext) -> None:
+        """Detects objects in the whole image on keyframes, and around tracked objects otherwise.
+        """
+        keyframe = (
+            self.last_keyframe is None
+            or not context.trackable_objects
+            or context.frame_number - self.last_keyframe >= self.keyframe_interval
+        )
+        if keyframe:
+            super().detect(context)
+            self.last_keyframe = context.frame_number
+            self.full_frames += 1
+            self.detected_area += 1.0
+            return
+
+        height, width = context.frame_image.image.shape[:2]
+        regions = self.regions(context)
+        context.object_detections = detect_regions(
+            self.detector, context.frame_image, regions, *self.prediction_args, **self.prediction_kwargs
+        )
+        self.region_frames += 1
+        self.detected_area += sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions) / (width * height)
+
+
+class MotionGatedDetectionStep(ObjectDetectionStep):
+    """A pipeline step for static cameras that only runs the detector where the scene changed.
+        A MotionDetector compares every frame with a background model. Frames without significant
+        change reuse the previous detections. Otherwise the detector runs on the changed regions,
+        and previous detections outside them are kept, unless the changed regions cover too much
+        of the frame, in which case the whole frame is detected.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            *prediction_args,
+            motion_detector: MotionDetector=None,
+            max_region_area: float=0.5,
+            **prediction_kwargs
+    ):
+        """Creates a new motion gated detection step.
+
+        Args:
+            detector (ObjectDetector): The detector to run.
+            motion_detector (MotionDetector, optional): The background model. Defaults to a MotionDetector with default options.
+            max_region_area (float, optional): The fraction of the frame the changed regions may cover before the whole frame is detected. Defaults to 0.5.
+        """
+        super().__init__(detector, *prediction_args, **prediction_kwargs)
+        self.frame_independent = False
+        self.motion_detector = motion_detector or MotionDetector()
+        self.max_region_area = max_region_area
+        self.previous_detections = None
+        self.frames = 0
+        self.skipped_frames = 0
+        self.region_frames = 0
+        self.changed_area = 0.0
+
+    @property
+    def skip_rate(self) -> float:
+        """The fraction of frames on which the detector did not run.
+        """
+        return self.skipped_frames / self.frames if self.frames else 0.0
+
+    @property
+    def mean_changed_area(self) -> float:
+        """The mean fraction of the frame that changed, over all frames so far.
+        """
+        return self.changed_area / self.frames if self.frames else 0.0
+
+    def _unchanged_detections(self, regions: List[Tuple[int, int, int, int]], width: int, height: int) -> DetectionBatch:
+        previous = self.previous_detections
+        if not len(previous):
+            return previous
+        corners = box_corners(to_frame_pixels(previous.boxes, previous.scale_factors, width, height))
+        lower, upper = corners.min(axis=1), corners.max(axis=1)
+        keep = np.ones(len(previous), dtype=bool)
+        for x1, y1, x2, y2 in regions:
+            keep &= ~((lower[:, 0] < x2) & (upper[:, 0] > x1) & (lower[:, 1] < y2) & (upper[:, 1] > y1))
+        return previous.select(keep)
+
+    def detect(self, context: ApplicationContext) -> dict:
+        """Detects objects in the parts of the image that changed.
+
+        Returns:
+            dict: Whether the detector was skipped, and the fraction of the frame that changed.
+        """
+        height, width = context.frame_image.image.shape[:2]
+        changed, regions = self.motion_detector.update(context.frame_image)
+        region_area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions) / (width * height)
+        self.frames += 1
+        self.changed_area += changed
+
+        skipped = self.previous_detections is not None and not regions
+        if skipped:
+            self.skipped_frames += 1
+            context.object_detections = self.previous_detections
+        elif self.previous_detections is None or region_area > self.max_region_area:
+            super().detect(context)
+        else:
+            self.region_frames += 1
+            detections = detect_regions(
+                self.detector, context.frame_image, regions, *self.prediction_args, **self.prediction_kwargs
+            )
+            context.object_detections = DetectionBatch.concatenate([
+                self._unchanged_detections(regions, width, height), detections
+            ])
+        self.previous_detections = DetectionBatch.from_detections(context.object_detections)
+        return {'skipped': skipped, 'changed_area': changed}
+
+
+class DuplicateFrameDetectionStep(ObjectDetectionStep):
+    """A pipeline step that reuses the previous detections for frames that are effectively
+        identical to the last frame the detector ran on, for sources that repeat frames. Frames are
+        compared with a tiny fingerprint, either the mean difference of grayscale thumbnails or the
+        number of differing bits of a difference hash. Comparing with the last detected frame rather
+        than the previous one keeps slow changes from accumulating unnoticed.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            *prediction_args,
+            method: str='thumbnail',
+            threshold: float=None,
+            thumbnail_size: Tuple[int, int]=(32, 32),
+            **prediction_kwargs
+    ):
+        """Creates a new duplicate frame detection step.
+
+        Args:
+            detector (ObjectDetector): The detector to run.
+            method (str, optional): 'thumbnail' or 'dhash'. Defaults to 'thumbnail'.
+            threshold (float, optional): The largest difference of a duplicate frame, in gray levels for 'thumbnail' and in bits for 'dhash'. Defaults to 1.0 gray levels or 2 bits.
+            thumbnail_size (Tuple[int, int], optional): The thumbnail (width, height) for 'thumbnail'. Defaults to (32, 32).
+        """
+        if method not in ('thumbnail', 'dhash'):
+            raise ValueError(f'Unknown fingerprint method {method!r}')
+        super().__init__(detector, *prediction_args, **prediction_kwargs)
+        self.frame_independent = False
+        self.method = method
+        self.threshold = threshold if threshold is not None else (1.0 if method == 'thumbnail' else 2)
+        self.thumbnail_size = thumbnail_size
+        self.previous_fingerprint = None
+        self.previous_detections = None
+        self.frames = 0
+        self.duplicate_frames = 0
+
+    @property
+    def skip_rate(self) -> float:
+        """The fraction of frames detected as duplicates.
+        """
+        return self.duplicate_frames / self.frames if self.frames else 0.0
+
+    def fingerprint(self, image: Image):
+        """Computes the fingerprint of an image.
+        """
+        if self.method == 'dhash':
+            return dhash(image.image)
+        return thumbnail(image.image, self.thumbnail_size)
+
+    def difference(self, a, b) -> float:
+        """Computes the difference of two fingerprints.
+        """
+        if self.method == 'dhash':
+            return hamming_distance(a, b)
+        return thumbnail_difference(a, b)
+
+    def detect(self, context: ApplicationContext) -> dict:
+        """Detects objects in the image, unless it duplicates the last detected frame.
+
+        Returns:
+            dict: Whether the frame was a duplicate, and its difference to the last detected frame.
+        """
+        fingerprint = self.fingerprint(context.frame_image)
+        difference = None
+        if self.previous_fingerprint is not None:
+            difference = self.difference(fingerprint, self.previous_fingerprint)
+        self.frames += 1
+
+        duplicate = difference is not None and difference <= self.threshold
+        if duplicate:
+            self.duplicate_frames += 1
+            context.object_detections = self.previous_detections
+        else:
+            super().detect(context)
+            self.previous_fingerprint = fingerprint
+            self.previous_detections = context.object_detections
+        return {'duplicate': duplicate, 'difference': difference}
+
+
+class ParallelObjectDetectionStep(ObjectDetectionStep):
+    """A pipeline step that detects objects in an image using a pool of worker processes.
+        Frames are passed to the workers through shared memory. Detection for several frames
+        overlaps when the step is called from several threads, such as in pipelined mode with
+        more than one detection worker, or when using detect_many.
+    """
+
+    def __init__(
+            self,
+            detector: ObjectDetector,
+            *prediction_args,
+            workers: int=None,
+            max_in_flight: int=None,
+            max_retries: int=1,
+            **prediction_kwargs
+    ):
+        super().__init__(detector, *prediction_args, **prediction_kwargs)
+        self.pool = DetectionProcessPool(detector, workers=workers, max_in_flight=max_in_flight, max_retries=max_retries)
+
+    def detect(self, context: ApplicationContext) -> None:
+        """Detects objects in the image.
+        """
+        detections = self.pool.detect(context.frame_image, *self.prediction_args, **self.prediction_kwargs)
+        context.object_detections = detections
+
+    async def run_async(self, context: ApplicationContext) -> None:
+        """Detects objects in the image without blocking the event loop.
+        """
+        future = self.pool.submit(context.frame_image, *self.prediction_args, **self.prediction_kwargs)
+        context.object_detections = await asyncio.wrap_future(future)
+
+    def detect_many(self, images: Iterable[Image]) -> Generator[List[Detection], None, None]:
+        """Detects objects in a sequence of images, yielding the detections in order.
+        """
+        return self.pool.map(images, *self.prediction_args, **self.prediction_kwargs)
+
+    def close(self):
+        """Stops the worker processes.
+        """
+        self.pool.close()
+
 
 class ObjectTrackingStep(PipelineStep):
     """A pipeline step that tracks objects in an image.
     """
 
     def __init__(self, algorithm: DistanceAlgorithm, distance_threshold: float, active_classes: List[str] or str):
+        super().__init__('object_tracking', self.track, Context())
         self.algorithm = algorithm
         self.distance_threshold = distance_threshold
-        self.function = self.track
         if isinstance(active_classes, str):
             self.active_classes = [active_classes]
         else:
@@ -49,7 +392,10 @@ class ObjectTrackingStep(PipelineStep):
         unmatched_keys = []
         deleted_objects = {}
         for class_name in self.active_classes:
-            detections_of_interest = [detection for detection in context.object_detections if detection.label == class_name]
+            if isinstance(context.object_detections, DetectionBatch):
+                detections_of_interest = context.object_detections.of_class(class_name).to_detections()
+            else:
+                detections_of_interest = [detection for detection in context.object_detections if detection.label == class_name]
             objects_of_interest = {key: obj for key, obj in context.trackable_objects.items() if obj.class_name == class_name}
             tracked_object_type = context.tracked_object_classes[class_name]
             movement_predictor_type = context.movement_predictors_by_class[class_name]
@@ -109,7 +455,7 @@ class ObjectTrackingStep(PipelineStep):
             for col in unused_cols:
                 key = str(uuid4())
                 new_keys.append(key)
-                context.trackable_objects[key] = tracked_object_type.from_detection(detections_of_interest[col], key, context.frame_number)
+                context.trackable_objects[key] = tracked_object_type.from_detection(detections_of_interest[col], movement_predictor_type(), context.frame_number)
         
         for key in deleted_objects:
             del context.trackable_objects[key]
@@ -0,0 +1,318 @@
+import multiprocessing
+import multiprocessing.connection
+import os
+import queue
+import traceback
+from typing import Any, Callable, Dict, Generator, List, Tuple
+from .application import DTrackApplication
+from .io.stream import ImageStream
+
+
+class StreamSpec:
+    """Describes how to open a stream and build the application that processes it, in a
+        worker process. Both factories are sent to the workers, so they must be picklable,
+        for example module level functions or partials of them.
+    """
+
+    def __init__(
+            self,
+            stream_factory: Callable[[], ImageStream],
+            application_factory: Callable[[], DTrackApplication],
+            replayable: bool=False,
+    ):
+        """Creates a new stream specification.
+
+        Args:
+            stream_factory (Callable[[], ImageStream]): Opens the stream.
+            application_factory (Callable[[], DTrackApplication]): Builds the application, with its pipeline.
+            replayable (bool, optional): Whether reopening the stream starts again from its first frame, as for
+                files. When a replayable stream is restarted or moved, the frames already processed are skipped,
+                otherwise processing continues with the next frame the stream delivers. Defaults to False.
+        """
+        self.stream_factory = stream_factory
+        self.application_factory = application_factory
+        self.replayable = replayable
+
+
+def _stream_worker(command_queue, connection):
+    """Entry point of a runner worker process. Processes the frames of its streams in turn,
+        one frame of each stream at a time. Messages are sent over a pipe of its own, so a crashing
+        worker cannot leave a lock shared with the other workers held.
+    """
+    active = {}
+    while True:
+        try:
+            command = command_queue.get(block=not active)
+        except queue.Empty:
+            command = False
+        if command is None:
+            return
+        if command:
+            if command[0] == 'add':
+                _, stream_id, epoch, spec, start_frame = command
+                try:
+                    application = spec.application_factory()
+                    application.frame_number = start_frame
+                    stream = spec.stream_factory()
+                    if spec.replayable:
+                        for _ in range(start_frame):
+                            if next(stream, None) is None:
+                                break
+                    active[stream_id] = (epoch, application.process_image_stream(stream, progress_bar=False))
+                except Exception:
+                    connection.send(('failed', stream_id, epoch, traceback.format_exc()))
+            elif command[0] == 'remove':
+                _, stream_id, epoch = command
+                if stream_id in active:
+                    active.pop(stream_id)[1].close()
+                connection.send(('removed', stream_id, epoch))
+            continue
+
+        for stream_id in list(active):
+            epoch, results = active[stream_id]
+            try:
+                connection.send(('result', stream_id, epoch, next(results)))
+            except StopIteration:
+                del active[stream_id]
+                connection.send(('finished', stream_id, epoch))
+            except Exception:
+                del active[stream_id]
+                connection.send(('failed', stream_id, epoch, traceback.format_exc()))
+
+
+class _StreamState:
+
+    def __init__(self, spec: StreamSpec):
+        self.spec = spec
+        self.worker = None
+        self.epoch = 0
+        self.delivered = 0
+        self.restarts = 0
+        self.moving_to = None
+        self.removing = False
+
+
+class MultiStreamRunner:
+    """Runs many streams, each with its own DTrackApplication, sharded across a pool of worker
+        processes. Streams are assigned to the least loaded worker. With rebalance, when streams
+        finish or are removed, running streams are also moved from the most to the least loaded
+        workers until the loads differ by at most one. Moving a stream is not free: it is closed
+        with its application and opened again with a new one on the other worker, so its tracked
+        objects are lost, and a replayable stream reads again through the frames already processed.
+
+        Iterating over the runner yields (stream id, result) pairs, in the order of each stream's
+        frames. When a stream fails, or the worker processing it crashes, only the affected streams
+        are restarted, with a new stream and application. Frame numbers continue where they stopped,
+        the tracked objects are lost.
+    """
+
+    def __init__(
+            self,
+            streams: Dict[str, StreamSpec]=None,
+            workers: int=None,
+            max_restarts: int=1,
+            mp_context: str=None,
+            rebalance: bool=False,
+    ):
+        """Creates a new multi stream runner.
+
+        Args:
+            streams (Dict[str, StreamSpec], optional): The streams to run, by stream id. Defaults to None.
+            workers (int, optional): The number of worker processes. Defaults to the number of cores.
+            max_restarts (int, optional): The number of times a stream is restarted after failing, before it is
+                given up and its error recorded in errors. Defaults to 1.
+            mp_context (str, optional): The multiprocessing start method. Defaults to the platform default.
+            rebalance (bool, optional): Whether to move running streams to even out the loads of the workers
+                when streams finish or are removed, at the cost of their tracked objects. Defaults to False.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_restarts = max_restarts
+        self.rebalance = rebalance
+        self.errors: Dict[str, str] = {}
+        self.restarts = 0
+        self.migrations = 0
+        self._mp = multiprocessing.get_context(mp_context)
+        self._streams: Dict[str, _StreamState] = {}
+        self._processes = []
+        self._command_queues = []
+        self._connections = []
+        for stream_id, spec in (streams or {}).items():
+            self._streams[stream_id] = _StreamState(spec)
+
+    @property
+    def started(self) -> bool:
+        return bool(self._processes)
+
+    @property
+    def loads(self) -> List[int]:
+        """The number of streams assigned to each worker, counting streams being moved at their destination.
+        """
+        loads = [0] * self.workers
+        for state in self._streams.values():
+            if state.worker is not None and not state.removing:
+                loads[state.moving_to if state.moving_to is not None else state.worker] += 1
+        return loads
+
+    def _spawn(self, worker: int):
+        reader, writer = self._mp.Pipe(duplex=False)
+        process = self._mp.Process(
+            target=_stream_worker,
+            args=(self._command_queues[worker], writer),
+            daemon=True
+        )
+        process.start()
+        writer.close()
+        self._connections[worker] = reader
+        return process
+
+    def start(self):
+        """Starts the worker processes and the streams. Called when iteration starts if needed.
+        """
+        if self.started:
+            return
+        self._connections = [None] * self.workers
+        for worker in range(self.workers):
+            self._command_queues.append(self._mp.Queue())
+            self._processes.append(self._spawn(worker))
+        for stream_id, state in self._streams.items():
+            self._assign(stream_id, state, self._least_loaded())
+
+    def _least_loaded(self) -> int:
+        loads = self.loads
+        return loads.index(min(loads))
+
+    def _assign(self, stream_id: str, state: _StreamState, worker: int):
+        state.worker = worker
+        state.moving_to = None
+        state.epoch += 1
+        self._command_queues[worker].put(('add', stream_id, state.epoch, state.spec, state.delivered))
+
+    def add_stream(self, stream_id: str, spec: StreamSpec):
+        """Adds a stream, starting it on the least loaded worker if the runner is running.
+
+        Args:
+            stream_id (str): The id of the stream.
+            spec (StreamSpec): How to open and process the stream.
+        """
+        if stream_id in self._streams:
+            raise ValueError(f'Stream {stream_id} is already running')
+        state = _StreamState(spec)
+        self._streams[stream_id] = state
+        if self.started:
+            self._assign(stream_id, state, self._least_loaded())
+
+    def remove_stream(self, stream_id: str):
+        """Stops a stream. Results it already produced may still be yielded.
+
+        Args:
+            stream_id (str): The id of the stream.
+        """
+        state = self._streams[stream_id]
+        if state.worker is None:
+            del self._streams[stream_id]
+            return
+        state.removing = True
+        self._command_queues[state.worker].put(('remove', stream_id, state.epoch))
+
+    def _rebalance(self):
+        loads = self.loads
+        while max(loads) - min(loads) > 1:
+            source, target = loads.index(max(loads)), loads.index(min(loads))
+            candidates = [
+                (stream_id, state) for stream_id, state in self._streams.items()
+                if state.worker == source and state.moving_to is None and not state.removing
+            ]
+            if not candidates:
+                return
+            stream_id, state = candidates[-1]
+            state.moving_to = target
+            self._command_queues[source].put(('remove', stream_id, state.epoch))
+            self.migrations += 1
+            loads[source] -= 1
+            loads[target] += 1
+
+    def _end(self, stream_id: str):
+        del self._streams[stream_id]
+        if self.rebalance:
+            self._rebalance()
+
+    def _restart(self, stream_id: str, state: _StreamState, error: str):
+        if state.restarts >= self.max_restarts:
+            self.errors[stream_id] = error
+            self._end(stream_id)
+            return
+        state.restarts += 1
+        self.restarts += 1
+        worker = state.moving_to if state.moving_to is not None else state.worker
+        self._assign(stream_id, state, worker)
+
+    def _check_workers(self):
+        for worker, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            self._connections[worker].close()
+            self._command_queues[worker] = self._mp.Queue()
+            self._processes[worker] = self._spawn(worker)
+            for stream_id, state in list(self._streams.items()):
+                if state.removing and state.worker == worker:
+                    self._end(stream_id)
+                elif state.moving_to is not None and state.worker == worker:
+                    self._assign(stream_id, state, state.moving_to)
+                elif state.worker == worker or state.moving_to == worker:
+                    self._restart(stream_id, state, f'Worker {worker} exited with code {process.exitcode}')
+
+    def _handle(self, message: tuple) -> Tuple[bool, Any]:
+        kind, stream_id, epoch = message[:3]
+        state = self._streams.get(stream_id)
+        if state is None or epoch != state.epoch:
+            return False, None
+        if kind == 'result':
+            state.delivered += 1
+            return True, (stream_id, message[3])
+        if kind == 'finished':
+            self._end(stream_id)
+        elif kind == 'failed':
+            self._restart(stream_id, state, message[3])
+        elif kind == 'removed':
+            if state.removing or state.moving_to is None:
+                self._end(stream_id)
+            else:
+                self._assign(stream_id, state, state.moving_to)
+        return False, None
+
+    def __iter__(self) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+        self.start()
+        try:
+            while self._streams:
+                ready = multiprocessing.connection.wait(self._connections, timeout=0.1)
+                for connection in ready:
+                    if connection not in self._connections:
+                        continue
+                    worker = self._connections.index(connection)
+                    try:
+                        message = connection.recv()
+                    except (EOFError, OSError):
+                        self._processes[worker].join(timeout=1)
+                        self._check_workers()
+                        continue
+                    has_result, result = self._handle(message)
+                    if has_result:
+                        yield result
+                self._check_workers()
+        finally:
+            self.close()
+
+    def close(self):
+        """Stops the worker processes. Streams still running are abandoned.
+        """
+        for command_queue in self._command_queues:
+            command_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        self._processes = []
+        self._command_queues = []
+        self._connections = []
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from ..trackable.base_object import TrackableObject
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from ..trackable.base_object import TrackableObject
 from ...util import Detection
 
 
@@ -7,8 +9,8 @@ class DistanceFeatures(ABC):
     """
     Abstract class for distance features.
     """
-    @abstractmethod
     @classmethod
+    @abstractmethod
     def from_json(cls, json_object: dict) -> 'DistanceFeatures':
         """
         Creates a new distance features object from a JSON object.
@@ -21,8 +23,8 @@ class DistanceFeatures(ABC):
         """
         pass
 
-    @abstractmethod
     @classmethod
+    @abstractmethod
     def create_from_detection(cls, detection: Detection) -> 'DistanceFeatures':
         """
         Creates a new distance features object from a detection.
@@ -35,9 +37,9 @@ class DistanceFeatures(ABC):
         """
         pass
     
-    @abstractmethod
     @classmethod
-    def create_from_trackable_object(cls, trackable_object: TrackableObject) -> 'DistanceFeatures':
+    @abstractmethod
+    def create_from_trackable_object(cls, trackable_object: 'TrackableObject') -> 'DistanceFeatures':
         """
         Creates a new distance features object from a trackable object.
 
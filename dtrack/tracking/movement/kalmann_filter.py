@@ -70,6 +70,16 @@ class KalmannFilter(MovementPredictor):
         """
         return cls()
     
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Create a movement predictor from a dictionary.
+
+        :param d: dictionary
+        :return: movement predictor
+        """
+        return cls()
+    
     def __str__(self):
         return "Kalmann Filter"
     
@@ -1 +1 @@
-from .base_object import TrackableObject
\ No newline at end of file
+from .base_object import TrackableObject, predicted_location
\ No newline at end of file
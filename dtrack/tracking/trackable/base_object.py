@@ -211,4 +211,17 @@ class TrackableObject(ABC):
         """
         if not attribute_name in self._tracking_attributes:
             raise AttributeError(f"Attribute '{attribute_name}' not found.")
-        self._tracking_attributes[attribute_name] = attribute_value
\ No newline at end of file
+        self._tracking_attributes[attribute_name] = attribute_value
+
+
+def predicted_location(tracked_object: TrackableObject, frame_number: int) -> Tuple[float, float]:
+    """
+    Predicts where a tracked object is at a frame, or returns its last location if its
+    movement predictor makes no predictions.
+
+    :param tracked_object: tracked object
+    :param frame_number: frame to predict the location at
+    :return: predicted location
+    """
+    locations = tracked_object.predict_locations(frame_number - tracked_object.last_seen)
+    return locations[-1] if locations else tracked_object.location
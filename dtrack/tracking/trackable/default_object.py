@@ -102,26 +102,22 @@ class DefaultTrackableObject(TrackableObject):
         :return: trackable object
         """
         return cls(
-            detection.class_name,
-            detection.subclass_name,
-            detection.bounding_box,
+            detection.label,
+            detection.subclass_label,
+            detection.box,
             movement_predictor,
             first_seen,
-            detection.mask,
-            detection.features,
-            **detection.tracking_attributes
+            detection.mask
         )
     
     def update(self, detection: Detection, frame_number: int):
         """
         Update the trackable object with a new detection.
         """
-        self._bounding_box = detection.bounding_box
+        self._bounding_box = detection.box
         self._mask = detection.mask
-        self._features = detection.features
-        self._location_history.append((detection.bounding_box.cx, detection.bounding_box.cy))
-        self._tracking_attributes = detection.tracking_attributes
-        self._subclass_name.append(detection.subclass_name)
+        self._location_history.append((detection.box.cx, detection.box.cy))
+        self._subclass_name.append(detection.subclass_label)
         self._last_seen = frame_number
 
     
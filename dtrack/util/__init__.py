@@ -1,4 +1,5 @@
 from .box import Box
 from .detection import Detection
+from .detection_batch import DetectionBatch
 from .image import Image
 from .scale_factor import ScaleFactor
@@ -0,0 +1,244 @@
+import asyncio
+import inspect
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Generator, Iterable, List, Union
+
+
+_END = object()
+_POLL_INTERVAL = 0.05
+_thread_loops = threading.local()
+
+
+class _Failure:
+    """
+    Wraps an exception raised inside a stage so it can be passed down the queues.
+    """
+
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class Stage:
+    """
+    A single stage of a staged execution. Each stage runs in its own thread and
+    applies its function to every item it receives, in order.
+    """
+
+    def __init__(self, name: str, function: Callable[[Any], Any], workers: int=1):
+        """
+        :param name: name of the stage
+        :param function: function applied to each item
+        :param workers: number of items processed concurrently. Stages with more than
+            one worker must not depend on the order in which items are processed,
+            results are still handed on in order.
+        """
+        if workers < 1:
+            raise ValueError('A stage needs at least one worker')
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.items_processed = 0
+        self.busy_time = 0.0
+        self.stall_time = 0.0
+        self._statistics_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"Stage(name={self.name!r}, workers={self.workers})"
+
+
+class StagedExecution:
+    """
+    Runs items from a source through a sequence of stages. Every stage runs in its own
+    thread and is connected to the next one by a bounded queue, so consecutive stages
+    work on different items at the same time while the output order matches the
+    source order.
+    """
+
+    def __init__(self, source: Iterable, stages: List[Stage], queue_size: int=4):
+        """
+        :param source: iterable of items to process, consumed on its own thread
+        :param stages: stages to run, in order
+        :param queue_size: maximum number of items waiting between two stages
+        """
+        if queue_size < 1:
+            raise ValueError('queue_size must be at least 1')
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+        self._stop = threading.Event()
+        self._threads = []
+        self._executors = []
+
+    @property
+    def queue_depths(self) -> Dict[str, int]:
+        """
+        :return: number of items waiting in front of each stage, and of the output
+        """
+        names = [stage.name for stage in self.stages] + ['output']
+        return {name: q.qsize() for name, q in zip(names, self._queues)}
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue) -> Any:
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
+
+    @staticmethod
+    def _resolve(item: Any) -> Any:
+        if isinstance(item, Future):
+            try:
+                return item.result()
+            except BaseException as e:
+                return _Failure(e)
+        return item
+
+    @staticmethod
+    def _timed(stage: Stage, item: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return stage.function(item)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Stages with several workers update their statistics from several threads
+            with stage._statistics_lock:
+                stage.busy_time += elapsed
+                stage.items_processed += 1
+
+    def _feed(self):
+        try:
+            for item in self.source:
+                if not self._put(self._queues[0], item):
+                    return
+        except BaseException as e:
+            self._put(self._queues[0], _Failure(e))
+            return
+        self._put(self._queues[0], _END)
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        in_queue = self._queues[index]
+        out_queue = self._queues[index + 1]
+        executor = None
+        if stage.workers > 1:
+            executor = ThreadPoolExecutor(max_workers=stage.workers, thread_name_prefix=stage.name)
+            self._executors.append(executor)
+
+        while True:
+            wait_start = time.perf_counter()
+            item = self._resolve(self._get(in_queue))
+            stage.stall_time += time.perf_counter() - wait_start
+            if item is _END or isinstance(item, _Failure):
+                self._put(out_queue, item)
+                return
+
+            if executor is not None:
+                result = executor.submit(self._timed, stage, item)
+            else:
+                try:
+                    result = self._timed(stage, item)
+                except BaseException as e:
+                    self._put(out_queue, _Failure(e))
+                    return
+            if not self._put(out_queue, result):
+                return
+
+    def _start(self):
+        feeder = threading.Thread(target=self._feed, name='source', daemon=True)
+        self._threads.append(feeder)
+        for index, stage in enumerate(self.stages):
+            thread = threading.Thread(target=self._work, args=(index,), name=stage.name, daemon=True)
+            self._threads.append(thread)
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        """
+        Stops all stages. Items still in flight are discarded.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        for q in self._queues:
+            while not q.empty():
+                item = q.get_nowait()
+                if isinstance(item, Future):
+                    item.cancel()
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+
+    def __iter__(self) -> Generator[Any, None, None]:
+        self._start()
+        try:
+            while True:
+                item = self._resolve(self._get(self._queues[-1]))
+                if item is _END:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exception
+                yield item
+        finally:
+            self.close()
+
+
+async def iterate_async(iterable: Union[Iterable, Any]) -> AsyncGenerator[Any, None]:
+    """
+    Iterates over a synchronous or asynchronous iterable from within an event loop.
+    Synchronous iterables are advanced in the loop's default executor, so slow sources
+    such as decoders do not block the loop.
+
+    :param iterable: iterable or asynchronous iterable
+    :return: asynchronous generator over the items
+    """
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:
+            yield item
+        return
+
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    while True:
+        item = await loop.run_in_executor(None, next, iterator, _END)
+        if item is _END:
+            return
+        yield item
+
+
+def run_until_complete(awaitable: Awaitable) -> Any:
+    """
+    Waits for an awaitable from synchronous code. Every thread uses its own event loop,
+    created on first use and kept open, so asynchronous clients created by one call can
+    be reused by the next calls from the same thread.
+
+    :param awaitable: awaitable to wait for
+    :return: result of the awaitable
+    :raises RuntimeError: if an event loop is already running in this thread, where
+        the asynchronous API must be awaited instead
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise RuntimeError('Cannot wait synchronously inside a running event loop, use the asynchronous API')
+    loop = getattr(_thread_loops, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_loops.loop = loop
+    return loop.run_until_complete(awaitable)
@@ -0,0 +1,289 @@
+from typing import Iterable, List, Sequence, Union
+import numpy as np
+from .box import Box
+from .detection import Detection
+from .scale_factor import ScaleFactor
+
+
+def _encode(values: Sequence, categories: List[str]=None):
+    """
+    Encodes a sequence of labels as category codes.
+
+    :param values: labels, may contain None
+    :param categories: existing categories to extend
+    :return: categories and codes, None labels are encoded as -1
+    """
+    categories = list(categories or [])
+    lookup = {category: code for code, category in enumerate(categories)}
+    codes = np.empty(len(values), dtype=np.int32)
+    for index, value in enumerate(values):
+        if value is None:
+            codes[index] = -1
+            continue
+        if value not in lookup:
+            lookup[value] = len(categories)
+            categories.append(value)
+        codes[index] = lookup[value]
+    return categories, codes
+
+
+class DetectionBatch:
+    """
+    Columnar storage for the detections of a frame. Labels are stored as category
+    codes, and confidences, boxes and scale factors as NumPy arrays, so filtering
+    does not create Python objects. Indexing with an integer or iterating returns
+    Detection objects, created on access, so code written for lists of detections
+    keeps working.
+
+    Boxes are stored as rows of (cx, cy, width, height, angle) and scale factors as
+    rows of (x, y).
+    """
+
+    def __init__(
+            self,
+            categories: List[str],
+            label_codes: np.ndarray,
+            confidences: np.ndarray,
+            boxes: np.ndarray,
+            scale_factors: np.ndarray,
+            subclass_categories: List[str]=None,
+            subclass_codes: np.ndarray=None,
+            masks: List[np.ndarray]=None
+    ):
+        """
+        :param categories: label names, indexed by label code
+        :param label_codes: label code of each detection
+        :param confidences: confidence of each detection
+        :param boxes: (N, 5) array of boxes
+        :param scale_factors: (N, 2) array of box scale factors
+        :param subclass_categories: subclass label names, indexed by subclass code
+        :param subclass_codes: subclass code of each detection, -1 for no subclass
+        :param masks: mask of each detection, kept as a list as masks differ in shape
+        """
+        n = len(label_codes)
+        self.categories = list(categories)
+        self.label_codes = np.asarray(label_codes, dtype=np.int32)
+        self.confidences = np.asarray(confidences, dtype=np.float64)
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(n, 5)
+        self.scale_factors = np.asarray(scale_factors, dtype=np.float64).reshape(n, 2)
+        self.subclass_categories = list(subclass_categories or [])
+        if subclass_codes is None:
+            subclass_codes = np.full(n, -1, dtype=np.int32)
+        self.subclass_codes = np.asarray(subclass_codes, dtype=np.int32)
+        self.masks = masks
+
+    @classmethod
+    def empty(cls) -> "DetectionBatch":
+        """
+        :return: batch without detections
+        """
+        return cls([], np.empty(0), np.empty(0), np.empty((0, 5)), np.empty((0, 2)))
+
+    @classmethod
+    def from_detections(cls, detections: Iterable[Detection]) -> "DetectionBatch":
+        """
+        :param detections: detections to convert
+        :return: batch holding the detections
+        """
+        if isinstance(detections, DetectionBatch):
+            return detections
+        detections = list(detections)
+        if not detections:
+            return cls.empty()
+        categories, label_codes = _encode([detection.label for detection in detections])
+        subclass_categories, subclass_codes = _encode([detection.subclass_label for detection in detections])
+        boxes = np.array([
+            (detection.box.cx, detection.box.cy, detection.box.width, detection.box.height, detection.box.angle)
+            for detection in detections
+        ], dtype=np.float64)
+        scale_factors = np.array([
+            (detection.box.scale_factor.x, detection.box.scale_factor.y) for detection in detections
+        ], dtype=np.float64)
+        masks = [detection.mask for detection in detections]
+        return cls(
+            categories,
+            label_codes,
+            [detection.confidence for detection in detections],
+            boxes,
+            scale_factors,
+            subclass_categories,
+            subclass_codes,
+            masks if any(mask is not None for mask in masks) else None
+        )
+
+    @classmethod
+    def from_arrays(
+            cls,
+            labels: Sequence[str],
+            confidences: np.ndarray,
+            boxes: np.ndarray,
+            scale_factor: Union[ScaleFactor, np.ndarray],
+            subclass_labels: Sequence[str]=None,
+            masks: List[np.ndarray]=None
+    ) -> "DetectionBatch":
+        """
+        Creates a batch from columnar detector output without creating Detection objects.
+
+        :param labels: label of each detection
+        :param confidences: confidence of each detection
+        :param boxes: (N, 4) array of axis-aligned boxes or (N, 5) array including angles,
+            as (cx, cy, width, height[, angle])
+        :param scale_factor: scale factor shared by all boxes, or an (N, 2) array
+        :param subclass_labels: subclass label of each detection
+        :param masks: mask of each detection
+        :return: batch holding the detections
+        """
+        categories, label_codes = _encode(list(labels))
+        n = len(label_codes)
+        boxes = np.asarray(boxes, dtype=np.float64)
+        if boxes.ndim != 2:
+            boxes = boxes.reshape(n, -1) if n else boxes.reshape(0, 5)
+        if boxes.shape[1] == 4:
+            boxes = np.concatenate([boxes, np.zeros((n, 1), dtype=np.float64)], axis=1)
+        if isinstance(scale_factor, ScaleFactor):
+            scale_factors = np.tile(np.array([scale_factor.x, scale_factor.y], dtype=np.float64), (n, 1))
+        else:
+            scale_factors = scale_factor
+        subclass_categories, subclass_codes = None, None
+        if subclass_labels is not None:
+            subclass_categories, subclass_codes = _encode(list(subclass_labels))
+        return cls(categories, label_codes, confidences, boxes, scale_factors, subclass_categories, subclass_codes, masks)
+
+    @classmethod
+    def concatenate(cls, batches: Iterable["DetectionBatch"]) -> "DetectionBatch":
+        """
+        :param batches: batches to join
+        :return: batch holding the detections of all batches, in order
+        """
+        batches = [batch for batch in batches if len(batch)]
+        if not batches:
+            return cls.empty()
+        categories, subclass_categories = [], []
+        label_codes, subclass_codes = [], []
+        for batch in batches:
+            categories, codes = _encode(batch.categories, categories)
+            label_codes.append(np.append(codes, -1)[batch.label_codes])
+            subclass_categories, codes = _encode(batch.subclass_categories, subclass_categories)
+            subclass_codes.append(np.append(codes, -1)[batch.subclass_codes])
+        masks = None
+        if any(batch.masks is not None for batch in batches):
+            masks = []
+            for batch in batches:
+                masks.extend(batch.masks if batch.masks is not None else [None] * len(batch))
+        return cls(
+            categories,
+            np.concatenate(label_codes),
+            np.concatenate([batch.confidences for batch in batches]),
+            np.concatenate([batch.boxes for batch in batches]),
+            np.concatenate([batch.scale_factors for batch in batches]),
+            subclass_categories,
+            np.concatenate(subclass_codes),
+            masks
+        )
+
+    @property
+    def labels(self) -> List[str]:
+        """
+        :return: label of each detection
+        """
+        return [self.categories[code] if code >= 0 else None for code in self.label_codes]
+
+    def label_code(self, label: str) -> int:
+        """
+        :param label: label name
+        :return: code of the label, or -1 if no detection has the label
+        """
+        try:
+            return self.categories.index(label)
+        except ValueError:
+            return -1
+
+    def select(self, index: Union[slice, np.ndarray, Sequence[int]]) -> "DetectionBatch":
+        """
+        :param index: slice, boolean mask or integer indices
+        :return: batch holding the selected detections, sharing the categories
+        """
+        if isinstance(index, slice):
+            masks = self.masks[index] if self.masks is not None else None
+        else:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                index = np.flatnonzero(index)
+            masks = [self.masks[i] for i in index] if self.masks is not None else None
+        return DetectionBatch(
+            self.categories,
+            self.label_codes[index],
+            self.confidences[index],
+            self.boxes[index],
+            self.scale_factors[index],
+            self.subclass_categories,
+            self.subclass_codes[index],
+            masks
+        )
+
+    def of_class(self, label: str) -> "DetectionBatch":
+        """
+        :param label: label to keep
+        :return: batch holding the detections with the label
+        """
+        return self.select(self.label_codes == self.label_code(label))
+
+    def of_classes(self, labels: Iterable[str]) -> "DetectionBatch":
+        """
+        :param labels: labels to keep
+        :return: batch holding the detections with any of the labels
+        """
+        codes = [self.label_code(label) for label in labels]
+        return self.select(np.isin(self.label_codes, [code for code in codes if code >= 0]))
+
+    def above_confidence(self, threshold: float) -> "DetectionBatch":
+        """
+        :param threshold: minimum confidence to keep
+        :return: batch holding the detections with at least the given confidence
+        """
+        return self.select(self.confidences >= threshold)
+
+    def box(self, index: int) -> Box:
+        """
+        :param index: index of a detection
+        :return: box of the detection
+        """
+        cx, cy, width, height, angle = (float(value) for value in self.boxes[index])
+        scale_x, scale_y = (float(value) for value in self.scale_factors[index])
+        return Box(cx, cy, width, height, angle, ScaleFactor(scale_x, scale_y))
+
+    def to_detections(self) -> List[Detection]:
+        """
+        :return: list of Detection objects
+        """
+        return list(self)
+
+    def __len__(self) -> int:
+        return len(self.label_codes)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError('DetectionBatch index out of range')
+            subclass_code = self.subclass_codes[index]
+            label_code = self.label_codes[index]
+            return Detection(
+                self.categories[label_code] if label_code >= 0 else None,
+                self.subclass_categories[subclass_code] if subclass_code >= 0 else None,
+                float(self.confidences[index]),
+                self.box(index),
+                self.masks[index] if self.masks is not None else None
+            )
+        return self.select(index)
+
+    def __str__(self):
+        return f"DetectionBatch(n={len(self)}, categories={self.categories})"
+
+    def __repr__(self):
+        return f"DetectionBatch(n={len(self)}, categories={self.categories})"
@@ -0,0 +1,142 @@
+import struct
+from typing import List, Sequence, Tuple, Union
+import numpy as np
+from .detection import Detection
+from .detection_batch import DetectionBatch
+
+
+_HEADER = struct.Struct('<III')
+_MASK_HEADER = struct.Struct('<III')
+_STRING_LENGTH = struct.Struct('<H')
+_HAS_SUBCLASSES = 1
+_HAS_MASKS = 2
+
+
+def rle_encode(mask: np.ndarray) -> np.ndarray:
+    """
+    Run length encodes a binary mask, row by row.
+
+    :param mask: 2D mask, non zero values are set
+    :return: lengths of alternating runs of unset and set pixels, starting with unset
+    """
+    flat = np.asarray(mask).ravel() != 0
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    bounds = np.concatenate([[0], changes, [flat.size]])
+    runs = np.diff(bounds)
+    if flat.size and flat[0]:
+        runs = np.concatenate([[0], runs])
+    return runs.astype(np.uint32)
+
+
+def rle_decode(runs: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """
+    :param runs: run lengths as returned by rle_encode
+    :param shape: shape of the mask
+    :return: boolean mask
+    """
+    values = np.arange(len(runs)) % 2 == 1
+    return np.repeat(values, runs).reshape(shape)
+
+
+def _pack_strings(strings: Sequence[str]) -> bytes:
+    parts = []
+    for string in strings:
+        encoded = string.encode('utf-8')
+        parts.append(_STRING_LENGTH.pack(len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+
+def _unpack_strings(buffer, offset: int, count: int) -> Tuple[List[str], int]:
+    strings = []
+    for _ in range(count):
+        (length,) = _STRING_LENGTH.unpack_from(buffer, offset)
+        offset += _STRING_LENGTH.size
+        strings.append(bytes(buffer[offset:offset + length]).decode('utf-8'))
+        offset += length
+    return strings, offset
+
+
+def _unpack_array(buffer, offset: int, dtype: str, count: int) -> Tuple[np.ndarray, int]:
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+    return array, offset + array.nbytes
+
+
+def encode_detections(detections: Union[List[Detection], DetectionBatch]) -> bytes:
+    """
+    Encodes the detections of a frame as a binary record: the category tables, followed
+    by int32 label codes, float64 confidences, boxes and scale factors, and run length
+    encoded masks. The columns have the data types DetectionBatch keeps, so values
+    decode exactly and the decoded columns are not copied.
+
+    :param detections: detections of a frame
+    :return: encoded record
+    """
+    batch = DetectionBatch.from_detections(detections)
+    n = len(batch)
+    flags = 0
+    if any(code >= 0 for code in batch.subclass_codes):
+        flags |= _HAS_SUBCLASSES
+    if batch.masks is not None and any(mask is not None for mask in batch.masks):
+        flags |= _HAS_MASKS
+
+    parts = [_HEADER.pack(n, len(batch.categories), flags), _pack_strings(batch.categories)]
+    if flags & _HAS_SUBCLASSES:
+        parts.append(_STRING_LENGTH.pack(len(batch.subclass_categories)))
+        parts.append(_pack_strings(batch.subclass_categories))
+    parts.append(batch.label_codes.astype('<i4').tobytes())
+    if flags & _HAS_SUBCLASSES:
+        parts.append(batch.subclass_codes.astype('<i4').tobytes())
+    parts.append(batch.confidences.astype('<f8').tobytes())
+    parts.append(batch.boxes.astype('<f8').tobytes())
+    parts.append(batch.scale_factors.astype('<f8').tobytes())
+    if flags & _HAS_MASKS:
+        for mask in batch.masks:
+            if mask is None:
+                parts.append(_MASK_HEADER.pack(0, 0, 0))
+                continue
+            runs = rle_encode(mask)
+            height, width = mask.shape[:2]
+            parts.append(_MASK_HEADER.pack(height, width, len(runs)))
+            parts.append(runs.astype('<u4').tobytes())
+    return b''.join(parts)
+
+
+def decode_detections(buffer, offset: int=0) -> DetectionBatch:
+    """
+    Decodes a record written by encode_detections. The columns are read with
+    np.frombuffer, so memory mapped files and socket buffers are parsed in place, and
+    the batch views the buffer, read-only, rather than copying it.
+
+    :param buffer: buffer holding the record
+    :param offset: offset of the record in the buffer
+    :return: detections of the frame
+    """
+    n, category_count, flags = _HEADER.unpack_from(buffer, offset)
+    offset += _HEADER.size
+    categories, offset = _unpack_strings(buffer, offset, category_count)
+    subclass_categories = None
+    if flags & _HAS_SUBCLASSES:
+        (subclass_count,) = _STRING_LENGTH.unpack_from(buffer, offset)
+        subclass_categories, offset = _unpack_strings(buffer, offset + _STRING_LENGTH.size, subclass_count)
+    label_codes, offset = _unpack_array(buffer, offset, '<i4', n)
+    subclass_codes = None
+    if flags & _HAS_SUBCLASSES:
+        subclass_codes, offset = _unpack_array(buffer, offset, '<i4', n)
+    confidences, offset = _unpack_array(buffer, offset, '<f8', n)
+    boxes, offset = _unpack_array(buffer, offset, '<f8', 5 * n)
+    scale_factors, offset = _unpack_array(buffer, offset, '<f8', 2 * n)
+    masks = None
+    if flags & _HAS_MASKS:
+        masks = []
+        for _ in range(n):
+            height, width, run_count = _MASK_HEADER.unpack_from(buffer, offset)
+            offset += _MASK_HEADER.size
+            if not run_count:
+                masks.append(None)
+                continue
+            runs, offset = _unpack_array(buffer, offset, '<u4', run_count)
+            masks.append(rle_decode(runs, (height, width)))
+    return DetectionBatch(
+        categories, label_codes, confidences, boxes, scale_factors, subclass_categories, subclass_codes, masks
+    )
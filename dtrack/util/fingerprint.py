@@ -0,0 +1,48 @@
+from typing import Tuple
+import cv2
+import numpy as np
+
+
+def thumbnail(content: np.ndarray, size: Tuple[int, int]=(32, 32)) -> np.ndarray:
+    """
+    :param content: image content, grayscale or BGR
+    :param size: thumbnail (width, height)
+    :return: grayscale thumbnail, averaged over the pixels it covers
+    """
+    if content.ndim == 3 and content.shape[2] > 1:
+        content = cv2.cvtColor(content, cv2.COLOR_BGR2GRAY)
+    elif content.ndim == 3:
+        content = content[:, :, 0]
+    return cv2.resize(content, size, interpolation=cv2.INTER_AREA)
+
+
+def thumbnail_difference(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    :param a: thumbnail
+    :param b: thumbnail of the same size
+    :return: mean absolute difference of the thumbnails
+    """
+    return float(cv2.absdiff(a, b).mean())
+
+
+def dhash(content: np.ndarray, hash_size: int=8) -> int:
+    """
+    Computes the difference hash of an image: one bit per pair of horizontally
+    neighbouring pixels of a tiny thumbnail, set when the left pixel is brighter.
+
+    :param content: image content, grayscale or BGR
+    :param hash_size: number of rows and of bits per row
+    :return: hash of hash_size * hash_size bits
+    """
+    small = thumbnail(content, (hash_size + 1, hash_size)).astype(np.int16)
+    bits = np.packbits(small[:, :-1] > small[:, 1:])
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    :param a: hash
+    :param b: hash
+    :return: number of bits that differ
+    """
+    return bin(a ^ b).count('1')
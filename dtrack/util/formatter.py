@@ -37,6 +37,8 @@ class DefaultResultFormatter(ResultFormatter):
         return {
             'frame_number': context.frame_number,
             'frame_timestamp': datetime.now().timestamp(),
+            'frame_skipped': context.frame_skipped,
+            'predicted_locations': context.predicted_locations,
             'pipeline_step_results': context.pipeline_step_results,
             'tracking_attributes': context.tracking_attributes
         }
@@ -1,22 +1,70 @@
-from typing import List
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Sequence, Tuple, Union
 import cv2
 import numpy as np
 from .scale_factor import ScaleFactor
+from .box import Box
 from .detection import Detection
+from .image_cache import ImageContentCache
 
 
 class Image:
     """
     Class for images.
+
+    Resized copies of an image are cached, keyed by size and interpolation, so every step
+    asking for the same size in a frame shares one resize. The cache of each image holds
+    at most max_resize_cache_bytes, evicting the least recently used sizes first. Cached
+    content is read-only.
+
+    An image loaded from a file can keep its decoded content in an ImageContentCache
+    rather than holding it itself, so its content may be evicted and decoded again on
+    demand. Content decoded ahead, by a stream, is held by the image until it is first
+    used and only then handed to the cache, so read-ahead never evicts frames that the
+    consumer has not seen yet.
+
+    Images are compared by their content fingerprint. They are not hashable, as their
+    content can be changed in place.
     """
 
-    def __init__(self, filename: str, image_content: np.ndarray=None):
+    max_resize_cache_bytes = 64 * 2 ** 20
+
+    def __init__(
+            self,
+            filename: str,
+            image_content: np.ndarray=None,
+            timestamp: float=None,
+            frame_index: int=None,
+            source_scale_factor: ScaleFactor=None,
+            content_cache: ImageContentCache=None,
+            imread_flags: int=cv2.IMREAD_COLOR
+    ):
         """
-        :param image: image
+        :param filename: file the image is loaded from when its content is first used
+        :param image_content: image content, if already loaded
+        :param timestamp: time the frame was captured at, in seconds, if known
+        :param frame_index: index of the frame in its source, if known
+        :param source_scale_factor: size of the source the image was decoded from, if it
+            was decoded at a reduced resolution
+        :param content_cache: cache to keep the decoded content in once it is first used,
+            only for images with a filename, whose image_content must then be the decoded file
+        :param imread_flags: OpenCV flags the file is decoded with
         """
         self._filename = filename
         self._image_content = image_content
+        self._imread_flags = imread_flags
+        self._content_cache = content_cache if filename is not None else None
+        self._fingerprint = None
         self._detections = []
+        self._timestamp = timestamp
+        self._frame_index = frame_index
+        self._source_scale_factor = source_scale_factor
+        self._scale_factor = None
+        self._resized = OrderedDict()
+        self._resized_bytes = 0
+        self._resize_lock = threading.Lock()
 
     @property
     def filename(self) -> str:
@@ -25,22 +73,81 @@ class Image:
         """
         return self._filename
 
+    @property
+    def timestamp(self) -> float:
+        """
+        :return: capture time in seconds, or None if unknown
+        """
+        return self._timestamp
+
+    @property
+    def frame_index(self) -> int:
+        """
+        :return: index of the frame in its source, or None if unknown
+        """
+        return self._frame_index
+
     @property
     def image(self) -> np.ndarray:
         """
         :return: image
         """
-        if self._image_content is None:
-            self._image_content = np.array(cv2.imread(self.filename))
-        return self._image_content
+        if self._image_content is not None:
+            content = self._image_content
+            if self._content_cache is not None:
+                self._content_cache.put(self._cache_key, content)
+                self._image_content = None
+            return content
+        if self._content_cache is None:
+            self._image_content = self._decode()
+            return self._image_content
+        content = self._content_cache.get(self._cache_key)
+        if content is None:
+            content = self._decode()
+            self._content_cache.put(self._cache_key, content)
+        return content
+
+    @property
+    def _cache_key(self) -> Tuple[str, int]:
+        return self._filename, self._imread_flags
+
+    def _decode(self) -> np.ndarray:
+        return np.array(cv2.imread(self.filename, self._imread_flags))
+
+    @property
+    def fingerprint(self) -> bytes:
+        """
+        :return: digest of the shape, data type and pixels of the image, computed once
+            when first used, so later changes to the content in place are not seen
+        """
+        if self._fingerprint is None:
+            content = np.ascontiguousarray(self.image)
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(f'{content.shape}{content.dtype.str}'.encode('ascii'))
+            digest.update(content.data)
+            self._fingerprint = digest.digest()
+        return self._fingerprint
     
     @property
     def scale_factor(self) -> ScaleFactor:
         """
         :return: scale factor
         """
-        return ScaleFactor(*self.image.shape[:2])
+        if self._scale_factor is None:
+            height, width = self.image.shape[:2]
+            self._scale_factor = ScaleFactor(width, height)
+        return self._scale_factor
     
+    @property
+    def source_scale_factor(self) -> ScaleFactor:
+        """
+        :return: size of the source the image was decoded from, the scale factor of the
+            image itself unless it was decoded at a reduced resolution
+        """
+        if self._source_scale_factor is None:
+            return self.scale_factor
+        return self._source_scale_factor
+
     @property
     def detections(self) -> List[Detection]:
         """
@@ -48,6 +155,20 @@ class Image:
         """
         return self._detections
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_resized'] = OrderedDict()
+        state['_resized_bytes'] = 0
+        del state['_resize_lock']
+        if self._content_cache is not None:
+            state['_content_cache'] = None
+            state['_image_content'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._resize_lock = threading.Lock()
+
     def __str__(self):
         return f"Image(filename={self.filename} shape={self.image.shape} detections={self.detections})"
     
@@ -55,11 +176,13 @@ class Image:
         return f"Image(filename={self.filename} shape={self.image.shape} detections={self.detections})"
     
     def __eq__(self, other):
-        return np.array_equal(self.image, other.image)
+        if not isinstance(other, Image):
+            return NotImplemented
+        return self is other or self.fingerprint == other.fingerprint
     
     def __mul__(self, other) -> "Image":
         if isinstance(other, ScaleFactor):
-            return Image(cv2.resize(self.image, (int(self.scale_factor.x * other.x), int(self.scale_factor.y * other.y))))
+            return self.resize(int(self.scale_factor.x * other.x), int(self.scale_factor.y * other.y))
         else:
             raise TypeError(f"Cannot multiply Image by {type(other)}")
     
@@ -73,14 +196,165 @@ class Image:
         """
         return self * scale_factor
     
-    def resize(self, width: int, height: int) -> "Image":
+    def resized(self, width: int, height: int, interpolation: int=cv2.INTER_LINEAR) -> np.ndarray:
+        """
+        Resized content of the image, computed once and cached.
+
+        :param width: width
+        :param height: height
+        :param interpolation: OpenCV interpolation flag
+        :return: read-only resized content, a read-only view of the content if the size is unchanged
+        """
+        if (width, height) == (self.scale_factor.x, self.scale_factor.y):
+            content = self.image.view()
+            content.flags.writeable = False
+            return content
+        key = (width, height, interpolation)
+        with self._resize_lock:
+            content = self._resized.get(key)
+            if content is not None:
+                self._resized.move_to_end(key)
+                return content
+            content = cv2.resize(self.image, (width, height), interpolation=interpolation)
+            content.flags.writeable = False
+            self._resized[key] = content
+            self._resized_bytes += content.nbytes
+            while self._resized_bytes > self.max_resize_cache_bytes and len(self._resized) > 1:
+                _, evicted = self._resized.popitem(last=False)
+                self._resized_bytes -= evicted.nbytes
+            return content
+
+    def resize(self, width: int, height: int, interpolation: int=cv2.INTER_LINEAR) -> "Image":
         """
         Resize image.
         :param width: width
         :param height: height
+        :param interpolation: OpenCV interpolation flag
+        :return: resized image, sharing the cached content with other images of this size
         """
-        return Image(cv2.resize(self.image, (width, height)), ScaleFactor(width, height))
-    
+        return Image(
+            self.filename,
+            self.resized(width, height, interpolation),
+            timestamp=self.timestamp,
+            frame_index=self.frame_index,
+            source_scale_factor=self.source_scale_factor
+        )
+
+    def pyramid(
+            self,
+            scales: Iterable[Union[float, Tuple[int, int]]],
+            interpolation: int=cv2.INTER_AREA
+    ) -> List["Image"]:
+        """
+        Resizes the image to several sizes in one call, each computed once and cached.
+
+        :param scales: factors relative to the size of the image, or (width, height) sizes
+        :param interpolation: OpenCV interpolation flag
+        :return: resized images, in the order of the scales
+        """
+        width, height = self.scale_factor.x, self.scale_factor.y
+        images = []
+        for scale in scales:
+            if isinstance(scale, tuple):
+                size = scale
+            else:
+                size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            images.append(self.resize(size[0], size[1], interpolation))
+        return images
+
+    def clear_resize_cache(self):
+        """
+        Releases the cached resized content.
+        """
+        with self._resize_lock:
+            self._resized.clear()
+            self._resized_bytes = 0
+
+    def _pixel_box(self, box: Box) -> Box:
+        if box.scale_factor == self.scale_factor:
+            return box
+        return box * self.scale_factor
+
+    def _view(self, box: Box) -> np.ndarray:
+        """
+        :return: view of an axis aligned box, or None if the box is rotated or not inside the image
+        """
+        if box.rotated:
+            return None
+        x1, y1 = int(round(box.cx - box.width / 2)), int(round(box.cy - box.height / 2))
+        x2, y2 = x1 + max(1, int(round(box.width))), y1 + max(1, int(round(box.height)))
+        if x1 < 0 or y1 < 0 or x2 > self.scale_factor.x or y2 > self.scale_factor.y:
+            return None
+        return self.image[y1:y2, x1:x2]
+
+    def _warp(self, box: Box, width: int, height: int, out: np.ndarray, interpolation: int, border_value: float):
+        # Affine map from output pixels to image pixels, rotating around the box centre
+        angle = np.deg2rad(box.angle)
+        cos, sin = np.cos(angle), np.sin(angle)
+        scale_x, scale_y = box.width / width, box.height / height
+        u, v = 0.5 * scale_x - box.width / 2, 0.5 * scale_y - box.height / 2
+        matrix = np.array([
+            [cos * scale_x, -sin * scale_y, cos * u - sin * v + box.cx - 0.5],
+            [sin * scale_x, cos * scale_y, sin * u + cos * v + box.cy - 0.5],
+        ])
+        return cv2.warpAffine(
+            self.image, matrix, (width, height), dst=out, flags=interpolation | cv2.WARP_INVERSE_MAP,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=border_value
+        )
+
+    def crops(
+            self,
+            boxes: Sequence[Box],
+            size: Tuple[int, int]=None,
+            out: np.ndarray=None,
+            interpolation: int=cv2.INTER_LINEAR,
+            border_value: float=0
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        Crops several boxes at once, for example to compute appearance features.
+
+        Without a size, axis aligned boxes inside the image are returned as views of the
+        image, without copying. With a size, all crops are resized into one (N, height,
+        width[, channels]) array. Rotated boxes, and boxes reaching outside the image, are
+        cropped with a single affine warp each, filling the outside with border_value.
+
+        :param boxes: boxes to crop, relative to their scale factors
+        :param size: (width, height) to resize the crops to, None to keep their sizes
+        :param out: array to write the resized crops to, allocated if not given
+        :param interpolation: OpenCV interpolation flag
+        :param border_value: value of the pixels outside the image
+        :return: crops, one array of resized crops if a size is given
+        """
+        boxes = [self._pixel_box(box) for box in boxes]
+        if size is None:
+            crops = []
+            for box in boxes:
+                view = self._view(box)
+                if view is None:
+                    width, height = max(1, int(round(box.width))), max(1, int(round(box.height)))
+                    view = self._warp(box, width, height, None, interpolation, border_value)
+                crops.append(view)
+            return crops
+
+        width, height = size
+        shape = (len(boxes), height, width) + self.image.shape[2:]
+        if out is None:
+            out = np.empty(shape, dtype=self.image.dtype)
+        elif out.shape != shape:
+            raise ValueError(f'out has shape {out.shape}, expected {shape}')
+        for index, box in enumerate(boxes):
+            target = out[index]
+            view = self._view(box)
+            if view is None:
+                result = self._warp(box, width, height, target, interpolation, border_value)
+            elif view.shape[:2] == (height, width):
+                result = view
+            else:
+                result = cv2.resize(view, (width, height), dst=target, interpolation=interpolation)
+            if not np.may_share_memory(result, target):
+                target[...] = result.reshape(target.shape)
+        return out
+
     def add_detection(self, detection: Detection):
         """
         Add detection to image.
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+import numpy as np
+
+
+class ImageContentCache:
+    """
+    Least recently used cache of decoded image content with a byte budget. Images using a
+    cache do not keep their decoded content themselves, so content evicted from the cache
+    is decoded again from the image's file the next time it is used, and references to
+    old frames held by tracked objects or results no longer keep their pixels in memory.
+    """
+
+    def __init__(self, max_bytes: int=256 * 2 ** 20):
+        """
+        :param max_bytes: maximum total size of the cached content
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        """
+        :param key: key of the content
+        :return: cached content, or None if it is not cached
+        """
+        with self._lock:
+            content = self._entries.get(key)
+            if content is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def put(self, key: Hashable, content: np.ndarray):
+        """
+        Caches content, evicting the least recently used content to stay within the
+        budget. Content larger than the whole budget is not cached.
+
+        :param key: key of the content
+        :param content: decoded content
+        """
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            if content.nbytes > self.max_bytes:
+                return
+            self._entries[key] = content
+            self.nbytes += content.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def discard(self, key: Hashable):
+        """
+        :param key: key of the content to remove, if cached
+        """
+        with self._lock:
+            content = self._entries.pop(key, None)
+            if content is not None:
+                self.nbytes -= content.nbytes
+
+    def clear(self):
+        """
+        Removes all cached content.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
@@ -0,0 +1,317 @@
+from typing import Tuple
+import cv2
+import numpy as np
+from .detection_batch import DetectionBatch
+
+
+def _as_boxes(boxes: np.ndarray) -> np.ndarray:
+    """
+    :param boxes: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle])
+    :return: (N, 5) float array including angles
+    """
+    boxes = np.asarray(boxes, dtype=np.float64)
+    boxes = boxes.reshape(-1, boxes.shape[-1]) if boxes.size else boxes.reshape(0, 5)
+    if boxes.shape[1] == 4:
+        boxes = np.concatenate([boxes, np.zeros((len(boxes), 1))], axis=1)
+    return boxes
+
+
+def _is_axis_aligned(boxes: np.ndarray) -> bool:
+    return not np.any(boxes[:, 4])
+
+
+def box_corners(boxes: np.ndarray) -> np.ndarray:
+    """
+    Computes the corners of boxes, rotating them the same way as Box.
+
+    :param boxes: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle in degrees])
+    :return: (N, 4, 2) array of top left, top right, bottom right and bottom left corners
+    """
+    boxes = _as_boxes(boxes)
+    cx, cy, width, height, angle = boxes.T
+    half_w, half_h = width / 2, height / 2
+    dx = np.stack([-half_w, half_w, half_w, -half_w], axis=1)
+    dy = np.stack([-half_h, -half_h, half_h, half_h], axis=1)
+    radians = np.deg2rad(angle)[:, None]
+    cos, sin = np.cos(radians), np.sin(radians)
+    x = cx[:, None] + dx * cos - dy * sin
+    y = cy[:, None] + dx * sin + dy * cos
+    return np.stack([x, y], axis=2)
+
+
+def _bounds(boxes: np.ndarray) -> np.ndarray:
+    """
+    :return: (N, 4) array of enclosing axis-aligned (x1, y1, x2, y2)
+    """
+    if _is_axis_aligned(boxes):
+        cx, cy, width, height = boxes[:, :4].T
+        return np.stack([cx - width / 2, cy - height / 2, cx + width / 2, cy + height / 2], axis=1)
+    corners = box_corners(boxes)
+    return np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1)
+
+
+def _check_metric(metric: str):
+    if metric not in ('iou', 'ios'):
+        raise ValueError(f'Unknown overlap metric {metric!r}')
+
+
+def _ratio(intersection: np.ndarray, area_a: np.ndarray, area_b: np.ndarray, metric: str) -> np.ndarray:
+    if metric == 'ios':
+        denominator = np.minimum(area_a, area_b)
+    else:
+        denominator = area_a + area_b - intersection
+    return np.divide(intersection, denominator, out=np.zeros_like(intersection), where=denominator > 0)
+
+
+def _axis_aligned_iou(bounds_a: np.ndarray, bounds_b: np.ndarray, metric: str='iou') -> np.ndarray:
+    x1 = np.maximum(bounds_a[:, None, 0], bounds_b[None, :, 0])
+    y1 = np.maximum(bounds_a[:, None, 1], bounds_b[None, :, 1])
+    x2 = np.minimum(bounds_a[:, None, 2], bounds_b[None, :, 2])
+    y2 = np.minimum(bounds_a[:, None, 3], bounds_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (bounds_a[:, 2] - bounds_a[:, 0]) * (bounds_a[:, 3] - bounds_a[:, 1])
+    area_b = (bounds_b[:, 2] - bounds_b[:, 0]) * (bounds_b[:, 3] - bounds_b[:, 1])
+    return _ratio(intersection, area_a[:, None], area_b[None, :], metric)
+
+
+def _polygon_iou(corners_a, bounds_a, areas_a, corners_b, bounds_b, areas_b, metric: str='iou') -> np.ndarray:
+    intersection = np.zeros((len(corners_a), len(corners_b)))
+    candidates = np.argwhere(_axis_aligned_iou(bounds_a, bounds_b) > 0)
+    for i, j in candidates:
+        intersection[i, j], _ = cv2.intersectConvexConvex(corners_a[i], corners_b[j])
+    return _ratio(intersection, areas_a[:, None], areas_b[None, :], metric)
+
+
+def _rotated_iou(boxes_a: np.ndarray, boxes_b: np.ndarray, metric: str='iou') -> np.ndarray:
+    return _polygon_iou(
+        box_corners(boxes_a).astype(np.float32), _bounds(boxes_a), boxes_a[:, 2] * boxes_a[:, 3],
+        box_corners(boxes_b).astype(np.float32), _bounds(boxes_b), boxes_b[:, 2] * boxes_b[:, 3],
+        metric
+    )
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray, metric: str='iou') -> np.ndarray:
+    """
+    Computes the overlap of every pair of boxes. Axis-aligned boxes are handled with
+    array arithmetic, rotated boxes by intersecting their polygons.
+
+    :param boxes_a: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle])
+    :param boxes_b: (M, 4) or (M, 5) array of (cx, cy, width, height[, angle])
+    :param metric: 'iou' for intersection over union, 'ios' for intersection over the
+        smaller box, which also matches boxes cut off by a tile edge to the whole box
+    :return: (N, M) array of overlaps
+    """
+    _check_metric(metric)
+    boxes_a, boxes_b = _as_boxes(boxes_a), _as_boxes(boxes_b)
+    if _is_axis_aligned(boxes_a) and _is_axis_aligned(boxes_b):
+        return _axis_aligned_iou(_bounds(boxes_a), _bounds(boxes_b), metric)
+    return _rotated_iou(boxes_a, boxes_b, metric)
+
+
+class _OverlapIndex:
+    """
+    Precomputed geometry for repeatedly comparing one box against many others.
+    """
+
+    def __init__(self, boxes: np.ndarray, metric: str='iou'):
+        _check_metric(metric)
+        self.metric = metric
+        self.axis_aligned = _is_axis_aligned(boxes)
+        self.bounds = _bounds(boxes)
+        if not self.axis_aligned:
+            self.corners = box_corners(boxes).astype(np.float32)
+            self.areas = boxes[:, 2] * boxes[:, 3]
+
+    def iou(self, index: int, others: np.ndarray) -> np.ndarray:
+        if self.axis_aligned:
+            return _axis_aligned_iou(self.bounds[index:index + 1], self.bounds[others], self.metric)[0]
+        return _polygon_iou(
+            self.corners[index:index + 1], self.bounds[index:index + 1], self.areas[index:index + 1],
+            self.corners[others], self.bounds[others], self.areas[others],
+            self.metric
+        )[0]
+
+
+def nms(
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        iou_threshold: float=0.5,
+        max_detections: int=None,
+        metric: str='iou'
+) -> np.ndarray:
+    """
+    Class-agnostic greedy non-maximum suppression.
+
+    :param boxes: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle])
+    :param scores: (N,) array of scores
+    :param iou_threshold: boxes overlapping a kept box by more than this are suppressed
+    :param max_detections: maximum number of boxes to keep
+    :param metric: overlap metric, see box_iou
+    :return: indices of the kept boxes, by decreasing score
+    """
+    boxes = _as_boxes(boxes)
+    scores = np.asarray(scores, dtype=np.float64)
+    overlaps = _OverlapIndex(boxes, metric)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size:
+        index = order[0]
+        keep.append(index)
+        if max_detections is not None and len(keep) >= max_detections:
+            break
+        rest = order[1:]
+        iou = overlaps.iou(index, rest)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def batched_nms(
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        labels: np.ndarray,
+        iou_threshold: float=0.5,
+        max_detections: int=None,
+        metric: str='iou'
+) -> np.ndarray:
+    """
+    Per-class greedy non-maximum suppression, boxes only suppress boxes with the same label.
+
+    :param boxes: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle])
+    :param scores: (N,) array of scores
+    :param labels: (N,) array of labels or label codes
+    :param iou_threshold: boxes overlapping a kept box by more than this are suppressed
+    :param max_detections: maximum number of boxes to keep over all classes
+    :param metric: overlap metric, see box_iou
+    :return: indices of the kept boxes, by decreasing score
+    """
+    boxes = _as_boxes(boxes)
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(boxes):
+        return np.empty(0, dtype=np.int64)
+    _, codes = np.unique(np.asarray(labels), return_inverse=True)
+    if _is_axis_aligned(boxes):
+        # Shift each class to its own region so boxes of different classes never overlap
+        bounds = _bounds(boxes)
+        offset = (bounds[:, 2:].max() - bounds[:, :2].min() + 1) * codes
+        shifted = boxes.copy()
+        shifted[:, 0] += offset
+        shifted[:, 1] += offset
+        return nms(shifted, scores, iou_threshold, max_detections, metric)
+
+    keep = []
+    for code in np.unique(codes):
+        members = np.flatnonzero(codes == code)
+        keep.append(members[nms(boxes[members], scores[members], iou_threshold, metric=metric)])
+    keep = np.concatenate(keep)
+    keep = keep[np.argsort(-scores[keep], kind='stable')]
+    return keep[:max_detections] if max_detections is not None else keep
+
+
+def soft_nms(
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        iou_threshold: float=0.3,
+        sigma: float=0.5,
+        score_threshold: float=0.001,
+        method: str='gaussian'
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Soft non-maximum suppression. Instead of removing overlapping boxes, their scores
+    are decayed, and boxes are dropped once their score falls below score_threshold.
+
+    :param boxes: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle])
+    :param scores: (N,) array of scores
+    :param iou_threshold: overlap above which scores are decayed with the linear method
+    :param sigma: spread of the gaussian decay
+    :param score_threshold: minimum decayed score to keep a box
+    :param method: 'gaussian' or 'linear'
+    :return: indices of the kept boxes and their decayed scores, by decreasing decayed score
+    """
+    if method not in ('gaussian', 'linear'):
+        raise ValueError(f'Unknown soft-NMS method {method!r}')
+    boxes = _as_boxes(boxes)
+    scores = np.asarray(scores, dtype=np.float64).copy()
+    overlaps = _OverlapIndex(boxes)
+    remaining = np.flatnonzero(scores >= score_threshold)
+    keep, kept_scores = [], []
+    while remaining.size:
+        best = np.argmax(scores[remaining])
+        index = remaining[best]
+        keep.append(index)
+        kept_scores.append(scores[index])
+        remaining = np.delete(remaining, best)
+        if not remaining.size:
+            break
+        iou = overlaps.iou(index, remaining)
+        if method == 'gaussian':
+            decay = np.exp(-(iou ** 2) / sigma)
+        else:
+            decay = np.where(iou > iou_threshold, 1 - iou, 1.0)
+        scores[remaining] *= decay
+        remaining = remaining[scores[remaining] >= score_threshold]
+    return np.array(keep, dtype=np.int64), np.array(kept_scores)
+
+
+def weighted_boxes_fusion(
+        boxes: np.ndarray,
+        scores: np.ndarray,
+        labels: np.ndarray=None,
+        iou_threshold: float=0.55
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Weighted boxes fusion. Boxes are clustered greedily by decreasing score, a box joins
+    the first cluster of the same label whose fused box it overlaps by more than
+    iou_threshold. Each cluster is fused into the score-weighted average of its boxes.
+
+    :param boxes: (N, 4) or (N, 5) array of (cx, cy, width, height[, angle])
+    :param scores: (N,) array of scores
+    :param labels: (N,) array of labels or label codes, all boxes are fused together if None
+    :param iou_threshold: minimum overlap with a fused box to join its cluster
+    :return: (K, 5) fused boxes, (K,) mean scores and (K,) index of the highest scoring
+        box of each cluster, by decreasing score
+    """
+    boxes = _as_boxes(boxes)
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.zeros(len(boxes), dtype=np.int64) if labels is None else np.asarray(labels)
+    order = np.argsort(-scores, kind='stable')
+    fused, clusters, cluster_labels = [], [], []
+    for index in order:
+        match = -1
+        same_label = [c for c, label in enumerate(cluster_labels) if label == labels[index]]
+        if same_label:
+            iou = box_iou(boxes[index:index + 1], np.array([fused[c] for c in same_label]))[0]
+            best = int(np.argmax(iou))
+            if iou[best] > iou_threshold:
+                match = same_label[best]
+        if match < 0:
+            fused.append(boxes[index].copy())
+            clusters.append([index])
+            cluster_labels.append(labels[index])
+            continue
+        clusters[match].append(index)
+        members = np.array(clusters[match])
+        weights = scores[members]
+        fused[match] = (boxes[members] * weights[:, None]).sum(axis=0) / weights.sum()
+
+    if not fused:
+        return np.empty((0, 5)), np.empty(0), np.empty(0, dtype=np.int64)
+    fused_scores = np.array([scores[members].mean() for members in clusters])
+    representatives = np.array([members[0] for members in clusters], dtype=np.int64)
+    result_order = np.argsort(-fused_scores, kind='stable')
+    return np.array(fused)[result_order], fused_scores[result_order], representatives[result_order]
+
+
+def suppress_detections(batch: DetectionBatch, iou_threshold: float=0.5, class_agnostic: bool=False) -> DetectionBatch:
+    """
+    Runs non-maximum suppression on a batch of detections.
+
+    :param batch: detections to suppress
+    :param iou_threshold: detections overlapping a kept detection by more than this are suppressed
+    :param class_agnostic: whether detections of different classes suppress each other
+    :return: batch holding the kept detections, by decreasing confidence
+    """
+    if class_agnostic:
+        keep = nms(batch.boxes, batch.confidences, iou_threshold)
+    else:
+        keep = batched_nms(batch.boxes, batch.confidences, batch.label_codes, iou_threshold)
+    return batch.select(keep)
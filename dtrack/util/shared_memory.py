@@ -0,0 +1,33 @@
+from multiprocessing import resource_tracker, shared_memory
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to an existing shared memory block without leaving it registered with the
+    resource tracker. A process with a tracker of its own would otherwise unlink the block
+    when it exits, while its creator still uses it. Before Python 3.13 registration cannot
+    be turned off, so the block is unregistered again right after attaching.
+
+    :param name: name of the shared memory block
+    :return: the attached block, to close but not unlink
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def unlink_shared_memory(shm: shared_memory.SharedMemory):
+    """
+    Removes a shared memory block created by this process. The block is registered again
+    first: a process attached with attach_shared_memory that shares this process's tracker,
+    such as a spawned worker, has unregistered it, and the tracker reports unregistering
+    an unknown block as an error.
+
+    :param shm: block to remove
+    """
+    resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+from dtrack.detection.detector import ObjectDetector
+from dtrack.io.stream import ImageStream
+from dtrack.tracking.distance.distance_algorithm import DistanceAlgorithm
+from dtrack.util import Box, Detection, Image
+
+
+# Difference in brightness between consecutive frames of the test videos and image sequences
+BRIGHTNESS_STEP = 10
+
+# Rectangles (x, y, width, height) of three blobs of different sizes in a 400x300 frame
+BLOBS = ((10, 10, 20, 10), (190, 140, 20, 20), (370, 280, 20, 10))
+
+
+class BlobDetector(ObjectDetector):
+    """
+    Detects white rectangles, with boxes relative to the image's scale factor.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, image):
+        self.calls.append(image.image.shape[:2])
+        gray = image.image[:, :, 0]
+        n, _, stats, _ = cv2.connectedComponentsWithStats((gray > 127).astype(np.uint8))
+        return [
+            Detection('blob', None, 1.0, Box(x + w / 2, y + h / 2, w, h, 0, image.scale_factor), None)
+            for x, y, w, h, _ in stats[1:]
+        ]
+
+
+class CentreDistance(DistanceAlgorithm):
+    """
+    Distance between the centres of the boxes.
+    """
+
+    def distance(self, trackable_object, detection):
+        box = trackable_object.bounding_box
+        return float(np.hypot(box.cx - detection.box.cx, box.cy - detection.box.cy))
+
+    def compute_features(self, target):
+        return None
+
+
+class CountingImageStream(ImageStream):
+    """
+    A stream of small frames whose pixels and frame index hold the frame index.
+    """
+
+    def __init__(self, n_frames):
+        super().__init__()
+        self.n_frames = n_frames
+        self.index = 0
+
+    def _advance(self):
+        if self.index >= self.n_frames:
+            self.current_image = None
+            return
+        self.current_image = Image(None, np.full((2, 2, 3), self.index % 256, dtype=np.uint8), frame_index=self.index)
+        self.index += 1
+
+
+class FakeContext:
+    """
+    Minimal stand-in for the application context.
+    """
+
+    def __init__(self, frame_image=None, frame_number=0, trackable_objects=None):
+        self.frame_image = frame_image
+        self.frame_number = frame_number
+        self.trackable_objects = trackable_objects if trackable_objects is not None else {}
+        self.object_detections = None
+        self.pipeline_step_results = {}
+
+
+def blob_frame(*blobs, width=400, height=300):
+    """
+    A black frame with a white rectangle at each (x, y, width, height) of blobs.
+    """
+    content = np.zeros((height, width, 3), dtype=np.uint8)
+    for x, y, w, h in blobs:
+        content[y:y + h, x:x + w] = 255
+    return Image(None, content)
+
+
+def brightness(image):
+    """
+    The index of a frame whose pixels were all set to the index times BRIGHTNESS_STEP.
+    """
+    return int(round(image.image.mean() / BRIGHTNESS_STEP))
@@ -0,0 +1,17 @@
+import cv2
+import numpy as np
+import pytest
+from tests.helpers import BRIGHTNESS_STEP
+
+
+@pytest.fixture
+def video(tmp_path):
+    """
+    A 20 frame MJPG video, the pixels of each frame set to its index times BRIGHTNESS_STEP.
+    """
+    path = str(tmp_path / 'video.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+    for index in range(20):
+        writer.write(np.full((48, 64, 3), index * BRIGHTNESS_STEP, dtype=np.uint8))
+    writer.release()
+    return path
@@ -0,0 +1,207 @@
+import time
+import numpy as np
+import pytest
+from dtrack.application import DTrackApplication
+from dtrack.io.stream import ImageStream
+from dtrack.pipeline import Pipeline
+from dtrack.pipeline.arguments import Context, FrameNumber
+from dtrack.pipeline.step import pipeline_step
+from dtrack.pipeline.util import ObjectTrackingStep
+from dtrack.tracking.movement.kalmann_filter import KalmannFilter
+from dtrack.tracking.movement.predictor import MovementPredictor
+from dtrack.tracking.trackable.default_object import DefaultTrackableObject
+from dtrack.util import Box, Detection, DetectionBatch, Image, ScaleFactor
+from tests.helpers import CentreDistance
+
+
+class BlankImageStream(ImageStream):
+    """
+    A stream of blank in-memory frames.
+    """
+
+    def __init__(self, n_frames):
+        super().__init__()
+        self.n_frames = n_frames
+        self.index = 0
+
+    def _advance(self):
+        if self.index >= self.n_frames:
+            self.current_image = None
+            return
+        self.index += 1
+        self.current_image = Image(None, np.zeros((10, 10, 3), dtype=np.uint8))
+
+
+class TimedImageStream(BlankImageStream):
+    """
+    A stream of blank frames with timestamps, sleeping before some of them.
+    """
+
+    def __init__(self, n_frames, period, delays):
+        super().__init__(n_frames)
+        self.period = period
+        self.delays = delays
+
+    def _advance(self):
+        time.sleep(self.delays.get(self.index, 0))
+        super()._advance()
+        if self.current_image is not None:
+            self.current_image = Image(None, self.current_image.image, timestamp=(self.index - 1) * self.period)
+
+
+class StillPredictor(MovementPredictor):
+    """
+    A movement predictor that makes no predictions.
+    """
+
+    def to_json(self):
+        return '{}'
+
+    def to_dict(self):
+        return {}
+
+    @classmethod
+    def from_json(cls, json_string):
+        return cls()
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls()
+
+
+def _application(*steps):
+    pipeline = Pipeline('test')
+    for step in steps:
+        pipeline.add_step(step)
+    return DTrackApplication(tracked_class='test', pipeline=pipeline)
+
+
+class TestDTrackApplication:
+
+    def test_process_image_stream_pipelined(self):
+        """
+        Test that pipelined processing gives the same results as sequential processing.
+        """
+        @pipeline_step('frame', FrameNumber(), frame_independent=True)
+        def frame(frame_number):
+            return frame_number
+
+        @pipeline_step('double', FrameNumber())
+        def double(frame_number):
+            return frame_number * 2
+
+        application = _application(frame, double)
+        results = list(application.process_image_stream_pipelined(
+            BlankImageStream(20), progress_bar=False, detection_workers=3
+        ))
+        assert [result['pipeline_step_results'] for result in results] == [
+            {'frame': n, 'double': n * 2} for n in range(20)
+        ]
+        assert application.frame_number == 20
+
+    def test_process_image_stream_realtime(self):
+        """
+        Test that frames are skipped once processing falls a frame period behind.
+        """
+        @pipeline_step('slow', FrameNumber())
+        def slow(frame_number):
+            time.sleep(0.05 if frame_number == 0 else 0)
+            return frame_number
+
+        @pipeline_step('optional', FrameNumber(), critical=False)
+        def optional(frame_number):
+            return frame_number
+
+        application = _application(slow, optional)
+        results = list(application.process_image_stream_realtime(BlankImageStream(4), 0.02, progress_bar=False))
+        assert [result['frame_skipped'] for result in results] == [False, True, False, False]
+        assert results[1]['pipeline_step_results'] == {}
+        assert results[1]['predicted_locations'] == {}
+        assert [result['frame_number'] for result in results] == [0, 1, 2, 3]
+        assert results[3]['pipeline_step_results'] == {'slow': 3, 'optional': 3}
+
+    def test_process_image_stream_realtime_lag(self):
+        """
+        Test that time spent waiting for the stream counts as lag, measured against the frame timestamps.
+        """
+        @pipeline_step('frame', FrameNumber())
+        def frame(frame_number):
+            return frame_number
+
+        application = _application(frame)
+        results = application.process_image_stream_realtime(
+            TimedImageStream(3, 0.02, {1: 0.05}), 0.02, progress_bar=False
+        )
+        assert [result['frame_skipped'] for result in results] == [False, True, False]
+
+        application = _application(frame)
+        results = application.process_image_stream_realtime(
+            TimedImageStream(3, 1.0, {1: 0.05}), 0.02, progress_bar=False
+        )
+        assert [result['frame_skipped'] for result in results] == [False, False, False]
+
+    def test_process_image_stream_realtime_predictions(self):
+        """
+        Test that skipped frames hold the predicted locations of tracked objects.
+        """
+        application = _application()
+        box = Box(10, 20, 4, 4, 0, ScaleFactor(100, 100))
+        moving = DefaultTrackableObject('test', None, box, KalmannFilter(), 0)
+        for cx in (12, 14):
+            moving.update(Detection('test', None, 0.9, Box(cx, 20, 4, 4, 0, ScaleFactor(100, 100)), None), 0)
+        application.tracked_objects = {
+            'moving': moving,
+            'still': DefaultTrackableObject('test', None, box, StillPredictor(), 0),
+        }
+        results = list(application.process_image_stream_realtime(
+            TimedImageStream(2, 0.02, {1: 0.05}), 0.02, progress_bar=False
+        ))
+        assert results[1]['frame_skipped']
+        assert results[1]['predicted_locations'] == {
+            'moving': moving.predict_locations(1)[-1],
+            'still': (10, 20),
+        }
+
+    def test_process_detections(self):
+        """
+        Test that detections are passed to the steps after detection, without an image.
+        """
+        @pipeline_step('object_detection', FrameNumber())
+        def detect(frame_number):
+            raise AssertionError('Detection must not run')
+
+        @pipeline_step('count', Context())
+        def count(context):
+            assert context.frame_image is None
+            return len(context.object_detections)
+
+        application = _application(detect, count)
+        batch = DetectionBatch.from_arrays(['test'] * 2, np.ones(2), np.ones((2, 4)), ScaleFactor(1, 1))
+        assert application.process_detections(3, batch)['pipeline_step_results'] == {'count': 2}
+        assert application.frame_number == 4
+        with pytest.raises(ValueError):
+            application.process_detections(2, batch)
+
+        results = list(application.process_detection_batches([batch, [], batch]))
+        assert [result['frame_number'] for result in results] == [4, 5, 6]
+        assert [result['pipeline_step_results']['count'] for result in results] == [2, 0, 2]
+
+    def test_process_detections_tracking(self):
+        """
+        Test that detections made outside of the application are tracked by the object tracking step.
+        """
+        pipeline = Pipeline('test')
+        pipeline.add_step(ObjectTrackingStep(CentreDistance(), 5, 'car'))
+        application = DTrackApplication(tracked_class='car', pipeline=pipeline, delete_after=1)
+
+        def detection(cx, cy):
+            return Detection('car', None, 0.9, Box(cx, cy, 4, 4, 0, ScaleFactor(100, 100)), None)
+
+        application.process_detections(0, [detection(10, 10)])
+        application.process_detections(1, [detection(12, 10), detection(50, 50)])
+        batch = DetectionBatch.from_arrays(['car'], np.ones(1), np.array([[14.0, 10, 4, 4]]), ScaleFactor(100, 100))
+        list(application.process_detection_batches([batch, []]))
+        assert len(application.tracked_objects) == 1
+        tracked = next(iter(application.tracked_objects.values()))
+        assert tracked.class_name == 'car'
+        assert tracked.location_history == [(10, 10), (12, 10), (14, 10)]
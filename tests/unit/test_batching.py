@@ -0,0 +1,104 @@
+import threading
+import numpy as np
+import pytest
+from dtrack.detection.batching import BatchingObjectDetector
+from dtrack.detection.detector import ObjectDetector
+from dtrack.util import Box, Detection, Image, ScaleFactor
+
+
+class RecordingDetector(ObjectDetector):
+    """
+    Returns the mean pixel value as the confidence, and records batch sizes.
+    """
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def detect(self, image):
+        return [Detection('mean', None, float(image.image.mean()), Box(0, 0, 1, 1, 0, ScaleFactor(1, 1)), None)]
+
+    def detect_batch(self, images):
+        self.batch_sizes.append(len(images))
+        return super().detect_batch(images)
+
+
+class FailingDetector(ObjectDetector):
+
+    def detect(self, image):
+        raise RuntimeError('failed')
+
+
+def _frame(value):
+    return Image(None, np.full((4, 4, 3), value, dtype=np.uint8))
+
+
+class TestBatchingObjectDetector:
+
+    def test_concurrent_calls_are_batched(self):
+        """
+        Test that concurrent detect calls are grouped and each gets its own result.
+        """
+        detector = RecordingDetector()
+        batching = BatchingObjectDetector(detector, max_batch_size=4, max_batch_wait=0.5)
+        results = {}
+
+        def detect(value):
+            results[value] = batching.detect(_frame(value))[0].confidence
+
+        threads = [threading.Thread(target=detect, args=(value,)) for value in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batching.close()
+        assert results == {value: value for value in range(8)}
+        assert detector.batch_sizes == [4, 4]
+        assert batching.mean_batch_size == 4
+
+    def test_max_batch_wait(self):
+        """
+        Test that a partial batch is sent after the maximum wait.
+        """
+        detector = RecordingDetector()
+        batching = BatchingObjectDetector(detector, max_batch_size=16, max_batch_wait=0.01)
+        assert batching.detect(_frame(3))[0].confidence == 3
+        batching.close()
+        assert detector.batch_sizes == [1]
+
+    def test_errors_are_raised(self):
+        """
+        Test that a detector error is raised to every caller in the batch.
+        """
+        batching = BatchingObjectDetector(FailingDetector(), max_batch_wait=0)
+        with pytest.raises(RuntimeError):
+            batching.detect(_frame(0))
+        batching.close()
+
+    def test_array_arguments(self):
+        """
+        Test that calls with numpy array arguments are batched only with the same array, and never hang.
+        """
+        class MaskedDetector(RecordingDetector):
+            def detect(self, image, mask=None):
+                return [Detection('mean', None, float(mask.sum()), Box(0, 0, 1, 1, 0, ScaleFactor(1, 1)), None)]
+
+            def detect_batch(self, images, mask=None):
+                self.batch_sizes.append(len(images))
+                return [self.detect(image, mask=mask) for image in images]
+
+        detector = MaskedDetector()
+        batching = BatchingObjectDetector(detector, max_batch_size=4, max_batch_wait=0.2)
+        shared = np.ones(3)
+        futures = [batching.submit(_frame(0), mask=np.ones(2)), batching.submit(_frame(0), mask=shared),
+                   batching.submit(_frame(0), mask=shared)]
+        assert [future.result(timeout=5)[0].confidence for future in futures] == [2, 3, 3]
+        batching.close()
+        assert sorted(detector.batch_sizes) == [1, 2]
+
+    def test_no_wait_without_batch_support(self):
+        """
+        Test that batches are not waited for when the detector only detects image by image.
+        """
+        batching = BatchingObjectDetector(FailingDetector(), max_batch_wait=10)
+        assert batching.max_batch_wait == 0
+        batching.close()
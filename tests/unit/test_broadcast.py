@@ -0,0 +1,113 @@
+import threading
+import numpy as np
+import pytest
+from dtrack.application import DTrackApplication
+from dtrack.io.broadcast import BroadcastStreamHub
+from dtrack.pipeline import Pipeline
+from dtrack.pipeline.arguments import Image as FrameImage
+from dtrack.pipeline.step import pipeline_step
+from tests.helpers import CountingImageStream
+
+
+def _application(step):
+    pipeline = Pipeline('test')
+    pipeline.add_step(step)
+    return DTrackApplication(tracked_class='test', pipeline=pipeline)
+
+
+@pipeline_step('value', FrameImage())
+def value(frame_image):
+    return int(frame_image.image[0, 0, 0])
+
+
+@pipeline_step('value', FrameImage())
+def modify(frame_image):
+    frame_image.image[0, 0, 0] = 0
+
+
+class TestBroadcastStreamHub:
+
+    def test_every_application_gets_every_frame(self):
+        """
+        Test that the stream is decoded once and every application processes all of its frames.
+        """
+        stream = CountingImageStream(50)
+        hub = BroadcastStreamHub(stream)
+        results = {'a': [], 'b': []}
+        hub.run(
+            {'a': _application(value), 'b': _application(value)},
+            on_result=lambda name, result: results[name].append(result['pipeline_step_results']['value'])
+        )
+        assert stream.index == 50 and hub.frames == 50
+        assert results == {'a': list(range(50)), 'b': list(range(50))}
+
+    def test_frames_are_shared_and_read_only(self):
+        """
+        Test that consumers share the frame content, cannot modify it, and have their own images.
+        """
+        hub = BroadcastStreamHub(CountingImageStream(1))
+        first, second = hub.subscribe(), hub.subscribe()
+        hub.start()
+        a, b = next(first), next(second)
+        assert a is not b
+        assert np.shares_memory(a.image, b.image)
+        assert not a.image.flags.writeable
+        assert next(first, None) is None
+        hub.close()
+
+    def test_modifying_frames_fails(self):
+        """
+        Test that a pipeline modifying the shared frame in place raises an error.
+        """
+        hub = BroadcastStreamHub(CountingImageStream(5))
+        with pytest.raises(ValueError):
+            hub.run({'a': _application(modify)})
+
+    def test_drop_newest(self):
+        """
+        Test that a consumer dropping new frames keeps the oldest ones, without slowing the others.
+        """
+        hub = BroadcastStreamHub(CountingImageStream(20))
+        slow = hub.subscribe(queue_size=2, drop_policy='drop_newest')
+        fast = hub.subscribe(queue_size=20)
+        hub.start()
+        assert [image.frame_index for image in fast] == list(range(20))
+        assert [image.frame_index for image in slow] == [0, 1]
+        assert slow.dropped_frames == 18
+        hub.close()
+
+    def test_drop_oldest(self):
+        """
+        Test that a consumer dropping old frames keeps the most recent ones.
+        """
+        hub = BroadcastStreamHub(CountingImageStream(20))
+        slow = hub.subscribe(queue_size=3, drop_policy='drop_oldest')
+        fast = hub.subscribe(queue_size=20)
+        hub.start()
+        assert len(list(fast)) == 20
+        assert [image.frame_index for image in slow] == [17, 18, 19]
+        assert slow.dropped_frames == 17
+        hub.close()
+
+    def test_block_waits_for_consumer(self):
+        """
+        Test that a blocking consumer paces the source, and that closing it releases the hub.
+        """
+        stream = CountingImageStream(100)
+        hub = BroadcastStreamHub(stream)
+        subscription = hub.subscribe(queue_size=2)
+        hub.start()
+        assert next(subscription).frame_index == 0
+        threading.Event().wait(0.05)
+        assert stream.index <= 5
+        subscription.close()
+        hub._thread.join(timeout=5)
+        assert hub.frames == 100
+        hub.close()
+
+    def test_invalid_drop_policy(self):
+        """
+        Test that unknown drop policies are rejected.
+        """
+        with pytest.raises(ValueError):
+            BroadcastStreamHub(CountingImageStream(1)).subscribe(drop_policy='latest')
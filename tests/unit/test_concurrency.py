@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+import pytest
+from dtrack.util.concurrency import Stage, StagedExecution, iterate_async
+
+
+class TestStagedExecution:
+
+    def test_order_is_preserved(self):
+        """
+        Test that items come out in source order.
+        """
+        stages = [
+            Stage('add', lambda x: x + 1),
+            Stage('double', lambda x: x * 2, workers=4),
+            Stage('str', str),
+        ]
+        assert list(StagedExecution(range(20), stages)) == [str((x + 1) * 2) for x in range(20)]
+
+    def test_parallel_workers_preserve_order(self):
+        """
+        Test that a stage with several workers hands results on in order, even
+        when later items finish first.
+        """
+        def slow_for_even(x):
+            time.sleep(0.02 if x % 2 == 0 else 0)
+            return x
+
+        stages = [Stage('slow', slow_for_even, workers=3)]
+        assert list(StagedExecution(range(10), stages, queue_size=2)) == list(range(10))
+
+    def test_stages_overlap(self):
+        """
+        Test that consecutive stages work on different items at the same time.
+        """
+        lock = threading.Lock()
+        active = set()
+        overlaps = []
+
+        def track(name):
+            def function(x):
+                with lock:
+                    active.add(name)
+                    overlaps.append(len(active))
+                time.sleep(0.005)
+                with lock:
+                    active.discard(name)
+                return x
+            return function
+
+        stages = [Stage('a', track('a')), Stage('b', track('b')), Stage('c', track('c'))]
+        assert list(StagedExecution(range(10), stages)) == list(range(10))
+        assert max(overlaps) > 1
+
+    def test_exception_is_raised(self):
+        """
+        Test that an exception in a stage is raised to the consumer.
+        """
+        def fail_on_three(x):
+            if x == 3:
+                raise RuntimeError('failed')
+            return x
+
+        results = []
+        with pytest.raises(RuntimeError):
+            for item in StagedExecution(range(10), [Stage('fail', fail_on_three)]):
+                results.append(item)
+        assert results == [0, 1, 2]
+
+    def test_early_close(self):
+        """
+        Test that stopping iteration early shuts down the stages.
+        """
+        stages = [Stage('identity', lambda x: x, workers=2)]
+        execution = StagedExecution(iter(range(1000)), stages, queue_size=2)
+        iterator = iter(execution)
+        assert next(iterator) == 0
+        iterator.close()
+        assert all(not thread.is_alive() for thread in execution._threads)
+
+    def test_stage_statistics(self):
+        """
+        Test that stages record the items they processed.
+        """
+        stage = Stage('identity', lambda x: x)
+        list(StagedExecution(range(5), [stage]))
+        assert stage.items_processed == 5
+        assert set(StagedExecution(range(5), [stage]).queue_depths) == {'identity', 'output'}
+
+    def test_parallel_stage_statistics(self):
+        """
+        Test that a stage with several workers counts every item it processed.
+        """
+        stage = Stage('identity', lambda x: x, workers=8)
+        list(StagedExecution(range(2000), [stage], queue_size=16))
+        assert stage.items_processed == 2000
+        assert stage.busy_time > 0
+
+
+class TestIterateAsync:
+
+    def test_sync_iterable(self):
+        """
+        Test iterating over a synchronous iterable.
+        """
+        async def collect():
+            return [item async for item in iterate_async(range(5))]
+
+        assert asyncio.run(collect()) == list(range(5))
+
+    def test_async_iterable(self):
+        """
+        Test iterating over an asynchronous iterable.
+        """
+        async def source():
+            for item in range(5):
+                yield item
+
+        async def collect():
+            return [item async for item in iterate_async(source())]
+
+        assert asyncio.run(collect()) == list(range(5))
@@ -0,0 +1,84 @@
+import numpy as np
+from dtrack.util import Box, Detection, DetectionBatch, ScaleFactor
+
+
+def _detections():
+    return [
+        Detection("car", "red", 0.9, Box(10, 10, 4, 4, 0, ScaleFactor(100, 100)), None),
+        Detection("person", None, 0.4, Box(20, 30, 2, 6, 0, ScaleFactor(100, 100)), None),
+        Detection("car", "blue", 0.6, Box(50, 50, 8, 4, 45, ScaleFactor(100, 100)), None),
+    ]
+
+
+class TestDetectionBatch:
+
+    def test_from_detections_round_trip(self):
+        """
+        Test that converting to a batch and back gives the same detections.
+        """
+        batch = DetectionBatch.from_detections(_detections())
+        assert len(batch) == 3
+        assert batch.categories == ["car", "person"]
+        assert batch.to_detections() == _detections()
+        assert batch[1].subclass_label is None
+        assert batch[-1] == _detections()[2]
+
+    def test_from_arrays(self):
+        """
+        Test creating a batch from columnar arrays with axis-aligned boxes.
+        """
+        batch = DetectionBatch.from_arrays(
+            ["car", "car"],
+            np.array([0.5, 0.7]),
+            np.array([[1, 2, 3, 4], [5, 6, 7, 8]]),
+            ScaleFactor(10, 20)
+        )
+        assert batch.boxes.shape == (2, 5)
+        assert batch[1] == Detection("car", None, 0.7, Box(5, 6, 7, 8, 0, ScaleFactor(10, 20)), None)
+        assert len(DetectionBatch.from_arrays([], np.empty(0), np.empty(0), ScaleFactor(1, 1))) == 0
+
+    def test_of_class(self):
+        """
+        Test filtering by class.
+        """
+        batch = DetectionBatch.from_detections(_detections())
+        cars = batch.of_class("car")
+        assert [detection.subclass_label for detection in cars] == ["red", "blue"]
+        assert len(batch.of_class("truck")) == 0
+        assert len(batch.of_classes(["car", "person", "truck"])) == 3
+
+    def test_above_confidence(self):
+        """
+        Test filtering by confidence.
+        """
+        batch = DetectionBatch.from_detections(_detections())
+        assert batch.above_confidence(0.5).labels == ["car", "car"]
+
+    def test_select(self):
+        """
+        Test selecting with slices, masks and indices.
+        """
+        batch = DetectionBatch.from_detections(_detections())
+        assert batch[1:].labels == ["person", "car"]
+        assert batch[np.array([True, False, True])].labels == ["car", "car"]
+        assert batch[[2, 0]].labels == ["car", "car"]
+
+    def test_masks(self):
+        """
+        Test that masks are kept with their detections.
+        """
+        detections = _detections()
+        detections[1].mask = np.ones((2, 2), dtype=bool)
+        batch = DetectionBatch.from_detections(detections)
+        assert batch[0].mask is None
+        np.testing.assert_array_equal(batch.of_class("person")[0].mask, np.ones((2, 2), dtype=bool))
+
+    def test_concatenate(self):
+        """
+        Test joining batches with different categories.
+        """
+        first = DetectionBatch.from_detections(_detections()[:1])
+        second = DetectionBatch.from_detections(_detections()[1:])
+        joined = DetectionBatch.concatenate([first, DetectionBatch.empty(), second])
+        assert joined.to_detections() == _detections()
+        assert [detection.subclass_label for detection in joined] == ["red", None, "blue"]
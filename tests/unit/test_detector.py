@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from dtrack.detection.detector import AsyncObjectDetector, ObjectDetector
+from dtrack.util import Box, Detection, Image, ScaleFactor
+
+
+def _detection(label):
+    return Detection(label, label, 0.5, Box(5, 5, 10, 10, 0, ScaleFactor(100, 100)), None)
+
+
+class SyncDetector(ObjectDetector):
+
+    def detect(self, image):
+        return [_detection('sync')]
+
+
+class AsyncDetector(AsyncObjectDetector):
+
+    def __init__(self):
+        self.loops = []
+
+    async def detect_async(self, image):
+        self.loops.append(asyncio.get_running_loop())
+        await asyncio.sleep(0)
+        return [_detection('async')]
+
+
+class TestObjectDetector:
+
+    def test_detect_async_runs_detect(self):
+        """
+        Test that the default detect_async calls detect.
+        """
+        detections = asyncio.run(SyncDetector().detect_async(Image("tests/data/test.jpg")))
+        assert detections == [_detection('sync')]
+
+    def test_async_detector_detect(self):
+        """
+        Test that an async detector can be called synchronously.
+        """
+        assert AsyncDetector().detect(Image("tests/data/test.jpg")) == [_detection('async')]
+
+    def test_async_detector_detect_reuses_loop(self):
+        """
+        Test that synchronous calls on one thread share an event loop, and are rejected inside a running loop.
+        """
+        detector = AsyncDetector()
+        image = Image("tests/data/test.jpg")
+        detector.detect(image)
+        detector.detect(image)
+        assert detector.loops[0] is detector.loops[1]
+        assert not detector.loops[0].is_running()
+
+        async def detect():
+            return detector.detect(image)
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(detect())
+
+    def test_async_detector_detect_async(self):
+        """
+        Test that an async detector can be awaited.
+        """
+        detections = asyncio.run(AsyncDetector().detect_async(Image("tests/data/test.jpg")))
+        assert detections == [_detection('async')]
+
+    def test_detect_batch_runs_detect(self):
+        """
+        Test that the default detect_batch calls detect for each image.
+        """
+        image = Image("tests/data/test.jpg")
+        assert SyncDetector().detect_batch([image, image]) == [[_detection('sync')], [_detection('sync')]]
@@ -0,0 +1,93 @@
+import cv2
+import numpy as np
+import pytest
+from dtrack.io.directory import DirectoryImageStream, list_images
+from dtrack.util import ScaleFactor
+from dtrack.util.image_cache import ImageContentCache
+from tests.helpers import BRIGHTNESS_STEP, brightness
+
+
+@pytest.fixture
+def directory(tmp_path):
+    for index in range(12):
+        content = np.full((64, 96, 3), index * BRIGHTNESS_STEP, dtype=np.uint8)
+        cv2.imwrite(str(tmp_path / f'frame_{index:03d}.jpg'), content)
+    (tmp_path / 'notes.txt').write_text('not an image')
+    return tmp_path
+
+
+class TestDirectoryImageStream:
+
+    def test_list_images(self, directory):
+        """
+        Test listing a directory and a glob pattern.
+        """
+        assert len(list_images(str(directory))) == 12
+        assert len(list_images(str(directory / 'frame_00*.jpg'))) == 10
+
+    def test_order(self, directory):
+        """
+        Test that files decoded in parallel are handed on in order.
+        """
+        with DirectoryImageStream(str(directory), workers=4, queue_size=3) as stream:
+            images = list(stream)
+        assert [brightness(image) for image in images] == list(range(12))
+        assert [image.frame_index for image in images] == list(range(12))
+        assert images[0].filename.endswith('frame_000.jpg')
+        assert images[0].source_scale_factor == ScaleFactor(96, 64)
+
+    @pytest.mark.parametrize('reduction', [2, 4, 8])
+    def test_reduced_grayscale(self, directory, reduction):
+        """
+        Test decoding at a reduced resolution to grayscale.
+        """
+        stream = DirectoryImageStream(str(directory), reduction=reduction, grayscale=True)
+        image = next(stream)
+        stream.close()
+        assert image.image.shape == (64 // reduction, 96 // reduction)
+        assert image.scale_factor == ScaleFactor(96 // reduction, 64 // reduction)
+        assert image.source_scale_factor == ScaleFactor(96, 64)
+
+    def test_unreadable_file(self, tmp_path):
+        """
+        Test that a file that cannot be decoded raises an error.
+        """
+        (tmp_path / 'broken.jpg').write_bytes(b'not a jpeg')
+        with pytest.raises(IOError):
+            list(DirectoryImageStream(str(tmp_path)))
+
+    def test_content_cache(self, directory):
+        """
+        Test that images kept by the consumer stay within the budget of the content cache.
+        """
+        cache = ImageContentCache(max_bytes=3 * 48 * 32 * 3)
+        with DirectoryImageStream(str(directory), content_cache=cache, reduction=2) as stream:
+            images = list(stream)
+        assert [brightness(image) for image in images] == list(range(12))
+        assert len(cache) == 3
+        assert images[0].scale_factor == ScaleFactor(48, 32)
+
+    def test_content_cache_does_not_decode_again(self, tmp_path, monkeypatch):
+        """
+        Test that frames decoded ahead are not evicted before the consumer uses them, even when the
+        read ahead is larger than the budget of the cache.
+        """
+        for index in range(40):
+            cv2.imwrite(str(tmp_path / f'frame_{index:03d}.png'), np.full((8, 8, 3), index, dtype=np.uint8))
+        decodes = []
+        imread = cv2.imread
+
+        def counting_imread(*args):
+            decodes.append(args[0])
+            return imread(*args)
+
+        monkeypatch.setattr(cv2, 'imread', counting_imread)
+        cache = ImageContentCache(max_bytes=3 * 8 * 8 * 3)
+        with DirectoryImageStream(str(tmp_path), content_cache=cache, workers=4, queue_size=8) as stream:
+            images = []
+            for image in stream:
+                assert int(image.image[0, 0, 0]) == len(images)
+                images.append(image)
+        assert len(decodes) == 40 and len(cache) == 3
+        assert int(images[0].image[0, 0, 0]) == 0
+        assert len(decodes) == 41
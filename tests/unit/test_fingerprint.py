@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from dtrack.detection.detector import ObjectDetector
+from dtrack.pipeline.util import DuplicateFrameDetectionStep
+from dtrack.util import Image
+from dtrack.util.fingerprint import dhash, hamming_distance, thumbnail, thumbnail_difference
+from tests.helpers import FakeContext
+
+
+class CountingDetector(ObjectDetector):
+    """
+    Returns the number of calls so far as its detections.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, image):
+        self.calls += 1
+        return [self.calls]
+
+
+def _frame(value, noise=0, seed=0):
+    content = np.full((120, 160, 3), value, dtype=np.uint8)
+    content[40:80, 60:100] = 255 - value
+    if noise:
+        rng = np.random.default_rng(seed)
+        content = np.clip(content + rng.integers(-noise, noise + 1, content.shape), 0, 255).astype(np.uint8)
+    return Image(None, content)
+
+
+class TestFingerprint:
+
+    def test_thumbnail(self):
+        """
+        Test that thumbnails are grayscale and of the requested size.
+        """
+        small = thumbnail(_frame(0).image, (16, 8))
+        assert small.shape == (8, 16)
+        assert thumbnail_difference(small, small) == 0
+
+    def test_dhash(self):
+        """
+        Test that identical images have equal hashes and different images do not.
+        """
+        a, b = dhash(_frame(0).image), dhash(_frame(0).image)
+        assert a == b
+        assert hamming_distance(a, dhash(_frame(200).image)) > 0
+        assert hamming_distance(0b1011, 0b0110) == 3
+
+
+class TestDuplicateFrameDetectionStep:
+
+    @pytest.mark.parametrize('method', ['thumbnail', 'dhash'])
+    def test_duplicates_reuse_detections(self, method):
+        """
+        Test that repeated frames reuse the previous detections, and changed frames are detected.
+        """
+        detector = CountingDetector()
+        step = DuplicateFrameDetectionStep(detector, method=method)
+        results = []
+        for frame in [_frame(0), _frame(0, noise=2, seed=1), _frame(0), _frame(200), _frame(200)]:
+            context = FakeContext(frame)
+            step.detect(context)
+            results.append(context.object_detections)
+        assert results == [[1], [1], [1], [2], [2]]
+        assert step.skip_rate == 0.6
+
+    def test_threshold(self):
+        """
+        Test that a threshold of zero only skips exact duplicates.
+        """
+        detector = CountingDetector()
+        step = DuplicateFrameDetectionStep(detector, threshold=0)
+        for frame in [_frame(0), _frame(0), _frame(0, noise=20, seed=1)]:
+            step.detect(FakeContext(frame))
+        assert detector.calls == 2
@@ -1,4 +1,6 @@
+import pickle
 import numpy as np
+import pytest
 from dtrack.util.image import Image
 from dtrack.util.scale_factor import ScaleFactor
 from dtrack.util.detection import Detection
@@ -65,4 +67,99 @@ class TestImage:
         Test the __str__ method.
         """
         image = Image("tests/data/test.jpg")
-        assert_ignore_whitespace_string_equal(str(image), "Image(filename=tests/data/test.jpg shape=(100, 100) detections=[])")
\ No newline at end of file
+        assert_ignore_whitespace_string_equal(str(image), "Image(filename=tests/data/test.jpg shape=(100, 100) detections=[])")
+
+    def test_resize(self):
+        """
+        Test that resizing keeps the frame attributes and shares one cached resize per size.
+        """
+        image = Image(None, np.arange(48, dtype=np.uint8).reshape(6, 8), timestamp=1.5, frame_index=3)
+        resized = image.resize(4, 3)
+        assert resized.scale_factor == ScaleFactor(4, 3)
+        assert resized.timestamp == 1.5 and resized.frame_index == 3
+        assert resized.source_scale_factor == ScaleFactor(8, 6)
+        assert image.resize(4, 3).image is resized.image
+        assert not resized.image.flags.writeable
+        assert (image * ScaleFactor(0.5, 0.5)).image is resized.image
+        unchanged = image.resized(8, 6)
+        assert not unchanged.flags.writeable
+        assert np.shares_memory(unchanged, image.image) and image.image.flags.writeable
+
+    def test_resize_cache_limit(self):
+        """
+        Test that the least recently used sizes are evicted once the cache is over its limit.
+        """
+        image = Image(None, np.zeros((100, 100), dtype=np.uint8))
+        image.max_resize_cache_bytes = 2000
+        first = image.resized(40, 40)
+        image.resized(30, 30)
+        assert image.resized(30, 30) is image.resized(30, 30)
+        assert image.resized(40, 40) is not first
+
+    def test_pyramid(self):
+        """
+        Test that a pyramid returns every requested scale, from factors or sizes.
+        """
+        image = Image(None, np.zeros((64, 96, 3), dtype=np.uint8))
+        levels = image.pyramid([0.5, 0.25, (10, 5)])
+        assert [level.scale_factor for level in levels] == [ScaleFactor(48, 32), ScaleFactor(24, 16), ScaleFactor(10, 5)]
+        assert image.pyramid([0.5])[0].image is levels[0].image
+
+    def test_pickle(self):
+        """
+        Test that images can be pickled, without their resize cache.
+        """
+        image = Image(None, np.zeros((4, 4), dtype=np.uint8))
+        image.resized(2, 2)
+        copy = pickle.loads(pickle.dumps(image))
+        assert copy == image and not copy._resized
+        assert copy.resized(2, 2).shape == (2, 2)
+
+    def test_crops_are_views(self):
+        """
+        Test that axis aligned boxes inside the image are cropped without copying.
+        """
+        content = np.arange(20 * 30 * 3, dtype=np.uint8).reshape(20, 30, 3)
+        image = Image(None, content)
+        crops = image.crops([Box(5, 5, 4, 6, 0, ScaleFactor(30, 20)), Box(0.5, 0.5, 0.2, 0.2, 0, ScaleFactor(1, 1))])
+        assert crops[0].base is not None and np.shares_memory(crops[0], content)
+        np.testing.assert_array_equal(crops[0], content[2:8, 3:7])
+        np.testing.assert_array_equal(crops[1], content[8:12, 12:18])
+
+    def test_crops_resized(self):
+        """
+        Test that crops are resized into one preallocated array.
+        """
+        content = np.zeros((20, 30), dtype=np.uint8)
+        content[:10] = 255
+        image = Image(None, content)
+        out = np.empty((3, 4, 4), dtype=np.uint8)
+        boxes = [Box(15, 5, 10, 10, 0, ScaleFactor(30, 20)), Box(15, 15, 4, 4, 0, ScaleFactor(30, 20)),
+                 Box(2, 5, 8, 8, 0, ScaleFactor(30, 20))]
+        assert image.crops(boxes, (4, 4), out=out) is out
+        assert np.all(out[0] == 255) and np.all(out[1] == 0)
+        assert np.all(out[2][:, :1] == 0) and np.all(out[2][:, 1:] == 255)
+
+    def test_crops_rotated(self):
+        """
+        Test that rotated boxes are warped upright.
+        """
+        content = np.zeros((40, 40), dtype=np.uint8)
+        content[10:30, 17:23] = 255
+        image = Image(None, content)
+        [crop] = image.crops([Box(20, 20, 20, 6, 90, ScaleFactor(40, 40))], (20, 6), interpolation=0)
+        assert np.all(crop == 255)
+        [crop] = image.crops([Box(20, 20, 20, 6, 90, ScaleFactor(40, 40))])
+        assert crop.shape == (6, 20) and np.all(crop == 255)
+
+    def test_fingerprint(self):
+        """
+        Test that images are compared by their content fingerprint, and are not hashable.
+        """
+        first = Image(None, np.zeros((4, 4), dtype=np.uint8))
+        second = Image(None, np.zeros((4, 4), dtype=np.uint8))
+        assert first.fingerprint == second.fingerprint and first == second
+        with pytest.raises(TypeError):
+            hash(first)
+        assert first != Image(None, np.ones((4, 4), dtype=np.uint8))
+        assert first != Image(None, np.zeros((2, 8), dtype=np.uint8))
@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+from dtrack.util.image import Image
+from dtrack.util.image_cache import ImageContentCache
+
+
+class TestImageContentCache:
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used content is evicted to stay within the budget.
+        """
+        cache = ImageContentCache(max_bytes=300)
+        cache.put('a', np.zeros(100, dtype=np.uint8))
+        cache.put('b', np.zeros(100, dtype=np.uint8))
+        cache.put('c', np.zeros(100, dtype=np.uint8))
+        assert cache.get('a') is not None
+        cache.put('d', np.zeros(100, dtype=np.uint8))
+        assert 'b' not in cache and 'a' in cache
+        assert cache.nbytes == 300 and cache.evictions == 1
+        assert (cache.hits, cache.misses) == (1, 0)
+
+    def test_too_large(self):
+        """
+        Test that content larger than the budget is not cached.
+        """
+        cache = ImageContentCache(max_bytes=10)
+        cache.put('a', np.zeros(100, dtype=np.uint8))
+        assert len(cache) == 0 and cache.nbytes == 0
+
+    def test_replace_and_discard(self):
+        """
+        Test that replacing and discarding content keeps the byte count right.
+        """
+        cache = ImageContentCache()
+        cache.put('a', np.zeros(100, dtype=np.uint8))
+        cache.put('a', np.zeros(50, dtype=np.uint8))
+        assert cache.nbytes == 50
+        cache.discard('a')
+        assert cache.nbytes == 0 and cache.get('a') is None
+
+    def test_images_decode_again(self, tmp_path):
+        """
+        Test that images using a cache do not hold their content, and decode it again once evicted.
+        """
+        paths = []
+        for index in range(3):
+            path = str(tmp_path / f'{index}.png')
+            cv2.imwrite(path, np.full((10, 10, 3), index, dtype=np.uint8))
+            paths.append(path)
+        cache = ImageContentCache(max_bytes=2 * 300)
+        images = [Image(path, content_cache=cache) for path in paths]
+        assert [int(image.image[0, 0, 0]) for image in images] == [0, 1, 2]
+        assert all(image._image_content is None for image in images)
+        assert cache.nbytes == 600 and paths[0] not in [key[0] for key in cache._entries]
+        assert int(images[0].image[0, 0, 0]) == 0
+        assert cache.misses == 4
+
+    def test_decoded_content_is_cached(self, tmp_path):
+        """
+        Test that content handed to an image with a file goes to the cache when first used, and that images
+        sharing a file share their content.
+        """
+        path = str(tmp_path / 'frame.png')
+        content = np.full((4, 4, 3), 7, dtype=np.uint8)
+        cv2.imwrite(path, content)
+        cache = ImageContentCache()
+        first = Image(path, content, content_cache=cache)
+        assert first._image_content is content and len(cache) == 0
+        assert first.image is content
+        assert first._image_content is None
+        second = Image(path, content_cache=cache)
+        assert second.image is content
+        assert cache.misses == 0
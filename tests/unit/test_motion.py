@@ -0,0 +1,66 @@
+import pytest
+from dtrack.detection.motion import MotionDetector
+from dtrack.pipeline.util import MotionGatedDetectionStep
+from tests.helpers import BlobDetector, FakeContext, blob_frame
+
+
+def _frame(*positions):
+    return blob_frame(*[(x, y, 20, 20) for x, y in positions], width=320, height=240)
+
+
+class TestMotionDetector:
+
+    @pytest.mark.parametrize('method', ['average', 'mog2'])
+    def test_static_scene_has_no_regions(self, method):
+        """
+        Test that an unchanged scene reports no changed regions after the first frame.
+        """
+        motion = MotionDetector(method=method)
+        assert motion.update(_frame((10, 10)))[1] == [(0, 0, 320, 240)]
+        for _ in range(3):
+            changed, regions = motion.update(_frame((10, 10)))
+            assert regions == []
+            assert changed < motion.min_changed_area
+
+    def test_changed_region(self):
+        """
+        Test that a new object is covered by a changed region.
+        """
+        motion = MotionDetector(padding=8)
+        motion.update(_frame())
+        changed, regions = motion.update(_frame((200, 100)))
+        assert changed > 0
+        assert len(regions) == 1
+        x1, y1, x2, y2 = regions[0]
+        assert x1 <= 200 and y1 <= 100 and x2 >= 220 and y2 >= 120
+        assert (x2 - x1) * (y2 - y1) < 320 * 240 / 4
+
+
+class TestMotionGatedDetectionStep:
+
+    def test_skips_static_frames(self):
+        """
+        Test that static frames reuse the previous detections without running the detector.
+        """
+        detector = BlobDetector()
+        step = MotionGatedDetectionStep(detector)
+        for _ in range(4):
+            context = FakeContext(_frame((10, 10)))
+            step.detect(context)
+            assert len(context.object_detections) == 1
+        assert len(detector.calls) == 1
+        assert step.skip_rate == 0.75
+
+    def test_detects_changed_regions(self):
+        """
+        Test that only changed regions are detected, keeping detections elsewhere.
+        """
+        detector = BlobDetector()
+        step = MotionGatedDetectionStep(detector, motion_detector=MotionDetector(padding=8))
+        step.detect(FakeContext(_frame((10, 10))))
+        context = FakeContext(_frame((10, 10), (200, 100)))
+        result = step.detect(context)
+        assert result['skipped'] is False
+        assert detector.calls[-1][0] < 240 and detector.calls[-1][1] < 320
+        assert sorted(context.object_detections.boxes[:, 0].tolist()) == [20, 210]
+        assert step.region_frames == 1
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from dtrack.util import Box, Detection, DetectionBatch, ScaleFactor
+from dtrack.util import nms
+
+
+class TestNMS:
+
+    def test_box_iou_axis_aligned(self):
+        """
+        Test intersection over union of axis-aligned boxes.
+        """
+        iou = nms.box_iou(np.array([[5, 5, 10, 10]]), np.array([[5, 5, 10, 10], [10, 5, 10, 10], [50, 50, 2, 2]]))
+        np.testing.assert_allclose(iou, [[1, 50 / 150, 0]])
+
+    def test_box_iou_rotated(self):
+        """
+        Test intersection over union of rotated boxes.
+        """
+        iou = nms.box_iou(np.array([[0, 0, 10, 10, 0]]), np.array([[0, 0, 10, 10, 90], [0, 0, 10, 10, 45]]))
+        assert iou[0, 0] == pytest.approx(1, abs=1e-4)
+        overlap = 100 - 4 * (5 * np.sqrt(2) - 5) ** 2
+        assert iou[0, 1] == pytest.approx(overlap / (200 - overlap), abs=1e-4)
+
+    def test_box_corners(self):
+        """
+        Test that corners match the Box corner properties.
+        """
+        box = Box(5, 5, 10, 4, 30, ScaleFactor(1, 1))
+        corners = nms.box_corners(np.array([[5, 5, 10, 4, 30]]))[0]
+        np.testing.assert_allclose(corners, [box.top_left, box.top_right, box.bottom_right, box.bottom_left])
+
+    def test_nms(self):
+        """
+        Test class-agnostic NMS keeps the best of each overlapping group.
+        """
+        boxes = np.array([[5, 5, 10, 10], [6, 5, 10, 10], [50, 50, 10, 10], [51, 51, 10, 10]])
+        scores = np.array([0.8, 0.9, 0.3, 0.7])
+        np.testing.assert_array_equal(nms.nms(boxes, scores, 0.5), [1, 3])
+        np.testing.assert_array_equal(nms.nms(boxes, scores, 0.5, max_detections=1), [1])
+
+    def test_nms_rotated(self):
+        """
+        Test NMS on rotated boxes.
+        """
+        boxes = np.array([[0, 0, 10, 2, 0], [0, 0, 10, 2, 90], [0, 0, 10, 2, 5]])
+        scores = np.array([0.9, 0.8, 0.7])
+        np.testing.assert_array_equal(nms.nms(boxes, scores, 0.5), [0, 1])
+
+    def test_batched_nms(self):
+        """
+        Test that boxes of different classes do not suppress each other.
+        """
+        boxes = np.array([[5, 5, 10, 10], [6, 5, 10, 10], [5, 5, 10, 10]])
+        scores = np.array([0.9, 0.8, 0.7])
+        np.testing.assert_array_equal(nms.batched_nms(boxes, scores, np.array(['a', 'a', 'b']), 0.5), [0, 2])
+        rotated = np.concatenate([boxes, np.full((3, 1), 10)], axis=1)
+        np.testing.assert_array_equal(nms.batched_nms(rotated, scores, np.array([0, 0, 1]), 0.5), [0, 2])
+
+    def test_soft_nms(self):
+        """
+        Test that soft-NMS decays the scores of overlapping boxes.
+        """
+        boxes = np.array([[5, 5, 10, 10], [6, 5, 10, 10], [50, 50, 10, 10]])
+        scores = np.array([0.9, 0.8, 0.7])
+        keep, kept_scores = nms.soft_nms(boxes, scores, sigma=0.5)
+        np.testing.assert_array_equal(keep, [0, 2, 1])
+        assert kept_scores[0] == 0.9
+        assert kept_scores[2] < 0.8
+        keep, _ = nms.soft_nms(boxes, scores, iou_threshold=0.3, method='linear', score_threshold=0.5)
+        np.testing.assert_array_equal(keep, [0, 2])
+
+    def test_weighted_boxes_fusion(self):
+        """
+        Test that overlapping boxes are fused into their weighted average.
+        """
+        boxes = np.array([[10, 10, 10, 10], [12, 10, 10, 10], [50, 50, 10, 10]])
+        scores = np.array([0.75, 0.25, 0.5])
+        fused, fused_scores, representatives = nms.weighted_boxes_fusion(boxes, scores, iou_threshold=0.5)
+        np.testing.assert_allclose(fused[0], [10.5, 10, 10, 10, 0])
+        np.testing.assert_allclose(fused_scores, [0.5, 0.5])
+        np.testing.assert_array_equal(representatives, [0, 2])
+
+    def test_suppress_detections(self):
+        """
+        Test NMS on a detection batch.
+        """
+        batch = DetectionBatch.from_detections([
+            Detection("car", None, 0.6, Box(5, 5, 10, 10, 0, ScaleFactor(100, 100)), None),
+            Detection("car", None, 0.9, Box(6, 5, 10, 10, 0, ScaleFactor(100, 100)), None),
+            Detection("person", None, 0.5, Box(5, 5, 10, 10, 0, ScaleFactor(100, 100)), None),
+        ])
+        assert [detection.confidence for detection in nms.suppress_detections(batch)] == [0.9, 0.5]
+        assert len(nms.suppress_detections(batch, class_agnostic=True)) == 1
+        assert len(nms.suppress_detections(DetectionBatch.empty())) == 0
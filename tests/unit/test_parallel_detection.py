@@ -0,0 +1,100 @@
+import os
+import numpy as np
+import pytest
+from dtrack.application import DTrackApplication
+from dtrack.detection.detector import ObjectDetector
+from dtrack.detection.parallel import DetectionProcessPool, WorkerCrashedError
+from dtrack.pipeline import Pipeline
+from dtrack.pipeline.arguments import Context
+from dtrack.pipeline.step import pipeline_step
+from dtrack.pipeline.util import ParallelObjectDetectionStep
+from dtrack.util import Box, Detection, Image, ScaleFactor
+from dtrack.util.shared_memory import attach_shared_memory
+
+
+class MeanDetector(ObjectDetector):
+    """
+    Returns a single detection whose confidence is the mean pixel value. Crashes the
+    worker process on frames with a mean of 255.
+    """
+
+    def detect(self, image):
+        mean = float(image.image.mean())
+        if mean == 255:
+            os._exit(1)
+        return [Detection('mean', None, mean, Box(0, 0, 1, 1, 0, ScaleFactor(1, 1)), None)]
+
+
+def _frame(value):
+    return Image(None, np.full((32, 48, 3), value, dtype=np.uint8))
+
+
+class TestDetectionProcessPool:
+
+    def test_map_preserves_order(self):
+        """
+        Test that detections are returned in frame order.
+        """
+        with DetectionProcessPool(MeanDetector(), workers=2, max_in_flight=3) as pool:
+            results = list(pool.map(_frame(value) for value in range(10)))
+        assert [detections[0].confidence for detections in results] == list(range(10))
+
+    def test_detect(self):
+        """
+        Test detecting a single frame.
+        """
+        with DetectionProcessPool(MeanDetector(), workers=1) as pool:
+            assert pool.detect(_frame(7))[0].confidence == 7
+            assert pool.detect(Image(None, np.full((64, 64, 3), 9, dtype=np.uint8)))[0].confidence == 9
+
+    def test_worker_crash(self):
+        """
+        Test that a crashing worker fails only its frame and is restarted.
+        """
+        with DetectionProcessPool(MeanDetector(), workers=1, max_retries=1) as pool:
+            with pytest.raises(WorkerCrashedError):
+                pool.detect(_frame(255))
+            assert pool.crashes == 2
+            assert pool.detect(_frame(3))[0].confidence == 3
+            assert pool.in_flight == 0
+
+    def test_close_removes_slots(self):
+        """
+        Test that closing the pool removes its shared memory slots.
+        """
+        pool = DetectionProcessPool(MeanDetector(), workers=1, max_in_flight=2)
+        assert pool.detect(_frame(4))[0].confidence == 4
+        names = [shm.name for shm in pool._slots if shm is not None]
+        pool.close()
+        assert names
+        for name in names:
+            with pytest.raises(FileNotFoundError):
+                attach_shared_memory(name)
+
+
+class TestParallelObjectDetectionStep:
+
+    def test_pipeline(self):
+        """
+        Test that the step detects in worker processes, and that closing the pipeline closes its pool.
+        """
+        step = ParallelObjectDetectionStep(MeanDetector(), workers=2)
+
+        @pipeline_step('confidences', Context())
+        def confidences(context):
+            return [detection.confidence for detection in context.object_detections]
+
+        with Pipeline('test') as pipeline:
+            pipeline.add_step(step)
+            pipeline.add_step(confidences)
+            application = DTrackApplication(tracked_class='mean', pipeline=pipeline)
+            results = list(application.process_image_stream_pipelined(
+                iter([_frame(value) for value in range(6)]), progress_bar=False, detection_workers=2
+            ))
+            assert list(step.detect_many(_frame(value) for value in (7, 8))) == [
+                [Detection('mean', None, 7.0, Box(0, 0, 1, 1, 0, ScaleFactor(1, 1)), None)],
+                [Detection('mean', None, 8.0, Box(0, 0, 1, 1, 0, ScaleFactor(1, 1)), None)],
+            ]
+        assert [result['pipeline_step_results']['confidences'] for result in results] == [[value] for value in range(6)]
+        with pytest.raises(RuntimeError):
+            step.pool.submit(_frame(0))
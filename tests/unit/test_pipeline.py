@@ -0,0 +1,66 @@
+import asyncio
+from dtrack.pipeline import Pipeline
+from dtrack.pipeline.arguments import FrameNumber, PipelineStepResult
+from dtrack.pipeline.step import pipeline_step
+from tests.helpers import FakeContext
+
+
+class TestPipeline:
+
+    def test_run(self):
+        """
+        Test that steps run in order and their results are stored.
+        """
+        @pipeline_step('double', FrameNumber())
+        def double(frame_number):
+            return frame_number * 2
+
+        @pipeline_step('increment', PipelineStepResult('double'))
+        def increment(value):
+            return value + 1
+
+        pipeline = Pipeline('test')
+        pipeline.add_step(double)
+        pipeline.add_step(increment)
+        context = pipeline.run(FakeContext(frame_number=3))
+        assert context.pipeline_step_results == {'double': 6, 'increment': 7}
+
+    def test_split_frame_independent(self):
+        """
+        Test that only the leading frame independent steps are split off.
+        """
+        first = pipeline_step('first', frame_independent=True)(lambda: None)
+        second = pipeline_step('second')(lambda: None)
+        third = pipeline_step('third', frame_independent=True)(lambda: None)
+        pipeline = Pipeline('test')
+        for step in (first, second, third):
+            pipeline.add_step(step)
+        assert pipeline.split_frame_independent() == ([first], [second, third])
+
+    def test_run_async_awaits_independent_steps_concurrently(self):
+        """
+        Test that independent async steps are awaited together, and dependent ones after.
+        """
+        first_started, second_started = asyncio.Event(), asyncio.Event()
+
+        @pipeline_step('first', FrameNumber())
+        async def first(frame_number):
+            first_started.set()
+            await asyncio.wait_for(second_started.wait(), 5)
+            return frame_number
+
+        @pipeline_step('second', FrameNumber())
+        async def second(frame_number):
+            second_started.set()
+            await asyncio.wait_for(first_started.wait(), 5)
+            return -frame_number
+
+        @pipeline_step('third', PipelineStepResult('first'))
+        async def third(value):
+            return value * 10
+
+        pipeline = Pipeline('test')
+        for step in (first, second, third):
+            pipeline.add_step(step)
+        context = asyncio.run(pipeline.run_async(FakeContext(frame_number=2)))
+        assert context.pipeline_step_results == {'first': 2, 'second': -2, 'third': 20}
@@ -0,0 +1,114 @@
+import threading
+import time
+import numpy as np
+from dtrack.io.prefetch import PrefetchingImageStream
+from dtrack.io.stream import ImageStream
+from dtrack.util import Image
+
+
+class SlowImageStream(ImageStream):
+    """
+    A stream of frames that take a while to read, whose pixels hold the frame index.
+    """
+
+    def __init__(self, n_frames, delay):
+        super().__init__()
+        self.n_frames = n_frames
+        self.delay = delay
+        self.index = 0
+
+    def _advance(self):
+        if self.index >= self.n_frames:
+            self.current_image = None
+            return
+        time.sleep(self.delay)
+        self.current_image = Image(None, np.full((2, 2), self.index, dtype=np.uint8))
+        self.index += 1
+
+
+class LazyImage(Image):
+    """
+    An image that takes a while to load, recording how many images load at once.
+    """
+
+    lock = threading.Lock()
+    loading = 0
+    overlaps = []
+
+    def __init__(self, index):
+        super().__init__(None)
+        self.index = index
+
+    @property
+    def image(self):
+        if self._image_content is None:
+            with LazyImage.lock:
+                LazyImage.loading += 1
+                LazyImage.overlaps.append(LazyImage.loading)
+            time.sleep(0.01)
+            with LazyImage.lock:
+                LazyImage.loading -= 1
+            self._image_content = np.full((2, 2), self.index, dtype=np.uint8)
+        return self._image_content
+
+
+class LazyImageStream(ImageStream):
+    """
+    A stream of lazily loaded frames.
+    """
+
+    def __init__(self, n_frames):
+        super().__init__()
+        self.n_frames = n_frames
+        self.index = 0
+
+    def _advance(self):
+        if self.index >= self.n_frames:
+            self.current_image = None
+            return
+        self.current_image = LazyImage(self.index)
+        self.index += 1
+
+
+class TestPrefetchingImageStream:
+
+    def test_reads_ahead(self):
+        """
+        Test that reading overlaps with processing and frames keep their order.
+        """
+        source = SlowImageStream(10, 0.001)
+        stream = PrefetchingImageStream(source)
+        indices = []
+        read_ahead = []
+        for image in stream:
+            deadline = time.perf_counter() + 5
+            while source.index <= len(indices) + 1 and source.index < 10 and time.perf_counter() < deadline:
+                time.sleep(0.001)
+            read_ahead.append(source.index > len(indices) + 1 or source.index == 10)
+            indices.append(int(image.image[0, 0]))
+        assert indices == list(range(10))
+        assert all(read_ahead)
+        assert stream.frames == 10
+
+    def test_loads_in_parallel(self):
+        """
+        Test that lazy images are loaded by several workers, in order.
+        """
+        LazyImage.overlaps = []
+        stream = PrefetchingImageStream(LazyImageStream(12), queue_size=6, workers=4)
+        images = list(stream)
+        assert [image.index for image in images] == list(range(12))
+        assert all(image._image_content is not None for image in images)
+        assert max(LazyImage.overlaps) > 1
+
+    def test_statistics_and_close(self):
+        """
+        Test that a slow consumer fills the queue, and that closing stops reading ahead.
+        """
+        stream = PrefetchingImageStream(SlowImageStream(100, 0), queue_size=2)
+        next(stream)
+        time.sleep(0.05)
+        assert stream.queue_depth >= 2
+        assert stream.loader_stall_time > 0
+        stream.close()
+        assert all(not thread.is_alive() for thread in stream.execution._threads)
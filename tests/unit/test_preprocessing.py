@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from dtrack.detection.detector import ObjectDetector
+from dtrack.detection.preprocessing import LetterboxPreprocessor
+from dtrack.util import Image, ScaleFactor
+
+
+class LetterboxDetector(ObjectDetector):
+    """
+    A detector whose model finds one box covering the whole frame in its input.
+    """
+
+    preprocessor = LetterboxPreprocessor((64, 64))
+
+    def detect(self, image):
+        tensor, transform = self.preprocess(image)
+        content = ~np.isclose(tensor[2], 114 / 255)
+        rows = np.flatnonzero(np.any(content, axis=1))
+        columns = np.flatnonzero(np.any(content, axis=0))
+        cx, cy = (columns[0] + columns[-1] + 1) / 2, (rows[0] + rows[-1] + 1) / 2
+        width, height = columns[-1] + 1 - columns[0], rows[-1] + 1 - rows[0]
+        return transform.to_source_boxes(np.array([[cx, cy, width, height]]))
+
+
+def frame(width, height, value=200):
+    content = np.zeros((height, width, 3), dtype=np.uint8)
+    content[..., 0] = value
+    return Image(None, content)
+
+
+class TestLetterboxPreprocessor:
+
+    def test_letterbox(self):
+        """
+        Test that frames keep their aspect ratio, are padded, converted to RGB, normalized and transposed.
+        """
+        preprocessor = LetterboxPreprocessor((64, 64))
+        output, transform = preprocessor(frame(128, 64))
+        assert output.shape == (3, 64, 64) and output.dtype == np.float32
+        assert transform.scale == ScaleFactor(0.5, 0.5) and transform.offset == (0, 16)
+        np.testing.assert_allclose(output[:, 0, 0], 114 / 255)
+        np.testing.assert_allclose(output[:, 32, 32], [0, 0, 200 / 255])
+
+    def test_buffers_are_reused(self):
+        """
+        Test that outputs are written into the same buffers, in turn over the pool.
+        """
+        preprocessor = LetterboxPreprocessor((32, 32), buffer_count=2)
+        first, _ = preprocessor(frame(64, 64))
+        second, _ = preprocessor(frame(64, 64))
+        third, _ = preprocessor(frame(64, 64))
+        assert first is not second and first is third
+
+    def test_buffer_turns_per_shape(self):
+        """
+        Test that frames and batches of different kinds take turns over their own buffers.
+        """
+        preprocessor = LetterboxPreprocessor((32, 32), buffer_count=2)
+        first, _ = preprocessor(frame(64, 64))
+        preprocessor(Image(None, np.zeros((64, 64), dtype=np.uint8)))
+        second, _ = preprocessor(frame(64, 64))
+        assert first is not second
+
+    def test_batch_buffers_are_bounded(self):
+        """
+        Test that batches of any size share the buffers of the largest batch.
+        """
+        preprocessor = LetterboxPreprocessor((16, 16))
+        for size in (4, 1, 3, 2, 4):
+            output, _ = preprocessor.batch([frame(32, 32, value) for value in range(size)])
+            assert output.shape == (size, 3, 16, 16)
+            np.testing.assert_allclose(output[:, 2, 8, 8], np.arange(size) / 255)
+        assert len(preprocessor._buffers) == 1
+
+    def test_mean_std(self):
+        """
+        Test per channel normalization, channels last.
+        """
+        preprocessor = LetterboxPreprocessor((8, 8), scale=1, mean=[1, 2, 3], std=[2, 2, 2], channels_first=False)
+        output, _ = preprocessor(Image(None, np.full((8, 8, 3), 11, dtype=np.uint8)))
+        np.testing.assert_allclose(output[0, 0], [5, 4.5, 4])
+
+    def test_stretch_and_grayscale(self):
+        """
+        Test stretching grayscale frames without letterboxing.
+        """
+        preprocessor = LetterboxPreprocessor((16, 8), letterbox=False, scale=1, dtype=np.uint8)
+        output, transform = preprocessor(Image(None, np.full((16, 16), 7, dtype=np.uint8)))
+        assert output.shape == (1, 8, 16) and np.all(output == 7)
+        assert transform.scale == ScaleFactor(1, 0.5)
+
+    def test_batch(self):
+        """
+        Test that a batch holds every frame, each with its own transform.
+        """
+        preprocessor = LetterboxPreprocessor((32, 32))
+        output, transforms = preprocessor.batch([frame(64, 32), frame(32, 64)])
+        assert output.shape == (2, 3, 32, 32)
+        assert [transform.offset for transform in transforms] == [(0, 8), (8, 0)]
+        np.testing.assert_allclose(output[0, :, 0, 16], 114 / 255)
+        np.testing.assert_allclose(output[1, :, 0, 16], [0, 0, 200 / 255])
+
+    def test_boxes_map_back(self):
+        """
+        Test that boxes found in the input map back to the frame.
+        """
+        [box] = LetterboxDetector().detect(frame(128, 64))
+        assert (box.cx, box.cy, box.width, box.height) == pytest.approx((64, 32, 128, 64))
+        assert box.scale_factor == ScaleFactor(128, 64)
+
+    def test_to_source(self):
+        """
+        Test that the mapping keeps angles and handles empty arrays.
+        """
+        _, transform = LetterboxPreprocessor((64, 64))(frame(128, 64))
+        np.testing.assert_allclose(transform.to_source([[32, 32, 10, 10, 0.5]]), [[64, 32, 20, 20, 0.5]])
+        assert transform.to_source(np.zeros((0, 5))).shape == (0, 5)
+
+    def test_no_preprocessor(self):
+        """
+        Test that preprocessing without a preprocessor raises an error.
+        """
+        class Detector(ObjectDetector):
+            def detect(self, image):
+                return self.preprocess(image)
+
+        with pytest.raises(ValueError):
+            Detector().detect(frame(8, 8))
@@ -0,0 +1,68 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from dtrack.io.raw import RawFrameStream, convert_images, convert_video, write_raw_frames
+from dtrack.util import Image
+from tests.helpers import brightness
+
+
+class TestRawFrames:
+
+    def test_convert_video(self, video, tmp_path):
+        """
+        Test converting a video and replaying it from memory mapped views.
+        """
+        output = str(tmp_path / 'frames.npy')
+        assert convert_video(video, output, frame_step=2) == 10
+        stream = RawFrameStream(output)
+        images = list(stream)
+        assert [brightness(image) for image in images] == list(range(1, 20, 2))
+        assert [image.frame_index for image in images] == list(range(10))
+        assert isinstance(images[0].image.base, np.memmap) or isinstance(images[0].image, np.memmap)
+        assert not images[0].image.flags.writeable
+
+    def test_convert_images(self, tmp_path):
+        """
+        Test converting an image sequence at reduced resolution.
+        """
+        for index in range(4):
+            cv2.imwrite(str(tmp_path / f'{index}.png'), np.full((32, 48, 3), index * 20, dtype=np.uint8))
+        output = str(tmp_path / 'frames.npy')
+        assert convert_images(str(tmp_path), output, reduction=2, grayscale=True) == 4
+        assert np.load(output, mmap_mode='r').shape == (4, 16, 24)
+
+    def test_slicing_and_seek(self, tmp_path):
+        """
+        Test reading a slice of the frames and seeking.
+        """
+        output = str(tmp_path / 'frames.npy')
+        images = [Image(None, np.full((2, 2), index, dtype=np.uint8)) for index in range(10)]
+        write_raw_frames(images, output, 10)
+        stream = RawFrameStream(output, start=2, stop=8, step=2)
+        assert [image.frame_index for image in stream] == [2, 4, 6]
+        stream.seek(1)
+        assert next(stream).frame_index == 4
+
+    def test_shape_mismatch(self, tmp_path):
+        """
+        Test that frames of different shapes are rejected.
+        """
+        images = [Image(None, np.zeros((2, 2), dtype=np.uint8)), Image(None, np.zeros((3, 2), dtype=np.uint8))]
+        path = str(tmp_path / 'frames.npy')
+        with pytest.raises(ValueError):
+            write_raw_frames(images, path, 2)
+        assert not os.path.exists(path)
+
+    @pytest.mark.parametrize('frame_count', [5, 1000])
+    def test_short_source(self, tmp_path, frame_count):
+        """
+        Test that a file is cut down to the frames written when the images run out early.
+        """
+        path = str(tmp_path / 'frames.npy')
+        images = [Image(None, np.full((4, 6, 3), index + 1, dtype=np.uint8)) for index in range(3)]
+        assert write_raw_frames(images, path, frame_count) == 3
+        frames = np.load(path)
+        assert frames.shape == (3, 4, 6, 3)
+        assert [int(frame[0, 0, 0]) for frame in frames] == [1, 2, 3]
+        assert os.path.getsize(path) == np.load(path, mmap_mode='r').offset + frames.nbytes
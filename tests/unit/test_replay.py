@@ -0,0 +1,149 @@
+import threading
+import numpy as np
+import pytest
+from dtrack.detection.detector import ObjectDetector
+from dtrack.detection.replay import DetectionLogReader, DetectionLogWriter, RecordingObjectDetector, ReplayObjectDetector
+from dtrack.util import Box, Detection, Image, ScaleFactor
+from dtrack.util.detection_codec import decode_detections, encode_detections, rle_decode, rle_encode
+
+
+def _mask():
+    mask = np.zeros((6, 8), dtype=bool)
+    mask[1:4, 2:7] = True
+    return mask
+
+
+FRAMES = [
+    [Detection('car', 'red', 0.75, Box(10.5, 20.25, 4, 3, 0, ScaleFactor(640, 480)), None)],
+    [],
+    [
+        Detection('person', None, 0.5, Box(1, 2, 3, 4, 30, ScaleFactor(640, 480)), _mask()),
+        Detection('car', None, 0.25, Box(5, 6, 7, 8, 0, ScaleFactor(1, 1)), None),
+    ],
+]
+
+
+class ListDetector(ObjectDetector):
+    """
+    Returns the detections of FRAMES in order.
+    """
+
+    def __init__(self):
+        self.frames = iter(FRAMES)
+
+    def detect(self, image):
+        return next(self.frames)
+
+
+class TestDetectionCodec:
+
+    @pytest.mark.parametrize('mask', [_mask(), np.ones((3, 3), dtype=bool), np.zeros((2, 5), dtype=bool)])
+    def test_round_trip(self, mask):
+        """
+        Test that masks survive encoding and decoding.
+        """
+        runs = rle_encode(mask)
+        assert np.array_equal(rle_decode(runs, mask.shape), mask)
+        assert runs.sum() == mask.size
+
+    def test_encode_decode(self):
+        """
+        Test that a record decodes to the encoded detections, also at an offset.
+        """
+        record = encode_detections(FRAMES[2])
+        assert decode_detections(record).to_detections() == FRAMES[2]
+        assert decode_detections(b'xyz' + record, 3).to_detections() == FRAMES[2]
+
+    def test_exact_values_without_copies(self):
+        """
+        Test that confidences and boxes decode exactly, as views of the record.
+        """
+        detections = [Detection('car', None, 0.1, Box(0.1, 1 / 3, 2.7, 1e-7, 12.3456789, ScaleFactor(1920, 1080)), None)]
+        record = encode_detections(detections)
+        batch = decode_detections(record)
+        assert batch.to_detections() == detections
+        assert batch.confidences[0] == 0.1
+        for column in (batch.label_codes, batch.confidences, batch.boxes, batch.scale_factors):
+            assert np.shares_memory(column, np.frombuffer(record, dtype=np.uint8))
+
+
+class TestDetectionLog:
+
+    def test_round_trip(self, tmp_path):
+        """
+        Test that every frame is read back as it was written.
+        """
+        path = str(tmp_path / 'detections.log')
+        with DetectionLogWriter(path) as writer:
+            for detections in FRAMES:
+                writer.append(detections)
+        with DetectionLogReader(path) as reader:
+            assert len(reader) == 3
+            for index, expected in enumerate(FRAMES):
+                assert reader.read(index).to_detections() == expected
+            with pytest.raises(IndexError):
+                reader.read(3)
+
+    def test_append(self, tmp_path):
+        """
+        Test that reopening a log appends to it.
+        """
+        path = str(tmp_path / 'detections.log')
+        for detections in FRAMES:
+            with DetectionLogWriter(path) as writer:
+                writer.append(detections)
+        with DetectionLogReader(path) as reader:
+            assert [len(reader.read(index)) for index in range(len(reader))] == [1, 0, 2]
+
+    def test_close_with_batches_alive(self, tmp_path):
+        """
+        Test that closing a reader while a batch still views the log keeps that batch readable.
+        """
+        path = str(tmp_path / 'detections.log')
+        with DetectionLogWriter(path) as writer:
+            for detections in FRAMES:
+                writer.append(detections)
+        reader = DetectionLogReader(path)
+        batch = reader.read(2)
+        reader.close()
+        assert batch.to_detections() == FRAMES[2]
+
+    def test_append_from_threads(self, tmp_path):
+        """
+        Test that records appended from several threads do not interleave.
+        """
+        path = str(tmp_path / 'detections.log')
+        with DetectionLogWriter(path) as writer:
+            def append():
+                for _ in range(50):
+                    writer.append(FRAMES[2])
+
+            threads = [threading.Thread(target=append) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        with DetectionLogReader(path) as reader:
+            assert len(reader) == 200
+            assert all(reader.read(index).to_detections() == FRAMES[2] for index in range(len(reader)))
+
+
+class TestReplay:
+
+    def test_record_and_replay(self, tmp_path):
+        """
+        Test that a replay returns what the recorded detector returned, frame by frame.
+        """
+        path = str(tmp_path / 'detections.log')
+        image = Image(None, np.zeros((4, 4, 3), dtype=np.uint8))
+        recorder = RecordingObjectDetector(ListDetector(), path)
+        recorded = [recorder.detect(image) for _ in FRAMES]
+        recorder.close()
+
+        replay = ReplayObjectDetector(path, loop=True)
+        assert [replay.detect(image).to_detections() for _ in FRAMES] == recorded
+        assert replay.detect(image).to_detections() == recorded[0]
+        replay.seek(2)
+        detections = replay.detect(image)
+        replay.close()
+        assert detections.to_detections() == FRAMES[2]
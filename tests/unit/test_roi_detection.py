@@ -0,0 +1,63 @@
+from dtrack.detection.regions import merge_regions
+from dtrack.pipeline.util import RegionOfInterestDetectionStep
+from dtrack.util import Box, ScaleFactor
+from tests.helpers import BLOBS, BlobDetector, FakeContext, blob_frame
+
+
+class _TrackedObject:
+    """
+    Stand-in for a trackable object that does not move.
+    """
+
+    def __init__(self, box, last_seen, predicts=True):
+        self.bounding_box = box
+        self.last_seen = last_seen
+        self.location = (box.cx, box.cy)
+        self.predicts = predicts
+
+    def predict_locations(self, n):
+        return [self.location] * n if self.predicts else None
+
+
+class TestMergeRegions:
+
+    def test_merge_regions(self):
+        """
+        Test that overlapping regions are merged, including chains of overlaps.
+        """
+        regions = [(0, 0, 10, 10), (20, 20, 30, 30), (5, 5, 15, 15), (14, 14, 22, 22), (50, 0, 60, 10)]
+        assert sorted(merge_regions(regions)) == [(0, 0, 30, 30), (50, 0, 60, 10)]
+        assert merge_regions([(0, 0, 10, 10), (10, 0, 20, 10)]) == [(0, 0, 10, 10), (10, 0, 20, 10)]
+
+
+class TestRegionOfInterestDetectionStep:
+
+    def test_keyframes_and_regions(self):
+        """
+        Test that the full frame is detected on keyframes, and only the regions around
+        tracked objects in between.
+        """
+        detector = BlobDetector()
+        step = RegionOfInterestDetectionStep(detector, keyframe_interval=5, margin=0.5)
+        step.detect(FakeContext(blob_frame(*BLOBS), 0, {}))
+        assert detector.calls == [(300, 400)]
+
+        tracked = {'a': _TrackedObject(Box(200, 150, 20, 20, 0, ScaleFactor(400, 300)), 0)}
+        context = FakeContext(blob_frame(*BLOBS), 1, tracked)
+        step.detect(context)
+        assert detector.calls[-1] == (40, 40)
+        assert [detection.box.cx for detection in context.object_detections] == [200]
+
+        step.detect(FakeContext(blob_frame(*BLOBS), 5, tracked))
+        assert detector.calls[-1] == (300, 400)
+        assert (step.full_frames, step.region_frames) == (2, 1)
+        assert 0 < step.mean_detected_area < 1
+
+    def test_regions_without_predictions(self):
+        """
+        Test that objects whose predictor makes no predictions get a region around their
+        last location.
+        """
+        step = RegionOfInterestDetectionStep(BlobDetector(), margin=0.5)
+        tracked = {'a': _TrackedObject(Box(200, 150, 20, 20, 0, ScaleFactor(400, 300)), 0, predicts=False)}
+        assert step.regions(FakeContext(blob_frame(*BLOBS), 1, tracked)) == [(180, 130, 220, 170)]
@@ -0,0 +1,135 @@
+import os
+from functools import partial
+from dtrack.application import DTrackApplication
+from dtrack.detection.detector import ObjectDetector
+from dtrack.pipeline import Pipeline
+from dtrack.pipeline.arguments import AllTrackedObjectsWithKeys, FrameNumber
+from dtrack.pipeline.step import pipeline_step
+from dtrack.pipeline.util import ObjectDetectionStep, ObjectTrackingStep
+from dtrack.runner import MultiStreamRunner, StreamSpec
+from dtrack.util import Box, Detection, ScaleFactor
+from tests.helpers import CentreDistance, CountingImageStream
+
+
+def _application(crash_marker=None, crash_frame=None, exit_process=False):
+    @pipeline_step('frame', FrameNumber())
+    def frame(frame_number):
+        if frame_number == crash_frame and not os.path.exists(crash_marker):
+            open(crash_marker, 'w').close()
+            if exit_process:
+                os._exit(1)
+            raise RuntimeError('failed')
+        return frame_number
+
+    pipeline = Pipeline('test')
+    pipeline.add_step(frame)
+    return DTrackApplication(tracked_class='test', pipeline=pipeline)
+
+
+class StillDetector(ObjectDetector):
+    """
+    Detects the same object in every frame.
+    """
+
+    def detect(self, image):
+        return [Detection('test', None, 0.9, Box(1, 1, 2, 2, 0, ScaleFactor(2, 2)), None)]
+
+
+def _tracking_application():
+    @pipeline_step('frame', AllTrackedObjectsWithKeys())
+    def frame(tracked_objects):
+        return [key for key, _ in tracked_objects]
+
+    pipeline = Pipeline('test')
+    pipeline.add_step(ObjectDetectionStep(StillDetector()))
+    pipeline.add_step(ObjectTrackingStep(CentreDistance(), 1, 'test'))
+    pipeline.add_step(frame)
+    return DTrackApplication(tracked_class='test', pipeline=pipeline)
+
+
+def _spec(n_frames, **kwargs):
+    return StreamSpec(partial(CountingImageStream, n_frames), partial(_application, **kwargs), replayable=True)
+
+
+def _by_stream(results):
+    by_stream = {}
+    for stream_id, result in results:
+        by_stream.setdefault(stream_id, []).append(result['pipeline_step_results']['frame'])
+    return by_stream
+
+
+class TestMultiStreamRunner:
+
+    def test_streams_are_ordered(self):
+        """
+        Test that the results of every stream are complete and in order.
+        """
+        runner = MultiStreamRunner({'a': _spec(2), 'b': _spec(30), 'c': _spec(2), 'd': _spec(30)}, workers=2)
+        by_stream = _by_stream(runner)
+        assert by_stream == {'a': [0, 1], 'b': list(range(30)), 'c': [0, 1], 'd': list(range(30))}
+
+    def test_rebalance(self):
+        """
+        Test that a stream moves to a worker left idle by a removed stream, and continues in order.
+        """
+        runner = MultiStreamRunner({'a': _spec(300), 'b': _spec(300), 'c': _spec(300)}, workers=2, rebalance=True)
+        results = []
+        for stream_id, result in runner:
+            if not results:
+                runner.remove_stream('b')
+            results.append((stream_id, result))
+        by_stream = _by_stream(results)
+        assert by_stream['a'] == list(range(300)) and by_stream['c'] == list(range(300))
+        assert runner.migrations == 1
+
+    def test_no_rebalance_keeps_tracks(self):
+        """
+        Test that without rebalance removing a stream leaves the others running, with their tracked objects.
+        """
+        specs = {stream_id: StreamSpec(partial(CountingImageStream, 100), _tracking_application) for stream_id in 'abc'}
+        runner = MultiStreamRunner(specs, workers=2)
+        results = []
+        for stream_id, result in runner:
+            if not results:
+                runner.remove_stream('b')
+            results.append((stream_id, result))
+        by_stream = _by_stream(results)
+        assert runner.migrations == 0
+        for stream_id in 'ac':
+            assert len(by_stream[stream_id]) == 100
+            assert len({key for keys in by_stream[stream_id] for key in keys}) == 1
+
+    def test_failed_stream_is_restarted(self, tmp_path):
+        """
+        Test that a stream that raises is restarted without affecting the others.
+        """
+        streams = {
+            'failing': _spec(10, crash_marker=str(tmp_path / 'failed'), crash_frame=4),
+            'other': _spec(10),
+        }
+        runner = MultiStreamRunner(streams, workers=1)
+        by_stream = _by_stream(runner)
+        assert by_stream == {'failing': list(range(10)), 'other': list(range(10))}
+        assert runner.restarts == 1
+
+    def test_worker_crash_restarts_its_streams(self, tmp_path):
+        """
+        Test that the streams of a crashed worker are restarted, continuing where they stopped.
+        """
+        streams = {
+            'crashing': _spec(10, crash_marker=str(tmp_path / 'crashed'), crash_frame=4, exit_process=True),
+            'other': _spec(10),
+        }
+        runner = MultiStreamRunner(streams, workers=2)
+        by_stream = _by_stream(runner)
+        assert by_stream == {'crashing': list(range(10)), 'other': list(range(10))}
+        assert runner.restarts == 1
+
+    def test_stream_is_given_up(self, tmp_path):
+        """
+        Test that a stream failing more often than allowed is given up and its error recorded.
+        """
+        streams = {'failing': _spec(10, crash_marker=str(tmp_path / 'failed'), crash_frame=4)}
+        runner = MultiStreamRunner(streams, workers=1, max_restarts=0)
+        assert _by_stream(runner) == {'failing': [0, 1, 2, 3]}
+        assert 'RuntimeError' in runner.errors['failing']
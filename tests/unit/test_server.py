@@ -0,0 +1,78 @@
+import asyncio
+import os
+import tempfile
+import numpy as np
+import pytest
+from dtrack.application import DTrackApplication
+from dtrack.io.server import TrackingClient, TrackingServer, TrackingServerError
+from dtrack.pipeline import Pipeline
+from dtrack.pipeline.arguments import Context
+from dtrack.pipeline.step import pipeline_step
+from dtrack.util import Box, Detection, DetectionBatch, ScaleFactor
+
+
+def _factory():
+    @pipeline_step('count', Context())
+    def count(context):
+        return len(context.object_detections)
+
+    pipeline = Pipeline('test')
+    pipeline.add_step(count)
+    return DTrackApplication(tracked_class='test', pipeline=pipeline)
+
+
+def _detections(n):
+    return DetectionBatch.from_arrays(['test'] * n, np.ones(n), np.ones((n, 4)), ScaleFactor(1, 1))
+
+
+class TestTrackingServer:
+
+    def test_sessions_over_tcp(self):
+        """
+        Test that concurrent clients get results for their own sessions, in order.
+        """
+        async def run():
+            server = TrackingServer(_factory, max_queue_size=4, max_handoff_size=8)
+            port = await server.start_tcp()
+            clients = [await TrackingClient.connect_tcp('127.0.0.1', port) for _ in range(3)]
+            futures = []
+            for frame in range(10):
+                for index, client in enumerate(clients):
+                    futures.append(await client.submit(frame, _detections(index)))
+            results = await asyncio.gather(*futures)
+            for client in clients:
+                await client.close()
+            await server.close()
+            return server, results
+
+        server, results = asyncio.run(run())
+        assert [result['pipeline_step_results']['count'] for result in results] == [0, 1, 2] * 10
+        assert [result['frame_number'] for result in results] == [frame for frame in range(10) for _ in range(3)]
+        report = server.statistics.report()
+        assert report['requests'] == 30
+        assert report['mean_handoff_size'] >= 1
+        assert server.sessions == 3
+
+    def test_unix_socket_and_errors(self):
+        """
+        Test serving over a Unix socket, and that errors are reported to the client only.
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'dtrack.sock')
+
+        async def run():
+            server = TrackingServer(_factory)
+            await server.start_unix(path)
+            client = await TrackingClient.connect_unix(path)
+            detections = [Detection('test', None, 0.5, Box(1, 2, 3, 4, 0, ScaleFactor(10, 10)), None)]
+            first = await client.track(5, detections)
+            with pytest.raises(TrackingServerError):
+                await client.track(2, detections)
+            second = await client.track(6, [])
+            await client.close()
+            await server.close()
+            return server, first, second
+
+        server, first, second = asyncio.run(run())
+        assert first['pipeline_step_results'] == {'count': 1}
+        assert second['pipeline_step_results'] == {'count': 0}
+        assert server.statistics.errors == 1
@@ -0,0 +1,166 @@
+import multiprocessing
+import threading
+import time
+import numpy as np
+import pytest
+from dtrack.io.shared_memory import SharedMemoryFrameProducer, SharedMemoryImageStream
+
+
+SHAPE = (8, 12, 3)
+
+
+def frame(index):
+    return np.full(SHAPE, index % 256, dtype=np.uint8)
+
+
+def produce(name_queue, mode, n_frames, delay):
+    """
+    Writes frames holding their index from another process.
+    """
+    producer = SharedMemoryFrameProducer(SHAPE, slots=3, mode=mode)
+    name_queue.put(producer.name)
+    name_queue.get()
+    for index in range(n_frames):
+        producer.write(frame(index), timestamp=index / 10, frame_index=index)
+        time.sleep(delay)
+    producer.close()
+
+
+class TestSharedMemoryImageStream:
+
+    def test_lossless_across_processes(self):
+        """
+        A reader in lossless mode gets every frame of a producer in another process, in order.
+        """
+        name_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=produce, args=(name_queue, 'lossless', 50, 0))
+        process.start()
+        stream = SharedMemoryImageStream(name_queue.get(), timeout=10)
+        name_queue.put('start')
+        indexes = []
+        for image in stream:
+            assert np.all(image.image == image.frame_index)
+            assert image.timestamp == pytest.approx(image.frame_index / 10)
+            indexes.append(image.frame_index)
+        stream.close()
+        process.join()
+        assert indexes == list(range(50))
+
+    def test_lossless_producer_waits_for_reader(self):
+        """
+        In lossless mode the producer cannot get more than the number of slots ahead of the reader.
+        """
+        with SharedMemoryFrameProducer(SHAPE, slots=2, mode='lossless') as producer:
+            stream = SharedMemoryImageStream(producer.name)
+            assert producer.write(frame(0))
+            assert producer.write(frame(1))
+            assert not producer.write(frame(2), timeout=0.01)
+            assert next(stream).frame_index == 0
+            assert not producer.write(frame(2), timeout=0.01)
+            assert next(stream).frame_index == 1
+            assert producer.write(frame(2), timeout=0.01)
+            stream.close()
+
+    def test_latest_skips_old_frames(self):
+        """
+        In latest mode the reader gets the most recent frame and counts the frames it skipped.
+        """
+        with SharedMemoryFrameProducer(SHAPE, slots=3) as producer:
+            stream = SharedMemoryImageStream(producer.name)
+            for index in range(5):
+                producer.write(frame(index))
+            image = next(stream)
+            assert image.frame_index == 4
+            assert np.all(image.image == 4)
+            assert stream.dropped_frames == 4
+            stream.close()
+
+    def test_latest_never_overwrites_the_current_frame(self):
+        """
+        In latest mode the producer keeps writing, but not into the slot of the reader's current frame.
+        """
+        with SharedMemoryFrameProducer(SHAPE, slots=2) as producer:
+            stream = SharedMemoryImageStream(producer.name)
+            producer.write(frame(0))
+            image = next(stream)
+            for index in range(1, 10):
+                producer.write(frame(index))
+                assert np.all(image.image == 0)
+            assert next(stream).frame_index == 9
+            stream.close()
+
+    def test_frames_are_views(self):
+        """
+        Images view the shared memory and are not copied.
+        """
+        with SharedMemoryFrameProducer(SHAPE, mode='lossless') as producer:
+            stream = SharedMemoryImageStream(producer.name)
+            producer.write(frame(1))
+            image = next(stream)
+            assert not image.image.flags.owndata
+            assert image.image.base is not None
+            stream.close()
+
+    def test_latest_drops_overwritten_copies(self, monkeypatch):
+        """
+        In latest mode a frame whose slot is written to while it is being copied is dropped for a newer one.
+        """
+        with SharedMemoryFrameProducer(SHAPE, slots=3) as producer:
+            stream = SharedMemoryImageStream(producer.name, timeout=1)
+            producer.write(frame(0))
+            copyto = np.copyto
+
+            def overwrite(target, source):
+                copyto(target, source)
+                monkeypatch.setattr(np, 'copyto', copyto)
+                producer.ring.sequences[0] = -1
+                producer.write(frame(1))
+
+            monkeypatch.setattr(np, 'copyto', overwrite)
+            image = next(stream)
+            assert image.frame_index == 1
+            assert np.all(image.image == 1)
+            assert stream.torn_reads == 1
+            stream.close()
+
+    def test_latest_with_concurrent_producer(self):
+        """
+        Frames read while a thread writes as fast as it can are never torn.
+        """
+        producer = SharedMemoryFrameProducer(SHAPE, slots=3)
+        stream = SharedMemoryImageStream(producer.name, timeout=10)
+
+        def write():
+            for index in range(2000):
+                producer.write(frame(index), frame_index=index)
+            producer.close()
+
+        thread = threading.Thread(target=write)
+        thread.start()
+        last = -1
+        for image in stream:
+            content = image.image
+            assert np.all(content == content[0, 0, 0])
+            assert image.frame_index > last
+            last = image.frame_index
+        thread.join()
+        stream.close()
+        assert last == 1999
+
+    def test_timeout(self):
+        """
+        Waiting for a frame longer than the timeout raises TimeoutError.
+        """
+        with SharedMemoryFrameProducer(SHAPE) as producer:
+            stream = SharedMemoryImageStream(producer.name, timeout=0.01)
+            with pytest.raises(TimeoutError):
+                next(stream)
+            stream.close()
+
+    def test_invalid_frame(self):
+        """
+        Frames of another shape are rejected.
+        """
+        with SharedMemoryFrameProducer(SHAPE) as producer:
+            with pytest.raises(ValueError):
+                producer.write(np.zeros((4, 4, 3), dtype=np.uint8))
@@ -0,0 +1,64 @@
+import numpy as np
+from dtrack.detection.regions import crop, detect_regions, map_to_frame, tile_regions
+from dtrack.detection.tiled import TiledObjectDetector
+from dtrack.util import Box, Detection, ScaleFactor
+from tests.helpers import BLOBS, BlobDetector, blob_frame
+
+
+class TestRegions:
+
+    def test_tile_regions_cover_the_image(self):
+        """
+        Test that tiles cover the image and stay inside it.
+        """
+        regions = tile_regions(400, 300, (200, 200), overlap=0.25)
+        assert regions == [(0, 0, 200, 200), (150, 0, 350, 200), (200, 0, 400, 200),
+                           (0, 100, 200, 300), (150, 100, 350, 300), (200, 100, 400, 300)]
+        assert tile_regions(100, 50, (200, 200)) == [(0, 0, 100, 50)]
+
+    def test_crop_is_a_view(self):
+        """
+        Test that crops share memory with the frame.
+        """
+        frame = blob_frame(*BLOBS)
+        tile = crop(frame, (10, 20, 30, 60))
+        assert tile.image.shape == (40, 20, 3)
+        assert np.shares_memory(tile.image, frame.image)
+
+    def test_map_to_frame(self):
+        """
+        Test mapping a box from a crop with a different scale factor back to the frame.
+        """
+        detections = [Detection('a', None, 1.0, Box(0.5, 0.5, 0.5, 0.25, 0, ScaleFactor(1, 1)), None)]
+        batch = map_to_frame(detections, (100, 50, 300, 150), ScaleFactor(400, 300))
+        assert batch[0].box == Box(200, 100, 100, 25, 0, ScaleFactor(400, 300))
+
+    def test_detect_regions(self):
+        """
+        Test detecting on regions as one batch.
+        """
+        batch = detect_regions(BlobDetector(), blob_frame(*BLOBS), [(0, 0, 100, 100), (300, 200, 400, 300)])
+        assert batch.boxes[:, :4].tolist() == [[20, 15, 20, 10], [380, 285, 20, 10]]
+
+
+class TestTiledObjectDetector:
+
+    def test_detect_merges_seam_duplicates(self):
+        """
+        Test that objects on tile seams are reported once, in frame coordinates.
+        """
+        inner = BlobDetector()
+        detector = TiledObjectDetector(inner, tile_size=(200, 200), overlap=0.25)
+        detections = detector.detect(blob_frame(*BLOBS))
+        boxes = sorted(detection.box.to_yolo() for detection in detections)
+        assert boxes == [(20, 15, 20, 10), (200, 150, 20, 20), (380, 285, 20, 10)]
+        assert all(detection.box.scale_factor == ScaleFactor(400, 300) for detection in detections)
+        assert inner.calls == [(200, 200)] * 6
+
+    def test_detect_with_workers(self):
+        """
+        Test running tiles on threads.
+        """
+        detector = TiledObjectDetector(BlobDetector(), tile_size=(200, 200), overlap=0.25, workers=3)
+        assert len(detector.detect(blob_frame(*BLOBS))) == 3
+        detector.close()
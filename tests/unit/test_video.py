@@ -0,0 +1,94 @@
+import pytest
+from dtrack.io.video import CameraStream, VideoFileStream
+from tests.helpers import brightness
+
+
+class TestVideoFileStream:
+
+    @pytest.mark.parametrize('threaded', [True, False])
+    def test_frames(self, video, threaded):
+        """
+        Test that all frames are read in order, with their index and timestamp.
+        """
+        with VideoFileStream(video, threaded=threaded) as stream:
+            images = list(stream)
+        assert [brightness(image) for image in images] == list(range(20))
+        assert [image.frame_index for image in images] == list(range(20))
+        assert images[5].timestamp == pytest.approx(0.5)
+
+    def test_frame_step_and_size(self, video):
+        """
+        Test that skipped frames keep their index, and that frames are resized.
+        """
+        with VideoFileStream(video, frame_step=3, size=(32, 24)) as stream:
+            images = list(stream)
+        assert [image.frame_index for image in images] == [2, 5, 8, 11, 14, 17]
+        assert [brightness(image) for image in images] == [2, 5, 8, 11, 14, 17]
+        assert images[0].image.shape == (24, 32, 3)
+
+    def test_seek(self, video):
+        """
+        Test seeking before and during reading.
+        """
+        with VideoFileStream(video, start_frame=10) as stream:
+            assert stream.frame_count == 20
+            assert next(stream).frame_index == 10
+            next(stream)
+            stream.seek(3)
+            image = next(stream)
+            assert (image.frame_index, brightness(image)) == (3, 3)
+            assert len(list(stream)) == 16
+            stream.seek(18)
+            assert [image.frame_index for image in stream] == [18, 19]
+
+    def test_missing_file(self, tmp_path):
+        """
+        Test that opening a missing video fails.
+        """
+        with pytest.raises(IOError):
+            VideoFileStream(str(tmp_path / 'missing.avi'))
+
+    def test_decode_error(self, video, monkeypatch):
+        """
+        Test that an error on the decode thread is raised to the consumer, which then sees the end of the stream.
+        """
+        def fail():
+            raise IOError('decoding failed')
+
+        with VideoFileStream(video) as stream:
+            monkeypatch.setattr(stream, '_read', fail)
+            with pytest.raises(IOError, match='decoding failed'):
+                next(stream)
+            assert list(stream) == []
+
+
+class TestCameraStream:
+
+    def test_drop_frames_without_waiting(self, video, monkeypatch):
+        """
+        Test that a consumer falling behind makes the decode thread drop the oldest frames at once.
+        """
+        blocking_puts = []
+        with CameraStream(video, queue_size=2) as stream:
+            decode = stream._decode
+
+            def decode_recording():
+                put = stream._queue.put
+
+                def record(item, block=True, timeout=None):
+                    if block:
+                        blocking_puts.append(item)
+                    return put(item, block, timeout)
+
+                monkeypatch.setattr(stream._queue, 'put', record)
+                decode()
+
+            monkeypatch.setattr(stream, '_decode', decode_recording)
+            first = next(stream)
+            thread = stream._thread
+            thread.join(timeout=10)
+            assert not thread.is_alive()
+            images = [first] + list(stream)
+        assert blocking_puts == []
+        assert stream.dropped_frames == 20 - len(images)
+        assert images[-1].frame_index == 19